@@ -0,0 +1,117 @@
+"""
+Benchmark intermediate compression codecs on inverted index data.
+
+Runs the inverted index pipeline of the search engine project locally, on
+documents made of the words of its example input, and keeps the sorted map
+output of each job.  Each codec then writes and reads back every job's map
+output the way map and reduce tasks do, which measures the CPU it costs
+against the shuffle bytes it saves.
+
+Run from the p4-mapreduce directory after installing the package.
+$ python benchmarks/bench_compression.py --documents 5000
+"""
+
+import csv
+import os
+import pathlib
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import click
+from mapreduce.worker.compression import CODECS, open_intermediate
+from mapreduce.worker.tasks import write_lines
+
+
+PIPELINE_DIR = (pathlib.Path(__file__).parent.parent.parent /
+                "eecs485-p5-search-engine/inverted_index")
+
+
+def make_documents(pipeline_dir, path, ndocuments, seed=485):
+    """Write a CSV of documents drawing on the example input's words."""
+    with open(pipeline_dir/"example_input/input.csv",
+              encoding="utf-8") as infile:
+        words = [word for _, title, content in csv.reader(infile)
+                 for word in f"{title} {content}".split()]
+    rng = random.Random(seed)
+    with open(path, "w", encoding="utf-8", newline="") as outfile:
+        writer = csv.writer(outfile, quoting=csv.QUOTE_ALL)
+        for doc_id in range(1, ndocuments + 1):
+            writer.writerow([
+                doc_id, " ".join(rng.choices(words, k=4)),
+                " ".join(rng.choices(words, k=rng.randint(20, 200))),
+            ])
+
+
+def run(executable, input_path, output_path, workdir):
+    """Run a pipeline mapper or reducer from input_path to output_path."""
+    with open(input_path, encoding="utf-8") as infile, \
+            open(output_path, "w", encoding="utf-8") as outfile:
+        subprocess.run([sys.executable, executable], stdin=infile,
+                       stdout=outfile, cwd=workdir, check=True)
+
+
+def map_outputs(pipeline_dir, workdir, ndocuments):
+    """Run the pipeline, return the path of each job's sorted map output."""
+    shutil.copy(pipeline_dir/"stopwords.txt", workdir)
+    with open(f"{workdir}/total_document_count.txt", "w",
+              encoding="utf-8") as outfile:
+        outfile.write(f"{ndocuments}\n")
+    job_input = f"{workdir}/input.csv"
+    make_documents(pipeline_dir, job_input, ndocuments)
+    outputs = []
+    for job in range(1, 5):
+        mapped = f"{workdir}/map{job}"
+        run(pipeline_dir/f"map{job}.py", job_input, mapped, workdir)
+        with open(mapped, encoding="utf-8") as infile:
+            lines = sorted(infile)
+        write_lines(mapped, lines)
+        outputs.append(mapped)
+        job_input = f"{workdir}/output{job}"
+        run(pipeline_dir/f"reduce{job}.py", mapped, job_input, workdir)
+    return outputs
+
+
+def measure(path, codec, workdir):
+    """Return (bytes, compress seconds, decompress seconds) of codec."""
+    with open(path, encoding="utf-8") as infile:
+        lines = infile.readlines()
+    packed = f"{workdir}/packed"
+    start = time.process_time()
+    write_lines(packed, lines, codec)
+    compress = time.process_time() - start
+    start = time.process_time()
+    with open_intermediate(packed, codec=codec) as infile:
+        for _ in infile:
+            pass
+    decompress = time.process_time() - start
+    return os.path.getsize(packed), compress, decompress
+
+
+@click.command()
+@click.option("--documents", "ndocuments", default=5000,
+              help="Documents to index")
+@click.option("--pipeline-dir", default=PIPELINE_DIR,
+              type=click.Path(exists=True, file_okay=False,
+                              path_type=pathlib.Path),
+              help="Directory of the inverted index pipeline")
+def main(ndocuments, pipeline_dir):
+    """Compare the codecs on the map output of each pipeline job."""
+    with tempfile.TemporaryDirectory(prefix="mapreduce-bench-") as workdir:
+        outputs = map_outputs(pipeline_dir, workdir, ndocuments)
+        print(f"documents={ndocuments}")
+        print(f"{'job':>3} {'codec':>5} {'MiB':>8} {'ratio':>6} "
+              f"{'write s':>8} {'read s':>7}")
+        for job, path in enumerate(outputs, start=1):
+            plain = os.path.getsize(path)
+            for codec in (None, *CODECS):
+                nbytes, compress, decompress = measure(path, codec, workdir)
+                print(f"{job:>3} {codec or 'none':>5} {nbytes / 2**20:8.2f} "
+                      f"{plain / nbytes:6.2f} {compress:8.3f} "
+                      f"{decompress:7.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Benchmark merging a reduce task's input into its reducer.
+
+Compares the old text path, which decodes every line, merges them as str
+and writes them one at a time to a text pipe, with the bytes path, which
+merges raw lines and writes them to the reducer in big chunks.  Both feed
+`cat`, and their outputs must be identical.  The CPU time is the merging
+process's own, which is what a Worker spends.
+
+Run from the p4-mapreduce directory after installing the package.
+$ python benchmarks/bench_merge.py --inputs 20 --lines 100000
+"""
+
+import contextlib
+import filecmp
+import heapq
+import random
+import subprocess
+import tempfile
+import time
+import click
+from mapreduce.worker.merge import WRITE_BUFFER, merged_lines
+from mapreduce.worker.tasks import write_lines
+
+
+def make_inputs(tmpdir, ninputs, nlines):
+    """Write sorted word count style map outputs, return their paths."""
+    rand = random.Random(485)
+    words = [f"word{i}" for i in range(50000)] + ["café", "naïve", "日本"]
+    paths = []
+    for i in range(ninputs):
+        paths.append(f"{tmpdir}/maptask{i:05d}-part00000")
+        write_lines(paths[-1], sorted(f"{rand.choice(words)}\t1\n"
+                                      for _ in range(nlines)))
+    return paths
+
+
+def text_merge(paths, output_path):
+    """Merge the inputs into cat the old way, as text."""
+    with contextlib.ExitStack() as stack:
+        files = [stack.enter_context(open(path, encoding="utf8"))
+                 for path in paths]
+        with open(output_path, "a", encoding="utf8") as outfile:
+            with subprocess.Popen(["cat"], text=True, stdin=subprocess.PIPE,
+                                  stdout=outfile) as process:
+                for line in heapq.merge(*files):
+                    process.stdin.write(line)
+
+
+def bytes_merge(paths, output_path):
+    """Merge the inputs into cat as bytes."""
+    with contextlib.ExitStack() as stack:
+        lines = merged_lines(stack, paths)
+        with open(output_path, "ab") as outfile:
+            with subprocess.Popen(["cat"], stdin=subprocess.PIPE,
+                                  stdout=outfile,
+                                  bufsize=WRITE_BUFFER) as process:
+                process.stdin.writelines(lines)
+
+
+@click.command()
+@click.option("--inputs", "ninputs", default=20, help="Map outputs merged")
+@click.option("--lines", "nlines", default=100000, help="Lines per input")
+@click.option("--repeat", default=3, help="Runs of each path")
+def main(ninputs, nlines, repeat):
+    """Time the text and bytes merges of the same reduce input."""
+    with tempfile.TemporaryDirectory(prefix="mapreduce-bench-") as tmpdir:
+        paths = make_inputs(tmpdir, ninputs, nlines)
+        print(f"inputs={ninputs} lines/input={nlines}")
+        for name, merge in (("text", text_merge), ("bytes", bytes_merge)):
+            times, cpu_times = [], []
+            for i in range(repeat):
+                start, cpu_start = time.perf_counter(), time.process_time()
+                merge(paths, f"{tmpdir}/{name}{i}")
+                times.append(time.perf_counter() - start)
+                cpu_times.append(time.process_time() - cpu_start)
+            print(f"{name:>5}  wall min={min(times):.3f}s  "
+                  f"cpu min={min(cpu_times):.3f}s  "
+                  f"{1e9 * min(cpu_times) / (ninputs * nlines):.0f}"
+                  f"ns/line")
+        assert filecmp.cmp(f"{tmpdir}/text0", f"{tmpdir}/bytes0",
+                           shallow=False)
+        print("outputs identical")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+"""
+Benchmark map output lines partitioned per second by each partitioner.
+
+Run from the p4-mapreduce directory after installing the package.
+$ python benchmarks/bench_partition.py --lines 1000000 --partitions 100
+"""
+
+import random
+import time
+import click
+from mapreduce.worker.partition import make_partitioner
+
+
+def make_lines(nlines):
+    """Return word count style map output lines."""
+    rand = random.Random(485)
+    words = [f"word{i}" for i in range(50000)]
+    return [f"{rand.choice(words)}\t1\n" for _ in range(nlines)]
+
+
+@click.command()
+@click.option("--lines", "nlines", default=1000000, help="Lines to partition")
+@click.option("--partitions", "nparts", default=100, help="Partitions")
+def main(nlines, nparts):
+    """Time every built-in partitioner on the same lines."""
+    lines = make_lines(nlines)
+    boundaries = sorted(random.Random(0).sample(
+        [line.partition("\t")[0] for line in lines], nparts - 1
+    ))
+    print(f"lines={nlines} partitions={nparts}")
+    for name in ["md5", "fast", "range"]:
+        partition = make_partitioner(name, nparts, boundaries)
+        start = time.perf_counter()
+        for line in lines:
+            partition(line)
+        elapsed = time.perf_counter() - start
+        print(f"{name:<6} {nlines / elapsed / 1e6:6.2f}M lines/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Benchmark Python mapper startup overhead on many small input files.
+
+Runs the same Python word count mapper over every input file twice: once
+as a new interpreter per file, the way executables run, and once as a
+"module:function" callable in the Worker's pool of warm processes.
+
+Run from the p4-mapreduce directory after installing the package.
+$ python benchmarks/bench_pool.py --files 2000
+"""
+
+import os
+import pathlib
+import subprocess
+import sys
+import tempfile
+import time
+import click
+from mapreduce.worker.pool import new_pool, run_map
+
+
+EXEC_DIR = pathlib.Path(__file__).parent.parent/"tests/testdata/exec"
+
+# wc_callable.mapper as a stdin to stdout script
+SCRIPT = ("import sys, wc_callable; "
+          "sys.stdout.writelines(wc_callable.mapper(sys.stdin))")
+
+
+def make_inputs(input_dir, nfiles):
+    """Write nfiles tiny input files, return their paths."""
+    paths = []
+    for i in range(nfiles):
+        path = f"{input_dir}/file{i:05d}"
+        with open(path, "w", encoding="utf-8") as out:
+            out.write(f"hello world {i}\n")
+        paths.append(path)
+    return paths
+
+
+def run_processes(paths, output_path):
+    """Run the mapper as a new Python process per input file."""
+    env = {**os.environ, "PYTHONPATH": str(EXEC_DIR)}
+    for path in paths:
+        with open(path, encoding="utf-8") as infile, \
+                open(output_path, "w", encoding="utf-8") as outfile:
+            subprocess.run([sys.executable, "-c", SCRIPT], stdin=infile,
+                           stdout=outfile, env=env, check=True)
+
+
+def run_pool(paths, output_path, pool):
+    """Run the mapper as a callable in a warm pool process."""
+    for path in paths:
+        pool.submit(run_map, "wc_callable:mapper", path,
+                    output_path).result()
+
+
+@click.command()
+@click.option("--files", "nfiles", default=2000, help="Input files")
+def main(nfiles):
+    """Time a new process per input against the warm pool."""
+    sys.path.insert(0, str(EXEC_DIR))
+    with tempfile.TemporaryDirectory() as tmpdir:
+        paths = make_inputs(tmpdir, nfiles)
+        output_path = f"{tmpdir}/output"
+
+        start = time.perf_counter()
+        run_processes(paths, output_path)
+        processes = time.perf_counter() - start
+
+        with new_pool(1) as pool:
+            # the first task pays for starting the pool
+            start = time.perf_counter()
+            run_pool(paths, output_path, pool)
+            pooled = time.perf_counter() - start
+
+    print(f"files={nfiles}")
+    print(f"process per file  {processes:.2f}s  "
+          f"{1000 * processes / nfiles:.2f}ms/file")
+    print(f"warm pool         {pooled:.2f}s  "
+          f"{1000 * pooled / nfiles:.2f}ms/file")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+Benchmark the Manager's CPU cost of thousands of heartbeating Workers.
+
+Starts a real Manager process, registers simulated Workers with it, then
+sends each Worker's heartbeat every 2 seconds for a while and measures the
+CPU time the Manager spends.  Simulated Workers have distinct loopback
+addresses, 127.0.X.Y, and share one port, on which a single listener
+accepts the Manager's register_ack and shutdown messages for all of them.
+
+Run from the p4-mapreduce directory after installing the package.
+$ python benchmarks/bench_registry.py --workers 2000 --seconds 10
+"""
+
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+import click
+
+
+def free_port():
+    """Return a TCP port nobody is listening on."""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("localhost", 0))
+        return sock.getsockname()[1]
+
+
+def worker_host(i):
+    """Return the loopback address of simulated Worker i."""
+    return f"127.0.{i // 250 + 1}.{i % 250 + 1}"
+
+
+def cpu_seconds(pid):
+    """Return the user plus system CPU seconds used by process pid."""
+    with open(f"/proc/{pid}/stat", encoding="utf-8") as stat:
+        fields = stat.read().rsplit(")", 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+
+def send(port, message):
+    """Send one JSON message to the Manager."""
+    with socket.create_connection(("localhost", port)) as sock:
+        sock.sendall(json.dumps(message).encode("utf-8"))
+
+
+class Listener:
+    """Count the messages sent to the simulated Workers."""
+
+    def __init__(self, port):
+        """Start accepting connections on every address at port."""
+        self.count = 0
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.sock.bind(("0.0.0.0", port))
+        self.sock.listen(socket.SOMAXCONN)
+        threading.Thread(target=self.accept, daemon=True).start()
+
+    def accept(self):
+        """Read and count each message."""
+        while True:
+            conn, _ = self.sock.accept()
+            with conn:
+                while conn.recv(4096):
+                    pass
+            self.count += 1
+
+    def wait_for(self, count, timeout=120):
+        """Wait until count messages have arrived."""
+        deadline = time.monotonic() + timeout
+        while self.count < count:
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"{self.count} of {count} messages")
+            time.sleep(0.05)
+
+
+@click.command()
+@click.option("--workers", "nworkers", default=2000,
+              help="Simulated Workers")
+@click.option("--seconds", default=10, help="Seconds of heartbeats")
+@click.option("--engine", type=click.Choice(["threads", "asyncio"]),
+              default="threads", help="Manager engine")
+def main(nworkers, seconds, engine):
+    """Measure Manager CPU while nworkers send heartbeats."""
+    manager_port, worker_port = free_port(), free_port()
+    listener = Listener(worker_port)
+    args = [sys.executable, "-c",
+            "from mapreduce.manager.__main__ import main; main()",
+            "--port", str(manager_port), "--loglevel", "warning"]
+    if engine != "threads":
+        args += ["--engine", engine]
+    with subprocess.Popen(args) as manager:
+        while True:
+            try:
+                send(manager_port, {"message_type": "noop"})
+                break
+            except ConnectionRefusedError:
+                time.sleep(0.1)
+
+        for i in range(nworkers):
+            send(manager_port, {
+                "message_type": "register",
+                "worker_host": worker_host(i),
+                "worker_port": worker_port,
+            })
+        listener.wait_for(nworkers)
+
+        heartbeats = [json.dumps({
+            "message_type": "heartbeat",
+            "worker_host": worker_host(i),
+            "worker_port": worker_port,
+        }).encode("utf-8") for i in range(nworkers)]
+        cpu_start = cpu_seconds(manager.pid)
+        start = time.monotonic()
+        sent = 0
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as udp:
+            # every Worker beats every 2 seconds, spread over the interval
+            while time.monotonic() - start < seconds:
+                due = int((time.monotonic() - start) * nworkers / 2)
+                while sent < due:
+                    udp.sendto(heartbeats[sent % nworkers],
+                               ("localhost", manager_port))
+                    sent += 1
+                time.sleep(0.001)
+        elapsed = time.monotonic() - start
+        cpu = cpu_seconds(manager.pid) - cpu_start
+
+        send(manager_port, {"message_type": "shutdown"})
+        listener.wait_for(2 * nworkers)
+        manager.wait()
+
+    print(f"engine={engine} workers={nworkers} heartbeats={sent}")
+    print(f"manager cpu  {cpu:.2f}s in {elapsed:.1f}s  "
+          f"{100 * cpu / elapsed:.1f}%  "
+          f"{1e6 * cpu / sent:.1f}us/heartbeat")
+
+
+if __name__ == "__main__":
+    main()
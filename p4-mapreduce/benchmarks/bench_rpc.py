@@ -0,0 +1,131 @@
+"""
+Benchmark Manager message throughput from many simulated Workers.
+
+Simulated Workers, threads of a separate process, each send the same number of small status messages to
+one listener running the Manager's receive loop, first as plain JSON over
+a new connection per message, then as frames over one persistent
+connection per Worker.  The listener is either the threaded engine's,
+with a thread per persistent connection, or the asyncio engine's.
+
+Run from the p4-mapreduce directory after installing the package.
+$ python benchmarks/bench_rpc.py --workers 100 --messages 100
+$ python benchmarks/bench_rpc.py --workers 2000 --messages 10 \
+    --engine asyncio
+"""
+
+import asyncio
+import multiprocessing
+import socket
+import threading
+import time
+import click
+from mapreduce.utils import receive_messages
+from mapreduce.utils.aio import read_messages
+from mapreduce.utils.framing import Messenger
+
+
+def listen_threads(sock, handle, done):
+    """Receive messages on sock with the threaded engine until done."""
+    sock.settimeout(1)
+    receive_messages(sock, Messenger(), handle, done.is_set)
+
+
+def listen_asyncio(sock, handle, done):
+    """Receive messages on sock with the asyncio engine until done."""
+    async def serve():
+        async def on_connection(reader, writer):
+            await read_messages(reader, handle)
+            writer.close()
+
+        server = await asyncio.start_server(on_connection, sock=sock,
+                                            backlog=socket.SOMAXCONN)
+        while not done.is_set():
+            await asyncio.sleep(0.01)
+        server.close()
+
+    asyncio.run(serve())
+
+
+def run(nworkers, nmessages, framed, listen):
+    """Receive nmessages from each of nworkers.
+
+    Return the seconds it took and the most threads the receiver used.
+    """
+    total = nworkers * nmessages
+    received = []
+    done = threading.Event()
+    threads = [threading.active_count()]
+
+    def handle(message):
+        received.append(message)
+        threads.append(threading.active_count())
+        if len(received) == total:
+            done.set()
+
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind(("localhost", 0))
+        sock.listen(socket.SOMAXCONN)
+        receiver = threading.Thread(target=listen,
+                                    args=(sock, handle, done))
+        receiver.start()
+        senders = multiprocessing.Process(target=simulate_workers, args=(
+            sock.getsockname(), nworkers, nmessages, framed,
+        ))
+        start = time.perf_counter()
+        senders.start()
+        done.wait()
+        elapsed = time.perf_counter() - start
+        senders.join()
+        receiver.join()
+    return elapsed, max(threads)
+
+
+def simulate_workers(address, nworkers, nmessages, framed):
+    """Send nmessages to address from each of nworkers threads.
+
+    Like real Workers, every simulated Worker keeps its persistent
+    connection open until they are all done.
+    """
+    all_sent = threading.Barrier(nworkers)
+
+    def worker(worker_id):
+        messenger = Messenger()
+        for task_id in range(nmessages):
+            messenger.send(address, {
+                "message_type": "finished",
+                "task_id": task_id,
+                "worker_host": "localhost",
+                "worker_port": worker_id,
+            }, framed=framed)
+        all_sent.wait()
+        messenger.close()
+
+    workers = [threading.Thread(target=worker, args=(i,))
+               for i in range(nworkers)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+
+
+@click.command()
+@click.option("--workers", "nworkers", default=100, help="Simulated Workers")
+@click.option("--messages", "nmessages", default=100,
+              help="Messages per Worker")
+@click.option("--engine", type=click.Choice(["threads", "asyncio"]),
+              default="threads", help="Engine receiving the messages")
+def main(nworkers, nmessages, engine):
+    """Time one-shot JSON connections against persistent framed ones."""
+    total = nworkers * nmessages
+    listen = listen_asyncio if engine == "asyncio" else listen_threads
+    print(f"engine={engine} workers={nworkers} messages={total}")
+    for name, framed in [("json per connection", False),
+                         ("framed persistent", True)]:
+        elapsed, threads = run(nworkers, nmessages, framed, listen)
+        print(f"{name:20}  {elapsed:6.2f}s  {total / elapsed:8,.0f} msg/s  "
+              f"{threads:5} threads")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+Benchmark end-to-end job latency for jobs made of many tiny tasks.
+
+Each task does almost no work, so the wall time is dominated by how quickly
+the Manager hands the next task to a Worker that just became ready.
+
+Run from the p4-mapreduce directory after installing the package.
+$ python benchmarks/bench_scheduler.py --workers 4 --tasks 200
+"""
+
+import contextlib
+import json
+import os
+import pathlib
+import shutil
+import socket
+import statistics
+import subprocess
+import tempfile
+import time
+import click
+
+
+EXEC_DIR = pathlib.Path(__file__).parent.parent/"tests/testdata/exec"
+
+# Give up on a job after this many seconds
+JOB_TIMEOUT = 120
+
+
+def get_open_ports(nports):
+    """Return a list of nports ports available on localhost."""
+    with contextlib.ExitStack() as stack:
+        socks = [stack.enter_context(socket.socket()) for _ in range(nports)]
+        for sock in socks:
+            sock.bind(("", 0))
+        return [sock.getsockname()[1] for sock in socks]
+
+
+def wait_for_port(port, timeout=10):
+    """Return once something is listening on localhost:port."""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        with socket.socket() as sock:
+            if sock.connect_ex(("localhost", port)) == 0:
+                return
+        time.sleep(0.05)
+    raise RuntimeError(f"Nothing listening on port {port}")
+
+
+def send_message(message, port):
+    """Send a JSON message to localhost:port."""
+    with socket.socket() as sock:
+        sock.connect(("localhost", port))
+        sock.sendall(json.dumps(message).encode("utf-8"))
+
+
+@contextlib.contextmanager
+def cluster(nworkers, shared_dir, manager_args=(), worker_args=()):
+    """Start a Manager and nworkers Workers, yield the Manager port."""
+    manager_port, *worker_ports = get_open_ports(1 + nworkers)
+    with contextlib.ExitStack() as stack:
+        stack.enter_context(subprocess.Popen([
+            shutil.which("mapreduce-manager"),
+            "--port", str(manager_port),
+            "--loglevel", "warning",
+            "--shared_dir", shared_dir,
+            *manager_args,
+        ]))
+        wait_for_port(manager_port)
+        for port in worker_ports:
+            stack.enter_context(subprocess.Popen([
+                shutil.which("mapreduce-worker"),
+                "--port", str(port),
+                "--manager-port", str(manager_port),
+                "--loglevel", "warning",
+                *worker_args,
+            ]))
+            wait_for_port(port)
+        try:
+            yield manager_port
+        finally:
+            send_message({"message_type": "shutdown"}, manager_port)
+
+
+def make_inputs(input_dir, ntasks):
+    """Write one tiny input file per map task."""
+    os.makedirs(input_dir)
+    for i in range(ntasks):
+        with open(f"{input_dir}/file{i:05d}", "w", encoding="utf-8") as out:
+            out.write(f"hello world {i}\n")
+
+
+def run_job(manager_port, input_dir, output_dir, ntasks, nreducers):
+    """Submit one job and return its wall time in seconds."""
+    start = time.perf_counter()
+    send_message({
+        "message_type": "new_manager_job",
+        "input_directory": input_dir,
+        "output_directory": output_dir,
+        "mapper_executable": str(EXEC_DIR/"wc_map.sh"),
+        "reducer_executable": str(EXEC_DIR/"wc_reduce.sh"),
+        "num_mappers": ntasks,
+        "num_reducers": nreducers,
+    }, manager_port)
+    parts = [f"{output_dir}/part-{i:05d}" for i in range(nreducers)]
+    while not all(os.path.exists(part) for part in parts):
+        if time.perf_counter() - start > JOB_TIMEOUT:
+            raise RuntimeError(f"Job did not finish within {JOB_TIMEOUT}s")
+        time.sleep(0.005)
+    return time.perf_counter() - start
+
+
+@click.command()
+@click.option("--workers", "nworkers", default=4, help="Number of Workers")
+@click.option("--tasks", "ntasks", default=200, help="Map tasks per job")
+@click.option("--reducers", "nreducers", default=4, help="Reduce tasks")
+@click.option("--jobs", "njobs", default=3, help="Jobs to time")
+def main(nworkers, ntasks, nreducers, njobs):
+    """Time jobs of many tiny tasks on a local cluster."""
+    with tempfile.TemporaryDirectory(prefix="mapreduce-bench-") as tmpdir:
+        input_dir = f"{tmpdir}/input"
+        make_inputs(input_dir, ntasks)
+        with cluster(nworkers, tmpdir) as manager_port:
+            times = [
+                run_job(manager_port, input_dir, f"{tmpdir}/output{i}",
+                        ntasks, nreducers)
+                for i in range(njobs)
+            ]
+    tasks = ntasks + nreducers
+    print(f"workers={nworkers} tasks/job={tasks} jobs={njobs}")
+    print(f"job latency   median={statistics.median(times):.3f}s "
+          f"min={min(times):.3f}s max={max(times):.3f}s")
+    print(f"per task      {1000 * statistics.median(times) / tasks:.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Benchmark job wall time with reduce tasks starting during the map phase.
+
+One map task of the job is a straggler, sleeping before it maps.  Reduce
+tasks that start once --slowstart of the map tasks have finished fetch and
+merge the other map outputs meanwhile, so only the straggler's output is
+left to merge when it lands.
+
+Run from the p4-mapreduce directory after installing the package.
+$ python benchmarks/bench_slowstart.py --workers 4 --tasks 16 --slowstart 0.5
+"""
+
+import os
+import stat
+import statistics
+import tempfile
+import time
+import click
+from bench_scheduler import cluster, send_message, JOB_TIMEOUT
+
+
+# A word count mapper that sleeps first if its input starts with "slow"
+MAPPER = """#!/bin/sh
+IFS= read -r first
+if [ "$first" = slow ]; then sleep {sleep}; first=""; fi
+{{ [ -n "$first" ] && echo "$first"; cat; }} | tr -s ' ' '\\n' | sed 's/$/\\t1/'
+"""
+
+
+def make_inputs(input_dir, ntasks, nlines):
+    """Write one input file per map task, the first of them slow."""
+    os.makedirs(input_dir)
+    for i in range(ntasks):
+        with open(f"{input_dir}/file{i:05d}", "w", encoding="utf-8") as out:
+            if i == 0:
+                out.write("slow\n")
+            out.writelines(f"word{(i * nlines + j) % 9973} {j}\n"
+                           for j in range(nlines))
+
+
+def make_mapper(path, sleep):
+    """Write the mapper, which sleeps on the slow input."""
+    with open(path, "w", encoding="utf-8") as out:
+        out.write(MAPPER.format(sleep=sleep))
+    os.chmod(path, os.stat(path).st_mode | stat.S_IXUSR)
+
+
+def run_job(manager_port, tmpdir, output_dir, ntasks, nreducers):
+    """Submit one job and return its wall time in seconds."""
+    start = time.perf_counter()
+    send_message({
+        "message_type": "new_manager_job",
+        "input_directory": f"{tmpdir}/input",
+        "output_directory": output_dir,
+        "mapper_executable": f"{tmpdir}/map.sh",
+        "reducer_executable": "cat",
+        "num_mappers": ntasks,
+        "num_reducers": nreducers,
+    }, manager_port)
+    parts = [f"{output_dir}/part-{i:05d}" for i in range(nreducers)]
+    while not all(os.path.exists(part) for part in parts):
+        if time.perf_counter() - start > JOB_TIMEOUT:
+            raise RuntimeError(f"Job did not finish within {JOB_TIMEOUT}s")
+        time.sleep(0.01)
+    return time.perf_counter() - start
+
+
+@click.command()
+@click.option("--workers", "nworkers", default=4, help="Number of Workers")
+@click.option("--tasks", "ntasks", default=16, help="Map tasks per job")
+@click.option("--reducers", "nreducers", default=2, help="Reduce tasks")
+@click.option("--lines", "nlines", default=50000, help="Lines per input")
+@click.option("--sleep", default=5.0, help="Seconds the straggler sleeps")
+@click.option("--slowstart", default=0.5,
+              help="Fraction of map tasks done before reduce tasks start")
+@click.option("--jobs", "njobs", default=3, help="Jobs to time")
+def main(nworkers, ntasks, nreducers, nlines, sleep, slowstart, njobs):
+    """Time jobs with a straggling map task, without and with slow start."""
+    with tempfile.TemporaryDirectory(prefix="mapreduce-bench-") as tmpdir:
+        make_inputs(f"{tmpdir}/input", ntasks, nlines)
+        make_mapper(f"{tmpdir}/map.sh", sleep)
+        for fraction in (1.0, slowstart):
+            with cluster(nworkers, tmpdir, manager_args=[
+                "--reduce-slowstart", str(fraction),
+            ]) as manager_port:
+                times = [
+                    run_job(manager_port, tmpdir,
+                            f"{tmpdir}/output-{fraction}-{i}",
+                            ntasks, nreducers)
+                    for i in range(njobs)
+                ]
+            print(f"slowstart={fraction:.2f} workers={nworkers} "
+                  f"tasks={ntasks} reducers={nreducers}  "
+                  f"median={statistics.median(times):.2f}s "
+                  f"min={min(times):.2f}s max={max(times):.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Benchmark sorting map output into partitions.
+
+Compares the old path, appending lines to one unsorted file per partition
+and then running one `sort -o` process per partition, with the in-memory
+SortBuffer, which only spills to disk when its memory limit is hit.
+
+Run from the p4-mapreduce directory after installing the package.
+$ python benchmarks/bench_sort.py --lines 500000
+"""
+
+import contextlib
+import random
+import subprocess
+import tempfile
+import time
+import zlib
+import click
+from mapreduce.worker.spill import SortBuffer
+
+
+def make_lines(nlines):
+    """Return word count style map output lines."""
+    rand = random.Random(485)
+    words = [f"word{i}" for i in range(50000)]
+    return [f"{rand.choice(words)}\t1\n" for _ in range(nlines)]
+
+
+def partition_of(line, nparts):
+    """Return the partition of a line."""
+    return zlib.crc32(line.partition("\t")[0].encode()) % nparts
+
+
+def external_sort(lines, parts, nparts, tmpdir):
+    """Sort lines the old way, with one sort process per partition."""
+    with contextlib.ExitStack() as stack:
+        outputs = [
+            stack.enter_context(open(f"{tmpdir}/unsorted{i:05d}", "a+",
+                                     encoding="utf-8"))
+            for i in range(nparts)
+        ]
+        for line, part in zip(lines, parts):
+            outputs[part].write(line)
+    for i in range(nparts):
+        subprocess.run(["sort", "-o", f"{tmpdir}/sorted{i:05d}",
+                        f"{tmpdir}/unsorted{i:05d}"], check=True)
+
+
+def buffer_sort(lines, parts, nparts, tmpdir, memory_limit):
+    """Sort lines in-process with a SortBuffer."""
+    buffer = SortBuffer(nparts, tmpdir, memory_limit)
+    for line, part in zip(lines, parts):
+        buffer.add(part, line)
+    for i in range(nparts):
+        with open(f"{tmpdir}/sorted{i:05d}", "w", encoding="utf-8") as out:
+            out.writelines(buffer.sorted_lines(i))
+    return buffer.spills
+
+
+def timed(function, *args):
+    """Return the result of function(*args) and its wall time."""
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+@click.command()
+@click.option("--lines", "nlines", default=500000, help="Map output lines")
+@click.option("--partitions", "partition_counts", default=[1, 10, 100],
+              multiple=True, help="Partition counts to try")
+@click.option("--buffer-mb", "buffer_mb", default=32,
+              help="SortBuffer memory limit in MiB")
+def main(nlines, partition_counts, buffer_mb):
+    """Time the external sort and the SortBuffer."""
+    lines = make_lines(nlines)
+    print(f"lines={nlines} buffer={buffer_mb}MiB")
+    for nparts in partition_counts:
+        parts = [partition_of(line, nparts) for line in lines]
+        with tempfile.TemporaryDirectory() as tmpdir:
+            _, external = timed(external_sort, lines, parts, nparts, tmpdir)
+        with tempfile.TemporaryDirectory() as tmpdir:
+            spills, in_memory = timed(buffer_sort, lines, parts, nparts,
+                                      tmpdir, buffer_mb << 20)
+        print(f"partitions={nparts:<4} sort processes {external:.3f}s  "
+              f"sort buffer {in_memory:.3f}s ({spills} spills)  "
+              f"speedup {external / in_memory:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -7,31 +7,95 @@ import glob
 import tempfile
 import logging
 import json
-import time
 import click
-from mapreduce.utils import get_message
+from mapreduce.utils import receive_messages
+from mapreduce.utils.framing import Messenger
+from mapreduce.manager.aio import ManagerLoop
+from mapreduce.manager.journal import Journal
+from mapreduce.manager.locality import map_inputs
+from mapreduce.manager.registry import (
+    MISSED_PINGS, PING_INTERVAL, WorkerRegistry, worker_key,
+)
+from mapreduce.manager.scheduler import Scheduler
+from mapreduce.manager.shuffle import add_map_outputs, announcements
+from mapreduce.manager.status import (
+    STATUS_MESSAGES, job_status, reply_address, status_reply,
+)
+from mapreduce.manager.splits import split_inputs, balance
 
 
 # Configure logging
 LOGGER = logging.getLogger(__name__)
 
+# Tunables, each of which can be set from the command line
+DEFAULT_OPTIONS = {
+    # Jobs allowed to run at once.  Workers left idle by one job's reduce
+    # stragglers pick up map tasks from the next.
+    "max_concurrent_jobs": 1,
+    # A task running this many times longer than the median finished task
+    # of its phase gets a backup attempt on an idle worker.  0 disables
+    # speculative execution.
+    "speculative_slowdown": 2.0,
+    # Never start a backup attempt of a task running less than this long.
+    # Longer than a Worker takes to be declared dead (5 missed heartbeats),
+    # so a silent Worker's task is rescheduled rather than backed up.
+    "speculative_min_runtime": 15.0,
+    # "threads" runs blocking sockets on threads, "asyncio" runs every
+    # socket and timer on one event loop
+    "engine": "threads",
+    # "shared" passes map outputs through the job's shared directory.
+    # "direct" keeps them on Workers running a shuffle server, which
+    # reducers fetch them from, starting before the map phase is over.
+    "shuffle": "shared",
+    # Fraction of a job's map tasks that must finish before its reduce
+    # tasks start, fetching and merging map outputs as they are written.
+    # At 1.0 they wait for the map phase to be over, except in a direct
+    # shuffle, where they also start once no map task waits for a Worker.
+    "reduce_slowstart": 1.0,
+    # While map tasks wait for a Worker, reduce tasks started early take
+    # at most this fraction of the live Workers.
+    "reduce_rampup": 0.5,
+    # File journaling jobs and finished tasks.  A Manager restarted on it
+    # resumes the jobs that did not finish, running only the tasks whose
+    # output was lost.  None keeps no journal.
+    "journal": None,
+}
+
 
 class Manager:
     """Represent a MapReduce framework Manager node."""
 
-    def __init__(self, host, port):
+    def __init__(self, host, port, options=None):
         """Construct a Manager instance and start listening for messages."""
         self.shutdown = False
         self.ht_pt = (host, int(port))
-        self.workers = []   # list for workers
-        self.jobs_queue = []
-        self.job_id = -1
-        self.tasks = []
-        self.assigned_tasks = {}
+        self.workers = WorkerRegistry()
+        self.options = {**DEFAULT_OPTIONS, **(options or {})}
+        self.scheduler = Scheduler(self.workers, self.options)
+        self.messenger = Messenger()
         LOGGER.info(
             "Starting manager host=%s port=%s pwd=%s",
+            host, port, os.getcwd(),
         )
+        # assigns job ids, and resumes the jobs a previous Manager left
+        self.journal = Journal(self.options["journal"])
+        for journaled in self.journal.jobs.values():
+            LOGGER.info("Resuming job %d from journal %s",
+                        journaled.job_id, self.options["journal"])
+            self.scheduler.add_job(journaled.spec)
+
+        if self.options["engine"] == "asyncio":
+            engine = ManagerLoop(self)
+            self.messenger = engine.messenger
+            engine.run()
+        else:
+            self.run_threads()
 
+        self.journal.close()
+        LOGGER.info("Manager shutting down")
+
+    def run_threads(self):
+        """Run the Manager on blocking sockets, one thread each."""
         hb_thread = threading.Thread(target=self.listen_hb)
         hb_thread.start()
         runjob_thread = threading.Thread(target=self.run_job)
@@ -44,8 +108,6 @@ class Manager:
         runjob_thread.join()
         ping_thread.join()
 
-        LOGGER.info("Manager shutting down")
-
     def run_socket(self):
         """Create a new TCP socket and handle any incoming messages."""
         with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
@@ -56,76 +118,74 @@ class Manager:
             # Socket accept() will block for a maximum of 1 second.  If you
             # omit this, it blocks indefinitely, waiting for a connection.
             sock.settimeout(1)
-            while not self.shutdown:
-                # Wait for a connection for 1s.  The socket library avoids
-                # consuming CPU while waiting for a connection.
-                try:
-                    message = get_message(sock)
-                except socket.timeout:
-                    continue
-                except json.JSONDecodeError:
-                    continue
-                LOGGER.debug("Manager TCP recv\n%s",
-                             json.dumps(message, indent=2))
-
-                if message["message_type"] == "shutdown":
-                    self.shutdown_func(message)
-                elif message["message_type"] == "register":
-                    self.register_helper_func(message)
-                elif message["message_type"] == "new_manager_job":
-                    self.new_manager_job_func(message)
-                elif message["message_type"] == "finished":
-                    self.finished_func(message)
+            receive_messages(sock, self.messenger, self.handle,
+                             lambda: self.shutdown)
+
+    def handle(self, message):
+        """Handle one message received over TCP."""
+        LOGGER.debug("Manager TCP recv\n%s", json.dumps(message, indent=2))
+        if message["message_type"] == "shutdown":
+            self.shutdown_func(message)
+        elif message["message_type"] == "register":
+            self.register_helper_func(message)
+        elif message["message_type"] == "new_manager_job":
+            self.new_manager_job_func(message)
+        elif message["message_type"] == "finished":
+            self.finished_func(message)
+        elif message["message_type"] in STATUS_MESSAGES:
+            address = reply_address(message)
+            reply = status_reply(message, address, self.journal,
+                                 self.scheduler)
+            if reply is not None:
+                self.messenger.post(address, reply)
+
+    def send(self, worker, message, on_sent=None, on_refused=None):
+        """Send message to worker.
+
+        Call on_sent() once it is delivered, or on_refused() if the worker
+        is down.  The asyncio engine sends in the background and calls
+        them later.
+        """
+        self.messenger.post((worker["host"], worker["port"]), message,
+                            worker.get("protocol") == "framed",
+                            on_sent, on_refused)
 
     def shutdown_func(self, message):
         """Shutdown function for run_socket."""
         self.shutdown = True
+        self.scheduler.stop()
         # forward the message and shut down the workers
         for worker in self.workers:
             if worker["state"] != "dead":
-                with (socket.socket(socket.AF_INET,
-                                    socket.SOCK_STREAM) as
-                        shutdown_sock):
-                    try:
-                        shutdown_sock.connect((worker["host"],
-                                               worker["port"]))
-                        shutdown_sock.sendall(json.dumps(message).
-                                              encode('utf-8'))
-                    except ConnectionRefusedError:
-                        pass
+                self.send(worker, message)
 
     def register_helper_func(self, message_dict):
         """Register function for run_socket."""
         # first, check if the worker is a previously dead worker
         # re-registering
-        worker_exists = False
-        for worker in self.workers:
-            if (worker["host"] == message_dict["worker_host"] and
-                    worker["port"] == message_dict["worker_port"]):
-                worker_exists = True
-                worker["state"] = "ready"
-                break
-
-        if not worker_exists:
-            new_worker = {
+        worker = self.find_worker(message_dict)
+        if worker is None:
+            worker = {
                 "host": message_dict["worker_host"],
                 "port": message_dict["worker_port"],
                 "state": "ready",
-                "pings": 0,
             }
-            self.workers.append(new_worker)
+            self.workers.add(worker)
+        else:
+            self.workers.seen(worker)
+        # where the worker's local disks hold input files
+        worker["data_dirs"] = [os.path.realpath(data_dir) for data_dir in
+                               message_dict.get("data_dirs", [])]
+        # a Worker registering again may have changed protocol
+        worker["protocol"] = message_dict.get("protocol", "json")
+        worker["shuffle_port"] = message_dict.get("shuffle_port")
 
         # send the registering worker with ack message
-        with socket.socket(socket.AF_INET,
-                           socket.SOCK_STREAM) as ack_sock:
-            message_dict["message_type"] = "register_ack"
-            try:
-                ack_sock.connect((message_dict["worker_host"],
-                                  message_dict["worker_port"]))
-                ack_sock.sendall(json.dumps(message_dict).
-                                 encode('utf-8'))
-            except ConnectionRefusedError:
-                self.workers[-1]["state"] = "dead"
+        message_dict["message_type"] = "register_ack"
+        # wake the scheduler only once the worker can accept tasks
+        self.send(worker, message_dict,
+                  on_sent=lambda: self.scheduler.ready(worker),
+                  on_refused=lambda: self.scheduler.dead(worker))
 
     def new_manager_job_func(self, message_dict):
         """Handle new manager job funcion for run_socket."""
@@ -134,25 +194,38 @@ class Manager:
         if os.path.isdir(output_dir):
             shutil.rmtree(output_dir)
         os.mkdir(output_dir)
-        # add the job to queue and increment assigned jobid
-        self.job_id += 1
-        message_dict["id"] = self.job_id
-        self.jobs_queue.append(message_dict)
+        # assign the next job id, and journal the job before queueing it
+        self.journal.job(message_dict, reply_address(message_dict))
+        self.scheduler.add_job(message_dict)
 
     def finished_func(self, message_dict):
         """Finished function for run_socket."""
-        for worker in self.workers:
-            if (worker["host"] == message_dict["worker_host"]
-                    and worker["port"]
-                    == message_dict["worker_port"]):
-                self.assigned_tasks.pop(worker["host"]
-                                        + str(worker["port"]))
-                worker["state"] = "ready"
-                break
+        worker = self.find_worker(message_dict)
+        if worker is None:
+            return
+        completed = self.scheduler.finished(
+            worker, message_dict["task_id"], message_dict.get("counters"),
+            message_dict.get("partition_bytes"),
+        )
+        if completed is None:
+            return
+        job, phase, task = completed
+        # map outputs kept on a Worker for a direct shuffle may not outlive
+        # it, so only those in the shared directory count as safe
+        if phase.name == "reduce" or task["id"] not in job.intermediate.sizes:
+            self.journal.task(job.job_id, phase.name, task["id"],
+                              worker_key(worker))
+
+    def find_worker(self, message_dict):
+        """Return the worker that sent message_dict, or None."""
+        return self.workers.find(message_dict["worker_host"],
+                                 message_dict["worker_port"])
 
     def listen_hb(self):
         """Listen for UDP heartbeat messages from the Workers."""
         with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as hb_sock:
+            hb_sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            hb_sock.bind((self.ht_pt[0], self.ht_pt[1]))
             hb_sock.settimeout(1)
             while not self.shutdown:
                 try:
@@ -160,132 +233,229 @@ class Manager:
                     message_dict = json.loads(message.decode("utf-8"))
                 except socket.timeout:
                     continue
-                # reset the pings
-                for worker in self.workers:
-                    if (worker["host"] == message_dict["worker_host"] and
-                            worker["port"] == message_dict["worker_port"]):
-                        worker["pings"] = 0
-                        if worker["state"] == "dead":
-                            worker["state"] = "ready"
+                self.heartbeat(message_dict)
+
+    def heartbeat(self, message_dict):
+        """Record a heartbeat from a worker, reviving it if it was dead."""
+        worker = self.find_worker(message_dict)
+        if worker is not None:
+            self.workers.seen(worker)
+            if worker["state"] == "dead":
+                self.scheduler.ready(worker)
 
     def increase_pings(self):
-        """Increase each workers' pings every 2 seconds."""
+        """Look for dead workers every PING_INTERVAL seconds."""
         while not self.shutdown:
-            for worker in self.workers:
-                worker["pings"] += 1
-                if worker["pings"] == 5:
-                    LOGGER.info("Worker %s %s died.", worker["host"],
-                                worker["port"])
-                    if worker["state"] == "busy":
-                        # push the task back to the tasks queue
-                        self.tasks.append(self.assigned_tasks.
-                                          pop(worker["host"]
-                                              + str(worker["port"])))
-                    worker["state"] = "dead"
-            time.sleep(2)
+            self.check_pings()
+            if self.scheduler.sleep(PING_INTERVAL):
+                break
+
+    def check_pings(self):
+        """Declare dead the workers silent for MISSED_PINGS intervals."""
+        for worker in self.workers.silent(MISSED_PINGS * PING_INTERVAL):
+            LOGGER.info("Worker %s %s died.", worker["host"],
+                        worker["port"])
+            # push its task, if any, back to the tasks queue
+            self.scheduler.dead(worker)
+        # let the scheduler look for stragglers to back up
+        self.scheduler.notify()
 
     def run_job(self):
-        """Try to run job in the jobs queues."""
-        while not self.shutdown:
-            # avoid busy-waiting
-            time.sleep(0.1)
-            if len(self.jobs_queue) > 0:
-                # partition the input of the mapping job
-                job = self.jobs_queue[0]
-                input_dir = job["input_directory"]
-                files = glob.glob(input_dir + "/*")
-                files.sort()
-                self.tasks = [{
-                    "id": i,
-                    "files": [],
-                } for i in range(job["num_mappers"])]
-                for i, file in enumerate(files):
-                    (self.tasks[i % job["num_mappers"]]["files"].
-                     append(file))
-
-                # create a shared directory for temporary intermediate files
-                prefix = f"mapreduce-shared-job{self.job_id:05d}-"
-                with tempfile.TemporaryDirectory(prefix=prefix) as tmpdir:
-                    LOGGER.info("Created tmpdir %s", tmpdir)
-                    if len(self.workers) > 0:
-                        # assign mapping tasks to workers
-                        self.assigned_tasks = {}
-                        self.assign_job("map", job, tmpdir)
-                        # partition the input of the reduce job
-                        files = glob.glob(str(tmpdir) + "/*")
-                        files.sort()
-                        self.tasks = [{
-                            "id": i,
-                            "files": [],
-                        } for i in range(job["num_reducers"])]
-                        for file in files:
-                            self.tasks[int(file[-5:])]["files"].append(file)
-                        # assign reducing tasks to workers
-                        self.assigned_tasks = {}
-                        self.assign_job("reduce", job, tmpdir)
-                        self.jobs_queue.pop(0)
-                    else:
-                        # if there are no workers, skip this job
-                        LOGGER.info("Workers do not exist")
-                        time.sleep(2)
-
-                LOGGER.info("Cleaned up tmpdir %s", tmpdir)
-
-    def assign_job(self, job_type, job, tmpdir):
-        """Assign tasks to workers."""
-        while not self.shutdown and len(self.tasks) > 0:
-            task = self.tasks[0]
-            found_worker = False
+        """Start jobs, advance their phases and assign their tasks."""
+        while True:
+            # block until there is something to do, without busy-waiting
+            action = self.scheduler.next_action()
+            if action is None:
+                break
+            self.act(action)
+
+        # shutting down, remove the tmpdirs of unfinished jobs
+        self.journal.abandon(self.scheduler.drain())
+
+    def act(self, action):
+        """Carry out one action returned by the scheduler."""
+        if action[0] == "start":
+            self.start_job(action[1])
+        elif action[0] == "reduce":
+            self.start_reduce(action[1])
+        elif action[0] == "map_outputs":
+            for worker, message in announcements(*action[1:], self.workers):
+                self.send(worker, message)
+        elif action[0] == "done":
+            self.finish_job(action[1])
+        elif action[0] == "abort":
+            self.abort_task(*action[1:])
+        else:
+            self.assign_task(*action[1:])
+
+    def start_job(self, job):
+        """Create a job's shared tmpdir and partition its map input."""
+        tmpdir = self.journal.tmpdir(job.job_id)
+        if tmpdir is not None:
+            job.resume_tmpdir(tmpdir)
+            LOGGER.info("Resumed tmpdir %s", tmpdir)
+        else:
+            tmpdir = job.create_tmpdir(durable=self.journal.durable)
+            LOGGER.info("Created tmpdir %s", tmpdir)
+            self.journal.start(job.job_id, tmpdir)
+        input_dir = job.spec["input_directory"]
+        # a job reading the output of a job still in flight maps each
+        # part-XXXXX file as soon as the reducer producing it finishes
+        job.producer = self.scheduler.producer(input_dir)
+        if job.producer is None:
+            files = glob.glob(input_dir + "/*")
+            files.sort()
+        else:
+            LOGGER.info("Job %d pipelined after job %d", job.job_id,
+                        job.producer.job_id)
+            files = [os.path.join(input_dir, f"part-{i:05d}") for i in
+                     range(job.producer.spec["num_reducers"])]
+        tasks = [{
+            "id": i,
+            "files": [],
+        } for i in range(job.spec["num_mappers"])]
+        if job.spec.get("split_size") and job.producer is None:
+            # byte ranges of about split_size, balanced by total bytes
+            splits = split_inputs(files, job.spec["split_size"])
+            for task, task_splits in zip(
+                tasks, balance(splits, job.spec["num_mappers"])
+            ):
+                task["files"] = task_splits
+        else:
+            for i, file in enumerate(files):
+                tasks[i % job.spec["num_mappers"]]["files"].append(file)
+        if job.producer is not None:
+            for task in tasks:
+                task["after"] = [int(file[-5:]) for file in task["files"]]
+        else:
+            for task in tasks:
+                task["inputs"] = map_inputs(task["files"])
+        done = self.journal.finished_tasks(job.job_id, "map")
+        job.intermediate.writers.update(done)
+        self.scheduler.start_phase(job, "map", tasks, done)
+
+    def start_reduce(self, job):
+        """Partition the intermediate files of a job among its reducers."""
+        tasks = [{
+            "id": i,
+            "files": [],
+            "inputs": [],
+        } for i in range(job.spec["num_reducers"])]
+        if job.intermediate.announced is not None:
+            # a direct shuffle, or reduce tasks starting before the map
+            # phase is over
+            for task in tasks:
+                task["fetch"] = []
+                add_map_outputs(job, task,
+                                sorted(job.intermediate.announced),
+                                self.workers)
+            self.scheduler.start_phase(
+                job, "reduce", tasks,
+                self.journal.finished_tasks(job.job_id, "reduce"),
+            )
+            return
+        files = glob.glob(str(job.tmpdir) + "/*")
+        files.sort()
+        for file in files:
+            task = tasks[int(file[-5:])]
+            task["files"].append(file)
+            # maptaskXXXXX-partYYYYY lives where map task XXXXX finished
+            map_task_id = int(os.path.basename(file)[7:12])
+            task["inputs"].append((
+                job.intermediate.writers.get(map_task_id),
+                os.path.getsize(file),
+            ))
+        self.scheduler.start_phase(
+            job, "reduce", tasks,
+            self.journal.finished_tasks(job.job_id, "reduce"),
+        )
+
+    def abort_task(self, job, worker, task):
+        """Take back an early reduce task, so a map task can run."""
+        self.send(worker, {
+            "message_type": "abort_task",
+            "task_id": task["id"],
+        })
+        LOGGER.info("Aborted reduce task %d of job %d on worker %s %s",
+                    task["id"], job.job_id, worker["host"], worker["port"])
+
+    def finish_job(self, job):
+        """Clean up after a job whose reduce tasks have all finished."""
+        status = job_status(job, "done")
+        for address in self.journal.done(job.job_id, status):
+            # tell whoever waits for the job that it is over
+            self.messenger.post(tuple(address), {
+                "message_type": "job_status",
+                "job_id": job.job_id,
+                "status": status,
+            })
+        job.cleanup()
+        if self.options["shuffle"] == "direct":
+            # remove the map outputs Workers kept for the shuffle
             for worker in self.workers:
-                if worker["state"] == "ready":
-                    message = {
-                        "message_type": "new_" + job_type + "_task",
-                        "task_id": task["id"],
-                        "input_paths": task["files"],
-                        "worker_host": worker["host"],
-                        "worker_port": worker["port"],
-                    }
-                    if job_type == "map":
-                        message["output_directory"] = str(tmpdir)
-                        message["num_partitions"] = job["num_reducers"]
-                        message["executable"] = job["mapper_executable"]
-                    else:
-                        message["output_directory"] = job["output_directory"]
-                        message["executable"] = job["reducer_executable"]
-
-                    # connect to worker and send the task msg
-                    with socket.socket(socket.AF_INET,
-                                       socket.SOCK_STREAM) as task_sock:
-                        try:
-                            task_sock.connect((worker["host"],
-                                               worker["port"]))
-                            task_sock.sendall(json.dumps(message).
-                                              encode('utf-8'))
-                        except ConnectionRefusedError:
-                            worker["state"] = "dead"
-                            continue
-                    # record the worker the task is assigned to
-                    # if the worker becomes dead, reassign this task
-                    self.assigned_tasks[worker["host"]
-                                        + str(worker["port"])] = task
-                    LOGGER.info("Assigned worker %s %s with %s task %d",
-                                worker["host"], worker["port"], job_type,
-                                task["id"])
-                    worker["state"] = "busy"
-                    # found available worker, continue to next task
-                    self.tasks.pop(0)
-                    found_worker = True
-                    break
-            if not found_worker:
-                # all workers are busy or dead
-                time.sleep(0.1)  # avoid busy waiting
-
-        # wait for all the workers to finished
-        while not self.shutdown and (len(self.assigned_tasks) > 0 or
-                                     len(self.tasks) > 0):
-            time.sleep(0.1)
-            if len(self.tasks) > 0:
-                self.assign_job(job_type, job, tmpdir)
+                if worker["state"] != "dead" and worker.get("shuffle_port"):
+                    self.send(worker, {
+                        "message_type": "shuffle_cleanup",
+                        "output_directory": job.tmpdir,
+                    })
+        LOGGER.info("Cleaned up tmpdir %s", job.tmpdir)
+        LOGGER.info("Finished job %d in %.2fs using %.2f task-seconds",
+                    job.job_id, job.timeline.elapsed(), job.usage)
+        if job.counters["combine_input_bytes"]:
+            LOGGER.info("Job %d combiner saved %d of %d bytes", job.job_id,
+                        job.counters["combine_input_bytes"] -
+                        job.counters["combine_output_bytes"],
+                        job.counters["combine_input_bytes"])
+        for phase in ("map", "reduce"):
+            if job.counters[phase + "_input_bytes"]:
+                LOGGER.info("Job %d read %.1f%% of %s input bytes locally",
+                            job.job_id,
+                            100 * job.counters[phase + "_local_bytes"] /
+                            job.counters[phase + "_input_bytes"], phase)
+
+    def assign_task(self, job, worker, task):
+        """Send a task to the worker the scheduler picked for it."""
+        job_type = job.phase_of(task).name
+        message = {
+            "message_type": "new_" + job_type + "_task",
+            "task_id": task["id"],
+            "input_paths": task["files"],
+            "worker_host": worker["host"],
+            "worker_port": worker["port"],
+        }
+        if job_type == "map":
+            message["output_directory"] = str(job.tmpdir)
+            message["num_partitions"] = job.spec["num_reducers"]
+            message["executable"] = job.spec["mapper_executable"]
+            for key in ("partitioner", "partition_boundaries"):
+                if key in job.spec:
+                    message[key] = job.spec[key]
+            if job.spec.get("combiner_executable"):
+                message["combiner_executable"] = (
+                    job.spec["combiner_executable"]
+                )
+            if (self.options["shuffle"] == "direct" and
+                    worker.get("shuffle_port")):
+                message["shuffle"] = True
+        else:
+            message["output_directory"] = job.spec["output_directory"]
+            message["executable"] = job.spec["reducer_executable"]
+            if "fetch" in task:
+                message["shuffle_inputs"] = list(task["fetch"])
+                message["num_inputs"] = job.spec["num_mappers"]
+
+        if job.spec.get("intermediate_compression"):
+            message["intermediate_compression"] = (
+                job.spec["intermediate_compression"]
+            )
+
+        # connect to worker and send the task msg, if it is down the next
+        # ready worker gets the same task
+        self.send(worker, message,
+                  on_refused=lambda: self.scheduler.unreachable(worker))
+        LOGGER.info("Assigned worker %s %s with %s task %d of job %d",
+                    worker["host"], worker["port"], job_type,
+                    task["id"], job.job_id)
 
 
 @click.command()
@@ -294,7 +464,41 @@ class Manager:
 @click.option("--logfile", "logfile", default=None)
 @click.option("--loglevel", "loglevel", default="info")
 @click.option("--shared_dir", "shared_dir", default=None)
-def main(host, port, logfile, loglevel, shared_dir):
+@click.option("--max-concurrent-jobs", "max_concurrent_jobs", type=int,
+              default=DEFAULT_OPTIONS["max_concurrent_jobs"],
+              help="Jobs allowed to run at once")
+@click.option("--speculative-slowdown", "speculative_slowdown", type=float,
+              default=DEFAULT_OPTIONS["speculative_slowdown"],
+              help="Back up tasks this many times slower than the median, "
+                   "0 disables")
+@click.option("--speculative-min-runtime", "speculative_min_runtime",
+              type=float,
+              default=DEFAULT_OPTIONS["speculative_min_runtime"],
+              help="Seconds a task must run before it is backed up")
+@click.option("--engine", "engine",
+              type=click.Choice(["threads", "asyncio"]),
+              default=DEFAULT_OPTIONS["engine"],
+              help="Run networking on threads or on one asyncio event loop")
+@click.option("--shuffle", "shuffle",
+              type=click.Choice(["shared", "direct"]),
+              default=DEFAULT_OPTIONS["shuffle"],
+              help="Pass map outputs through the shared directory, or "
+                   "straight from Worker to Worker")
+@click.option("--reduce-slowstart", "reduce_slowstart",
+              type=click.FloatRange(0, 1),
+              default=DEFAULT_OPTIONS["reduce_slowstart"],
+              help="Fraction of map tasks finished before reduce tasks "
+                   "start")
+@click.option("--reduce-rampup", "reduce_rampup",
+              type=click.FloatRange(0, 1),
+              default=DEFAULT_OPTIONS["reduce_rampup"],
+              help="Fraction of Workers early reduce tasks may take while "
+                   "map tasks wait")
+@click.option("--journal", "journal", type=click.Path(dir_okay=False),
+              default=DEFAULT_OPTIONS["journal"],
+              help="Journal jobs to this file, and resume the jobs it left "
+                   "unfinished")
+def main(host, port, logfile, loglevel, shared_dir, **options):
     """Run Manager."""
     tempfile.tempdir = shared_dir
     if logfile:
@@ -308,7 +512,7 @@ def main(host, port, logfile, loglevel, shared_dir):
     root_logger = logging.getLogger()
     root_logger.addHandler(handler)
     root_logger.setLevel(loglevel.upper())
-    Manager(host, port)
+    Manager(host, port, options)
 
 
 if __name__ == "__main__":
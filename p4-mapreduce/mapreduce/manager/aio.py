@@ -0,0 +1,76 @@
+"""Run the Manager on one asyncio event loop.
+
+The threaded Manager keeps a thread blocked on each of its TCP socket,
+heartbeat socket, ping timer and scheduler.  Here one event loop does all
+four: messages and heartbeats are handled as they arrive, the check for
+dead Workers is a timer, and the scheduler is polled after every event
+that could let it make progress, instead of waking a thread.  Sends to
+Workers happen in the background, so a slow or dead Worker never stalls
+the rest.
+"""
+import asyncio
+from mapreduce.manager.registry import PING_INTERVAL
+from mapreduce.utils.aio import AsyncMessenger, DatagramHandler, start_server
+
+
+class ManagerLoop:
+    """Drive a Manager's handlers from an asyncio event loop."""
+
+    def __init__(self, manager):
+        """Construct an event loop engine for manager."""
+        self.manager = manager
+        self.messenger = AsyncMessenger(after=self.dispatch)
+        self.stopped = None     # asyncio.Event, made inside the loop
+
+    def run(self):
+        """Run the event loop until the Manager shuts down."""
+        asyncio.run(self.serve())
+
+    async def serve(self):
+        """Serve TCP messages, heartbeats and pings until shutdown."""
+        self.stopped = asyncio.Event()
+        host, port = self.manager.ht_pt
+        loop = asyncio.get_running_loop()
+        server = await start_server(host, port, self.handle)
+        transport, _ = await loop.create_datagram_endpoint(
+            lambda: DatagramHandler(self.heartbeat), local_addr=(host, port),
+        )
+        pinger = loop.create_task(self.ping())
+        await self.stopped.wait()
+
+        server.close()
+        transport.close()
+        pinger.cancel()
+        # deliver the shutdown messages to the Workers
+        await self.messenger.flush()
+        self.messenger.close()
+
+        # shutting down, remove the tmpdirs of unfinished jobs
+        self.manager.journal.abandon(self.manager.scheduler.drain())
+
+    def handle(self, message):
+        """Handle one TCP message."""
+        self.manager.handle(message)
+        if self.manager.shutdown:
+            self.stopped.set()
+        self.dispatch()
+
+    def heartbeat(self, message):
+        """Handle one heartbeat datagram."""
+        self.manager.heartbeat(message)
+        self.dispatch()
+
+    async def ping(self):
+        """Look for dead Workers every PING_INTERVAL seconds."""
+        while True:
+            self.manager.check_pings()
+            self.dispatch()
+            await asyncio.sleep(PING_INTERVAL)
+
+    def dispatch(self):
+        """Carry out every action the scheduler has ready."""
+        while True:
+            action = self.manager.scheduler.poll()
+            if action is None:
+                return
+            self.manager.act(action)
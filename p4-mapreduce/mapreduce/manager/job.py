@@ -0,0 +1,264 @@
+"""Bookkeeping for one MapReduce job and the tasks of its current phase."""
+import collections
+import contextlib
+import shutil
+import statistics
+import tempfile
+import time
+from mapreduce.manager.locality import local_bytes
+
+
+class Phase:
+    """The map or reduce tasks of a job and where each one stands."""
+
+    def __init__(self, name, tasks, done=()):
+        """Construct a phase whose tasks are pending, except those done.
+
+        done holds the ids of tasks that finished before a restart.
+        """
+        self.name = name
+        self.done = set(done)   # ids of finished tasks
+        self.pending = collections.deque(
+            task for task in tasks if task["id"] not in self.done
+        )
+        self.running = {}   # task id -> task
+        self.attempts = {}  # task id -> {worker key: start time}
+        self.durations = {}  # task id -> runtime of its first success
+        self.total = len(tasks)
+
+    def complete(self):
+        """Return True once every task of the phase has finished."""
+        return len(self.done) == self.total
+
+    def start(self, task, key):
+        """Record an attempt at task on the worker identified by key."""
+        self.running[task["id"]] = task
+        self.attempts.setdefault(task["id"], {})[key] = time.time()
+
+    def finish(self, task, key):
+        """Record that an attempt succeeded, return how long it ran.
+
+        The first attempt to succeed completes the task.  Results from the
+        other attempts at the same task are ignored.
+        """
+        runtime = time.time() - self._end(task, key)
+        if task["id"] not in self.done:
+            self.done.add(task["id"])
+            self.durations[task["id"]] = runtime
+            self.running.pop(task["id"], None)
+        return runtime
+
+    def abandon(self, task, key):
+        """Record that an attempt failed, return True to run the task again.
+
+        The task needs to run again only if no other attempt at it is still
+        going and none has already succeeded.
+        """
+        self._end(task, key)
+        if task["id"] in self.done or task["id"] in self.attempts:
+            return False
+        del self.running[task["id"]]
+        return True
+
+    def _end(self, task, key):
+        """Forget an attempt and return the time it started."""
+        attempts = self.attempts[task["id"]]
+        start = attempts.pop(key)
+        if not attempts:
+            del self.attempts[task["id"]]
+        return start
+
+    def stragglers(self, slowdown, min_runtime):
+        """Return (runtime, task) for tasks worth a backup attempt.
+
+        A task is a straggler once its only attempt has been running
+        slowdown times longer than the median finished task of the phase,
+        and at least min_runtime seconds.
+        """
+        if not self.durations:
+            return []
+        threshold = max(min_runtime,
+                        slowdown * statistics.median(self.durations.values()))
+        now = time.time()
+        stragglers = []
+        for task_id, attempts in self.attempts.items():
+            if len(attempts) == 1 and task_id not in self.done:
+                runtime = now - next(iter(attempts.values()))
+                if runtime > threshold:
+                    stragglers.append((runtime, self.running[task_id]))
+        return stragglers
+
+
+class Timeline:
+    """When a job and each of its phases started and ended."""
+
+    def __init__(self):
+        """Construct the timeline of a job submitted just now."""
+        self.submitted = time.time()
+        self.started = None
+        self.ended = None
+        self.phases = {}    # phase name -> Phase, once it started
+        self.times = {}     # phase name -> [start, end or None]
+
+    def start(self, phase):
+        """Record that phase started."""
+        self.phases[phase.name] = phase
+        self.times[phase.name] = [time.time(), None]
+
+    def end(self, phase):
+        """Record that phase ended, and the job with its reduce phase."""
+        self.times[phase.name][1] = time.time()
+        if phase.name == "reduce":
+            self.ended = self.times[phase.name][1]
+
+    def elapsed(self, name=None):
+        """Return the seconds the job, or its phase name, has run so far."""
+        if name is None:
+            start, end = self.started, self.ended
+        else:
+            start, end = self.times[name]
+        if start is None:
+            return None
+        return (end or time.time()) - start
+
+
+class Intermediate:
+    """A job's intermediate files: their shared directory and writers."""
+
+    def __init__(self):
+        """Construct the bookkeeping of a job that has not started."""
+        self.stack = contextlib.ExitStack()
+        self.path = None
+        # map task id -> key of the worker whose attempt finished first
+        self.writers = {}
+        # map task id -> bytes of each partition, for outputs kept on the
+        # writer for a direct shuffle
+        self.sizes = {}
+        # ids of the map tasks whose outputs reduce tasks know about, None
+        # unless reduce tasks started early or in a direct shuffle
+        self.announced = None
+
+    def create(self, job_id, durable=False):
+        """Create the shared directory of job job_id.
+
+        A durable directory outlives the Manager, so that a restarted one
+        can resume the job, and is only removed by cleanup().
+        """
+        prefix = f"mapreduce-shared-job{job_id:05d}-"
+        if durable:
+            self.resume(tempfile.mkdtemp(prefix=prefix))
+            return
+        self.path = self.stack.enter_context(
+            tempfile.TemporaryDirectory(prefix=prefix)
+        )
+
+    def resume(self, path):
+        """Take over the durable shared directory at path."""
+        self.path = path
+        self.stack.callback(shutil.rmtree, path)
+
+    def cleanup(self):
+        """Remove the shared directory, if any.
+
+        The losing attempt of a backed up map task may still be writing to
+        the directory, so files appearing while it is removed are no error.
+        """
+        try:
+            self.stack.close()
+        except OSError:
+            shutil.rmtree(self.path, ignore_errors=True)
+
+
+class Job:
+    """A submitted job, from admission until its output is written."""
+
+    def __init__(self, spec):
+        """Construct a Job from a new_manager_job message."""
+        self.spec = spec
+        self.intermediate = Intermediate()
+        self.phase = None
+        # the reduce phase, while it overlaps the map phase
+        self.next_phase = None
+        self.producer = None
+        # summed from finished tasks, including the task-seconds they used
+        self.counters = collections.Counter()
+        self.timeline = Timeline()
+
+    @property
+    def job_id(self):
+        """Return the id the Manager assigned to this job."""
+        return self.spec["id"]
+
+    @property
+    def tmpdir(self):
+        """Return the job's shared directory, or None before it starts."""
+        return self.intermediate.path
+
+    @property
+    def usage(self):
+        """Return the task-seconds used so far, for fair-share accounting."""
+        return self.counters["task_seconds"]
+
+    def create_tmpdir(self, durable=False):
+        """Start the job by creating its shared directory."""
+        self.timeline.started = time.time()
+        self.intermediate.create(self.job_id, durable)
+        return self.tmpdir
+
+    def resume_tmpdir(self, path):
+        """Resume the job in the durable shared directory at path."""
+        self.timeline.started = time.time()
+        self.intermediate.resume(path)
+        return self.tmpdir
+
+    def cleanup(self):
+        """Remove the shared directory for intermediate files, if any."""
+        self.intermediate.cleanup()
+
+    def next_task(self, worker=None, early=False):
+        """Return (phase, task) for a pending task that can run now, or None.
+
+        Reduce tasks started early only run once no map task can, unless
+        early is True, in which case they run first.
+        """
+        phases = (self.phase, self.next_phase)
+        for phase in reversed(phases) if early else phases:
+            if phase is not None:
+                task = self.next_task_in(phase, worker)
+                if task is not None:
+                    return phase, task
+        return None
+
+    def next_task_in(self, phase, worker=None):
+        """Return a pending task of phase that can run now, or None.
+
+        That is the first one, unless worker is given and holds some of
+        the input of another, in which case it is the task with the most
+        input bytes local to worker.
+
+        A map task reading the output of a job still in flight can only
+        run once the reduce tasks producing its input files have finished.
+        """
+        gated = self.producer is not None and phase.name == "map"
+        best, best_local = None, 0
+        for task in phase.pending:
+            if gated and not self.producer.produced(task):
+                continue
+            if worker is None:
+                return task
+            local = local_bytes(task, worker)
+            if best is None or local > best_local:
+                best, best_local = task, local
+        return best
+
+    def phase_of(self, task):
+        """Return the phase of a running task."""
+        if self.phase.running.get(task["id"]) is task:
+            return self.phase
+        return self.next_phase
+
+    def produced(self, task):
+        """Return True if every output file task reads has been written."""
+        if self.phase is None or self.phase.name != "reduce":
+            return False
+        return all(i in self.phase.done for i in task["after"])
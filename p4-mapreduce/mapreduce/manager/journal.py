@@ -0,0 +1,255 @@
+"""Write-ahead journal of the Manager's jobs, for resuming them on restart.
+
+The journal is a file of JSON records, one per line, each flushed to disk
+before the Manager acts on it:
+
+  {"event": "job", "spec": {...}}         a job was submitted
+  {"event": "start", "job_id", "tmpdir"}  its shared directory was created
+  {"event": "task", "job_id", "phase", "task_id", "worker"}
+                                          a task finished, its output safe
+  {"event": "done", "job_id"}             the job finished
+
+A Manager started on an existing journal replays it, queues again every
+job that did not finish and skips the tasks whose output survived.  It then
+rewrites the journal with only those jobs, so it never grows past the jobs
+in flight.
+"""
+import collections
+import contextlib
+import json
+import logging
+import os
+import threading
+
+
+# Configure logging
+LOGGER = logging.getLogger(__name__)
+
+# Finished jobs whose final status the Manager still reports
+FINISHED_JOBS = 100
+
+
+class Journal:
+    """Record the progress of jobs and replay it after a restart.
+
+    Without a path nothing is written, and the journal only hands out job
+    ids and keeps track of who waits for which job.  Either way it holds
+    the final status of the last FINISHED_JOBS jobs to finish.
+    """
+
+    def __init__(self, path=None):
+        """Open the journal at path, replaying it if it exists.
+
+        Each unfinished job is then in jobs, {job id: JournaledJob}, in the
+        order it was submitted.
+        """
+        self.path = path
+        self.jobs = {}
+        self.finished_jobs = collections.OrderedDict()  # job id -> status
+        self.job_id = -1    # the id of the last job submitted
+        self.lock = threading.RLock()
+        self.stack = contextlib.ExitStack()
+        self.file = None
+        if path is None:
+            return
+        if os.path.exists(path):
+            self.replay()
+        self.compact()
+        self.file = self.stack.enter_context(
+            open(path, "a", encoding="utf-8")
+        )
+
+    @property
+    def durable(self):
+        """Return True if the journal outlives the Manager."""
+        return self.path is not None
+
+    def replay(self):
+        """Rebuild the state of the unfinished jobs from the journal.
+
+        A torn last record, from a crash in the middle of writing it, is
+        ignored.
+        """
+        with open(self.path, encoding="utf-8") as infile:
+            for line in infile:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    LOGGER.warning("Ignoring torn journal record %r", line)
+                    break
+                self.apply(record)
+
+    def apply(self, record):
+        """Apply one record to the state of the unfinished jobs."""
+        if record["event"] == "job":
+            job = JournaledJob(record["spec"])
+            self.jobs[job.job_id] = job
+            self.job_id = max(self.job_id, job.job_id)
+            return
+        job = self.jobs.get(record["job_id"])
+        if job is None:
+            return
+        if record["event"] == "start":
+            # map outputs live in the shared directory, and a new one has
+            # none of them yet
+            job.tmpdir = record["tmpdir"]
+            job.done.pop("map", None)
+        elif record["event"] == "task":
+            job.done[record["phase"]][record["task_id"]] = (
+                tuple(record["worker"])
+            )
+        elif record["event"] == "done":
+            # the job is over, and so are its records
+            del self.jobs[record["job_id"]]
+
+    def compact(self):
+        """Rewrite the journal with only the records still needed."""
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as outfile:
+            for job in self.jobs.values():
+                for record in job.records():
+                    outfile.write(json.dumps(record) + "\n")
+            outfile.flush()
+            os.fsync(outfile.fileno())
+        os.replace(tmp_path, self.path)
+
+    def write(self, record):
+        """Append record and flush it to disk before returning."""
+        with self.lock:
+            self.apply(record)
+            if self.file is not None:
+                self.file.write(json.dumps(record) + "\n")
+                self.file.flush()
+                os.fsync(self.file.fileno())
+
+    def job(self, spec, watcher=None):
+        """Record a submitted job, giving it the next job id.
+
+        watcher, a (host, port) address, waits for the job to finish.
+        """
+        with self.lock:
+            spec["id"] = self.job_id + 1
+        self.write({"event": "job", "spec": spec})
+        if watcher is not None:
+            self.watch(spec["id"], watcher)
+
+    def watch(self, job_id, watcher):
+        """Add watcher to the addresses told when job job_id finishes.
+
+        Return False if the job is not in flight.
+        """
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job is None:
+                return False
+            job.watchers.append(watcher)
+            return True
+
+    def start(self, job_id, tmpdir):
+        """Record the shared directory of a job that started."""
+        self.write({"event": "start", "job_id": job_id, "tmpdir": tmpdir})
+
+    def task(self, job_id, phase, task_id, worker):
+        """Record that a task finished on worker, a (host, port) key."""
+        self.write({"event": "task", "job_id": job_id, "phase": phase,
+                    "task_id": task_id, "worker": list(worker)})
+
+    def done(self, job_id, status=None):
+        """Record that a job finished with status.
+
+        Return the addresses waiting for it to finish.
+        """
+        with self.lock:
+            job = self.jobs.get(job_id)
+            self.finished_jobs[job_id] = status
+            while len(self.finished_jobs) > FINISHED_JOBS:
+                self.finished_jobs.popitem(last=False)
+            self.write({"event": "done", "job_id": job_id})
+            return job.watchers if job is not None else []
+
+    def finished(self, job_id=None):
+        """Return the final status of a finished job, or None.
+
+        Without job_id, return those of the last jobs to finish.
+        """
+        with self.lock:
+            if job_id is None:
+                return list(self.finished_jobs.values())
+            return self.finished_jobs.get(job_id)
+
+    def tmpdir(self, job_id):
+        """Return the shared directory a job resumes in, or None.
+
+        That is the one it had before the Manager restarted, if it is still
+        there.
+        """
+        job = self.jobs.get(job_id)
+        if job is None or job.tmpdir is None or not os.path.isdir(job.tmpdir):
+            return None
+        return job.tmpdir
+
+    def finished_tasks(self, job_id, phase):
+        """Return {task id: worker key} of a phase's tasks done already.
+
+        These tasks finished before the Manager restarted, and their output
+        is still there.
+        """
+        job = self.jobs.get(job_id)
+        if job is None:
+            return {}
+        done = dict(job.done.get(phase, {}))
+        if phase == "reduce":
+            output_dir = job.spec["output_directory"]
+            done = {task_id: key for task_id, key in done.items()
+                    if os.path.exists(os.path.join(
+                        output_dir, f"part-{task_id:05d}"
+                    ))}
+        if done:
+            LOGGER.info("Job %d has %d %s tasks done already", job_id,
+                        len(done), phase)
+        return done
+
+    def abandon(self, jobs):
+        """Remove the shared directories of jobs left unfinished.
+
+        A durable journal keeps them instead, for the next Manager to
+        resume the jobs in.
+        """
+        if not self.durable:
+            for job in jobs:
+                job.cleanup()
+
+    def close(self):
+        """Close the journal, leaving the unfinished jobs in it."""
+        self.stack.close()
+
+
+class JournaledJob:
+    """What the journal knows of an unfinished job."""
+
+    def __init__(self, spec):
+        """Construct a job that was submitted but has not started."""
+        self.spec = spec
+        self.tmpdir = None
+        # phase -> {task id: key of the worker that finished it}
+        self.done = collections.defaultdict(dict)
+        # addresses to send the job's final status to, not journaled
+        self.watchers = []
+
+    @property
+    def job_id(self):
+        """Return the id the Manager assigned to this job."""
+        return self.spec["id"]
+
+    def records(self):
+        """Return the records rebuilding this job's state."""
+        records = [{"event": "job", "spec": self.spec}]
+        if self.tmpdir is not None:
+            records.append({"event": "start", "job_id": self.job_id,
+                            "tmpdir": self.tmpdir})
+        for phase, tasks in self.done.items():
+            for task_id, worker in tasks.items():
+                records.append({"event": "task", "job_id": self.job_id,
+                                "phase": phase, "task_id": task_id,
+                                "worker": list(worker)})
+        return records
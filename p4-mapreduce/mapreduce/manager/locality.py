@@ -0,0 +1,41 @@
+"""Where the input of each task lives, for running tasks near their data.
+
+A task's "inputs" are (location, bytes) pairs.  A map task's locations
+are the real paths of its input files, which are local to Workers that
+advertised a data directory holding them.  A reduce task's locations are
+the keys of the Workers that wrote its intermediate files.
+"""
+import os
+from mapreduce.manager.registry import worker_key
+
+
+def map_inputs(files):
+    """Return the inputs of a map task reading files and splits."""
+    inputs = []
+    for file in files:
+        if isinstance(file, str):
+            inputs.append((os.path.realpath(file), os.path.getsize(file)))
+        else:
+            path, _, length = file
+            inputs.append((os.path.realpath(path), length))
+    return inputs
+
+
+def local_bytes(task, worker):
+    """Return how many of the bytes task reads are local to worker."""
+    key = worker_key(worker)
+    data_dirs = worker.get("data_dirs", ())
+    local = 0
+    for location, nbytes in task.get("inputs", ()):
+        if location == key or (
+            isinstance(location, str) and
+            any(location.startswith(data_dir + os.sep)
+                for data_dir in data_dirs)
+        ):
+            local += nbytes
+    return local
+
+
+def input_bytes(task):
+    """Return how many bytes task reads."""
+    return sum(nbytes for _, nbytes in task.get("inputs", ()))
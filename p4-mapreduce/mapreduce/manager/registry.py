@@ -0,0 +1,120 @@
+"""Index of the Workers known to the Manager."""
+import collections
+import threading
+import time
+
+
+# States a Worker can be in
+STATES = ("ready", "busy", "dead")
+
+# Seconds between checks for dead Workers, and the number of checks a
+# Worker may stay silent for before it is declared dead
+PING_INTERVAL = 2
+MISSED_PINGS = 5
+
+
+class WorkerRegistry:
+    """Workers keyed by (host, port), with the set of keys in each state.
+
+    Every lookup and state change is O(1), and so is finding a ready
+    Worker: ready Workers wait in a FIFO queue, from which entries that
+    are no longer ready are dropped lazily.  Live Workers are also kept in
+    the order they were last heard from, so finding the silent ones only
+    looks at Workers that have actually gone quiet.
+
+    The Scheduler's condition variable is built on lock, so the Manager's
+    threads share the registry safely.
+    """
+
+    def __init__(self, workers=()):
+        """Construct a registry holding workers, if any."""
+        self.lock = threading.RLock()
+        self.workers = {}   # (host, port) -> worker
+        self.states = {state: set() for state in STATES}
+        self.ready_queue = collections.deque()
+        self.queued = set()
+        self.last_seen = collections.OrderedDict()  # key -> time, not dead
+        for worker in workers:
+            self.add(worker)
+
+    def __len__(self):
+        """Return the number of Workers, dead or alive."""
+        return len(self.workers)
+
+    def __iter__(self):
+        """Iterate over the Workers in the order they registered."""
+        with self.lock:
+            return iter(list(self.workers.values()))
+
+    def find(self, host, port):
+        """Return the Worker at (host, port), or None."""
+        return self.workers.get((host, port))
+
+    def add(self, worker):
+        """Add a new Worker, in the state its "state" key says."""
+        with self.lock:
+            key = worker_key(worker)
+            self.workers[key] = worker
+            self.states[worker["state"]].add(key)
+            if worker["state"] == "ready":
+                self._enqueue(key)
+            if worker["state"] != "dead":
+                self.last_seen[key] = time.monotonic()
+
+    def set_state(self, worker, state):
+        """Move worker to state."""
+        with self.lock:
+            key = worker_key(worker)
+            self.states[worker["state"]].discard(key)
+            self.states[state].add(key)
+            worker["state"] = state
+            if state == "ready":
+                self._enqueue(key)
+            if state == "dead":
+                self.last_seen.pop(key, None)
+            elif key not in self.last_seen:
+                self.last_seen[key] = time.monotonic()
+
+    def _enqueue(self, key):
+        """Queue key for a task, unless it is queued already."""
+        if key not in self.queued:
+            self.queued.add(key)
+            self.ready_queue.append(key)
+
+    def next_ready(self):
+        """Return the ready Worker that has waited longest, or None."""
+        with self.lock:
+            while self.ready_queue:
+                key = self.ready_queue[0]
+                if key in self.states["ready"]:
+                    return self.workers[key]
+                self.ready_queue.popleft()
+                self.queued.discard(key)
+            return None
+
+    def count(self, state):
+        """Return the number of Workers in state."""
+        return len(self.states[state])
+
+    def seen(self, worker):
+        """Record that worker was just heard from."""
+        with self.lock:
+            key = worker_key(worker)
+            self.last_seen[key] = time.monotonic()
+            self.last_seen.move_to_end(key)
+
+    def silent(self, timeout):
+        """Return the live Workers not heard from for timeout seconds."""
+        deadline = time.monotonic() - timeout
+        silent = []
+        with self.lock:
+            for key, last_seen in self.last_seen.items():
+                if last_seen > deadline:
+                    break
+                silent.append(self.workers[key])
+        return silent
+
+
+def worker_key(worker):
+    """Return the key identifying a worker."""
+    return (worker["host"], worker["port"])
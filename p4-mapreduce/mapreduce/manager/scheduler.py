@@ -0,0 +1,367 @@
+"""Event-driven, multi-job task scheduler for the MapReduce Manager."""
+import collections
+import logging
+import os
+import threading
+from mapreduce.manager.job import Job, Phase
+from mapreduce.manager.locality import input_bytes, local_bytes
+from mapreduce.manager.registry import worker_key
+from mapreduce.manager.status import job_status, output_bytes
+
+
+# Configure logging
+LOGGER = logging.getLogger(__name__)
+
+
+class Scheduler:
+    """Hand out tasks to Workers the moment both are available.
+
+    Every event that can make progress possible (a Worker registering or
+    coming back to life, a task finishing, a Worker dying, a new job or a
+    shutdown) calls notify(), which wakes the Manager thread blocked in
+    next_action().  Nothing polls.
+
+    Up to max_concurrent_jobs jobs run at once.  A ready Worker takes a
+    task from the active job with the fewest running tasks, so the next
+    job's map tasks fill Workers left idle by the current job's reduce
+    stragglers.  A Worker with nothing else to do runs a backup attempt of
+    the slowest straggler, if any, and the first attempt to finish wins.
+
+    A job's reduce tasks start early once reduce_slowstart of its map
+    tasks have finished, or in a direct shuffle once none of them waits for
+    a Worker, and hear of each map output as soon as it is written.  While
+    map tasks wait, early reduce attempts take at most reduce_rampup of
+    the live Workers.  Should a map task need running again while every
+    busy Worker is waiting on map outputs, one such reduce attempt is
+    aborted to make room for it.
+    """
+
+    def __init__(self, workers, options):
+        """Construct a Scheduler over the Manager's WorkerRegistry."""
+        # sharing the registry's lock makes each state change atomic with
+        # the scheduling decision it belongs to
+        self.cond = threading.Condition(workers.lock)
+        self.workers = workers
+        self.options = options
+        self.queued = collections.deque()
+        self.active = []
+        self.assigned = {}  # worker key -> (job, phase, task)
+        self.stopped = False
+
+    def notify(self):
+        """Wake every thread waiting on the scheduler."""
+        with self.cond:
+            self.cond.notify_all()
+
+    def stop(self):
+        """Stop scheduling and release every waiting thread."""
+        with self.cond:
+            self.stopped = True
+            self.cond.notify_all()
+
+    def sleep(self, seconds):
+        """Sleep for up to seconds, returning early on shutdown."""
+        with self.cond:
+            self.cond.wait_for(lambda: self.stopped, timeout=seconds)
+            return self.stopped
+
+    def add_job(self, spec):
+        """Queue a new job and wake the job runner."""
+        with self.cond:
+            self.queued.append(Job(spec))
+            self.cond.notify_all()
+
+    def next_action(self):
+        """Block until the Manager has something to do and return it.
+
+        Return one of
+          ("start", job)                 create tmpdir, plan map tasks
+          ("reduce", job)                map phase over, plan reduce tasks
+          ("map_outputs", job, ids)      tell reduce tasks of map outputs
+          ("done", job)                  job finished, clean up
+          ("assign", job, worker, task)  send task to worker
+          ("abort", job, worker, task)   take task back from worker
+        or None on shutdown.  An assigned worker is already marked busy,
+        and an aborted one ready.
+        """
+        with self.cond:
+            while not self.stopped:
+                action = self._poll()
+                if action is not None:
+                    return action
+                self.cond.wait()
+            return None
+
+    def poll(self):
+        """Return the next action if one is possible right now, or None.
+
+        The non-blocking next_action(), for an event loop that polls after
+        every event instead of keeping a thread waiting.
+        """
+        with self.cond:
+            if self.stopped:
+                return None
+            return self._poll()
+
+    def _poll(self):
+        """Return the next action if one is possible right now."""
+        if (self.queued and
+                len(self.active) < self.options["max_concurrent_jobs"]):
+            job = self.queued.popleft()
+            self.active.append(job)
+            return ("start", job)
+        for job in self.active:
+            action = self._advance(job)
+            if action is not None:
+                return action
+        worker = self.workers.next_ready()
+        if worker is None:
+            return self._preempt()
+        candidates = [job for job in self.active if job.next_task()]
+        if candidates:
+            job = min(candidates,
+                      key=lambda j: (len(j.phase.running), j.usage, j.job_id))
+            phase, task = job.next_task(worker, early=self._ramp_up())
+            phase.pending.remove(task)
+        else:
+            backup = self._straggler(worker)
+            if backup is None:
+                return None
+            job, task = backup
+            phase = job.phase
+        phase.start(task, worker_key(worker))
+        self.workers.set_state(worker, "busy")
+        self.assigned[worker_key(worker)] = (job, phase, task)
+        return ("assign", job, worker, task)
+
+    def _advance(self, job):
+        """Return the action moving job to its next phase, or None."""
+        if job.phase is not None and job.phase.complete():
+            job.timeline.end(job.phase)
+            if job.phase.name == "reduce":
+                self.active.remove(job)
+                return ("done", job)
+            if job.next_phase is None:
+                job.phase = None
+                return self._reduce(job)
+            # the reduce tasks started early
+            job.phase, job.next_phase = job.next_phase, None
+        return self._shuffle(job)
+
+    def _reduce(self, job, early=False):
+        """Return the action starting a job's reduce tasks."""
+        if early or self.options["shuffle"] == "direct":
+            job.intermediate.announced = set(job.intermediate.writers)
+        return ("reduce", job)
+
+    def _shuffle(self, job):
+        """Return the action moving a job's early shuffle along, or None."""
+        if job.phase is None:
+            return None
+        intermediate = job.intermediate
+        if intermediate.announced is None:
+            if job.phase.name == "map" and self._slow_start_over(job.phase):
+                return self._reduce(job, early=True)
+            return None
+        fresh = intermediate.writers.keys() - intermediate.announced
+        if not fresh:
+            return None
+        intermediate.announced |= fresh
+        return ("map_outputs", job, sorted(fresh))
+
+    def _slow_start_over(self, phase):
+        """Return True once a map phase is far enough for reduce tasks."""
+        if self.options["shuffle"] == "direct" and not phase.pending:
+            return True
+        return (len(phase.done) >=
+                self.options["reduce_slowstart"] * phase.total)
+
+    def _ramp_up(self):
+        """Return True if an early reduce task may go before map tasks.
+
+        That is while early reduce attempts hold less than reduce_rampup
+        of the live Workers, even counting one more.
+        """
+        early = sum(
+            len(attempts)
+            for job in self.active if job.next_phase is not None
+            for attempts in job.next_phase.attempts.values()
+        )
+        live = self.workers.count("ready") + self.workers.count("busy")
+        return early + 1 <= self.options["reduce_rampup"] * live
+
+    def _preempt(self):
+        """Return the action aborting an early reduce attempt, or None.
+
+        That is needed only when a map task could run, but every busy
+        worker runs a reduce task waiting on map outputs.
+        """
+        runnable = [job.next_task() for job in self.active]
+        if not any(next_task and next_task[0].name == "map"
+                   for next_task in runnable):
+            return None
+        early = [
+            (start, key, job, task_id)
+            for job in self.active if job.next_phase is not None
+            for task_id, attempts in job.next_phase.attempts.items()
+            for key, start in attempts.items()
+        ]
+        if not early or len(early) < self.workers.count("busy"):
+            return None
+        _, key, job, task_id = max(early, key=lambda e: e[:2])
+        worker = self.workers.find(*key)
+        task = job.next_phase.running[task_id]
+        if job.next_phase.abandon(task, key):
+            job.next_phase.pending.appendleft(task)
+        del self.assigned[key]
+        self.workers.set_state(worker, "ready")
+        LOGGER.info("Aborting reduce task %d of job %d to run map tasks",
+                    task_id, job.job_id)
+        return ("abort", job, worker, task)
+
+    def _straggler(self, worker):
+        """Return (job, task) of the slowest straggler, or None."""
+        if not self.options["speculative_slowdown"]:
+            return None
+        stragglers = [
+            (runtime, job.job_id, job, task)
+            for job in self.active if job.phase is not None
+            for runtime, task in job.phase.stragglers(
+                self.options["speculative_slowdown"],
+                self.options["speculative_min_runtime"],
+            )
+            if worker_key(worker) not in job.phase.attempts[task["id"]]
+        ]
+        if not stragglers:
+            return None
+        runtime, _, job, task = max(stragglers, key=lambda s: s[:2])
+        LOGGER.info("Backup attempt of %s task %d of job %d, running %.1fs",
+                    job.phase.name, task["id"], job.job_id, runtime)
+        return job, task
+
+    def producer(self, input_dir):
+        """Return the unfinished job writing to input_dir, or None."""
+        input_dir = os.path.realpath(input_dir)
+        with self.cond:
+            for job in reversed(self.active):
+                output_dir = os.path.realpath(job.spec["output_directory"])
+                if output_dir == input_dir:
+                    return job
+            return None
+
+    def start_phase(self, job, name, tasks, done=()):
+        """Make the tasks of a job's new phase available to workers.
+
+        Reduce tasks started while the map phase is still running only run
+        once no map task can, unless ramping up.  Tasks whose ids are in
+        done finished before the Manager restarted, and do not run again.
+        """
+        with self.cond:
+            phase = Phase(name, tasks, done)
+            if job.phase is None:
+                job.phase = phase
+            else:
+                job.next_phase = phase
+            job.timeline.start(phase)
+            self.cond.notify_all()
+
+    def unreachable(self, worker):
+        """Mark worker dead and put the task it never received back first."""
+        with self.cond:
+            assignment = self.assigned.pop(worker_key(worker), None)
+            if assignment is None:
+                # the worker already died or re-registered meanwhile
+                return
+            _, phase, task = assignment
+            if phase.abandon(task, worker_key(worker)):
+                phase.pending.appendleft(task)
+            self.workers.set_state(worker, "dead")
+            self.cond.notify_all()
+
+    def finished(self, worker, task_id, counters=None, sizes=None):
+        """Record that worker finished task task_id and is ready again.
+
+        The counters the worker reported are added to the job's, unless
+        another attempt at the task finished first.  So are the sizes of
+        the partitions a map task kept on the worker, if any.
+
+        Return (job, phase, task) if this attempt completed the task, or
+        None.
+        """
+        with self.cond:
+            assignment = self.assigned.get(worker_key(worker))
+            if assignment is not None and assignment[2]["id"] != task_id:
+                # a late result from before the worker was declared dead,
+                # it has since been given another task
+                LOGGER.info("Ignoring stale result of task %d from %s %s",
+                            task_id, worker["host"], worker["port"])
+                return None
+            completed = None
+            if assignment is not None:
+                del self.assigned[worker_key(worker)]
+                job, phase, task = assignment
+                if task["id"] not in phase.done:
+                    job.counters.update(counters or {})
+                    job.counters[phase.name + "_input_bytes"] += (
+                        input_bytes(task)
+                    )
+                    job.counters[phase.name + "_local_bytes"] += (
+                        local_bytes(task, worker)
+                    )
+                    job.counters[phase.name + "_output_bytes"] += (
+                        output_bytes(job, phase, task, sizes)
+                    )
+                    if phase.name == "map":
+                        job.intermediate.writers[task["id"]] = (
+                            worker_key(worker)
+                        )
+                        if sizes is not None:
+                            job.intermediate.sizes[task["id"]] = sizes
+                    completed = assignment
+                job.counters["task_seconds"] += phase.finish(
+                    task, worker_key(worker)
+                )
+            self.workers.set_state(worker, "ready")
+            self.cond.notify_all()
+            return completed
+
+    def ready(self, worker):
+        """Mark a registering or revived worker ready.
+
+        A busy worker that registers again has restarted and lost its task,
+        which goes back to the queue.
+        """
+        with self.cond:
+            assignment = self.assigned.pop(worker_key(worker), None)
+            if assignment is not None:
+                _, phase, task = assignment
+                if phase.abandon(task, worker_key(worker)):
+                    phase.pending.append(task)
+            self.workers.set_state(worker, "ready")
+            self.cond.notify_all()
+
+    def dead(self, worker):
+        """Mark worker dead and reschedule its task, if it had one."""
+        with self.cond:
+            assignment = self.assigned.pop(worker_key(worker), None)
+            if assignment is not None:
+                _, phase, task = assignment
+                if phase.abandon(task, worker_key(worker)):
+                    phase.pending.append(task)
+            self.workers.set_state(worker, "dead")
+            self.cond.notify_all()
+
+    def statuses(self):
+        """Return the status of every job running or queued."""
+        with self.cond:
+            live = self.workers.count("ready") + self.workers.count("busy")
+            return ([job_status(job, "running", live) for job in self.active] +
+                    [job_status(job, "queued") for job in self.queued])
+
+    def drain(self):
+        """Remove and return every job that has not finished."""
+        with self.cond:
+            jobs = self.active + list(self.queued)
+            self.active = []
+            self.queued.clear()
+            return jobs
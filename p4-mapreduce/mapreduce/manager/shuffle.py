@@ -0,0 +1,55 @@
+"""Reduce task input in a direct shuffle.
+
+Map tasks on Workers running a shuffle server keep their output there, and
+the reduce tasks fetch it from them.  Map tasks on other Workers still
+write to the job's shared directory.  Reduce tasks start before the map
+phase is over, so their input grows as map tasks finish.
+"""
+import os
+
+
+def add_map_outputs(job, task, map_task_ids, workers):
+    """Add the outputs of map tasks to the input of a reduce task.
+
+    Return the paths added in the shared directory, and the shuffle inputs
+    added on Workers, each [host, shuffle port, name].
+    """
+    paths, shuffled = [], []
+    for map_task_id in map_task_ids:
+        name = f"maptask{map_task_id:05d}-part{task['id']:05d}"
+        key = job.intermediate.writers[map_task_id]
+        sizes = job.intermediate.sizes.get(map_task_id)
+        if sizes is None:
+            paths.append(os.path.join(job.tmpdir, name))
+            nbytes = os.path.getsize(paths[-1])
+        else:
+            shuffled.append([
+                key[0], workers.find(*key)["shuffle_port"],
+                os.path.basename(job.tmpdir) + "/" + name,
+            ])
+            nbytes = sizes[task["id"]]
+        task["inputs"].append((key, nbytes))
+    task["files"] += paths
+    task["fetch"] += shuffled
+    return paths, shuffled
+
+
+def announcements(job, map_task_ids, workers):
+    """Add newly written map outputs to a job's reduce tasks.
+
+    Return (worker, message) for each running attempt to tell about them.
+    """
+    messages = []
+    with workers.lock:
+        phase = job.next_phase or job.phase
+        for task in [*phase.pending, *phase.running.values()]:
+            paths, shuffled = add_map_outputs(job, task, map_task_ids,
+                                              workers)
+            for key in phase.attempts.get(task["id"], {}):
+                messages.append((workers.find(*key), {
+                    "message_type": "map_outputs",
+                    "task_id": task["id"],
+                    "input_paths": paths,
+                    "shuffle_inputs": shuffled,
+                }))
+    return messages
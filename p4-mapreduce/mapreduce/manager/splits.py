@@ -0,0 +1,45 @@
+"""Size-aware splitting of map input into byte ranges."""
+import heapq
+import os
+
+
+def split_inputs(files, split_size):
+    """Return [path, offset, length] splits of files.
+
+    Each split is about split_size bytes and ends just after a newline, or
+    at the end of its file, so no line is cut in two.  Empty files have no
+    splits.
+    """
+    splits = []
+    for path in files:
+        size = os.path.getsize(path)
+        with open(path, "rb") as infile:
+            start = 0
+            while start < size:
+                end = start + split_size
+                if end < size:
+                    # extend the split to the end of the line it stops in
+                    infile.seek(end - 1)
+                    infile.readline()
+                    end = infile.tell()
+                end = min(end, size)
+                splits.append([path, start, end - start])
+                start = end
+    return splits
+
+
+def balance(splits, num_tasks):
+    """Distribute splits among num_tasks tasks with equal total bytes.
+
+    Return one list of splits per task, in file order.  The largest splits
+    are placed first, each on the task with the fewest bytes so far.
+    """
+    tasks = [[] for _ in range(num_tasks)]
+    heap = [(0, i) for i in range(num_tasks)]
+    for split in sorted(splits, key=lambda s: -s[2]):
+        total, i = heapq.heappop(heap)
+        tasks[i].append(split)
+        heapq.heappush(heap, (total + split[2], i))
+    for task in tasks:
+        task.sort(key=lambda s: (s[0], s[1]))
+    return tasks
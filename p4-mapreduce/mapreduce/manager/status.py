@@ -0,0 +1,136 @@
+"""Progress reports on the Manager's jobs.
+
+Clients ask with a "job_status" message naming a job_id, or a "list_jobs"
+message, either carrying the "reply_host" and "reply_port" the client
+listens on.  The Manager replies there with one message of the same type,
+holding the status of the job, or of every job it knows of.  A job_status
+query with "wait" set is only answered once the job finishes, which is
+also how a new_manager_job message with a reply address is answered.
+"""
+import contextlib
+import os
+import statistics
+
+
+# Messages asking the Manager about its jobs
+STATUS_MESSAGES = ("job_status", "list_jobs")
+
+
+def reply_address(message):
+    """Remove and return the (host, port) to reply to message at, or None."""
+    host = message.pop("reply_host", None)
+    port = message.pop("reply_port", None)
+    if host is None or port is None:
+        return None
+    return (host, port)
+
+
+def status_reply(message, address, journal, scheduler):
+    """Return the reply to a job_status or list_jobs message, or None.
+
+    There is none without a reply address, nor yet for a job_status
+    message with "wait" whose job is in flight.  The journal then holds
+    address, for the Manager to send the job's final status to.
+    """
+    if address is None:
+        return None
+    if message["message_type"] == "list_jobs":
+        statuses = {status["job_id"]: status for status in
+                    journal.finished() + scheduler.statuses()}
+        return {
+            "message_type": "list_jobs",
+            "jobs": [statuses[job_id] for job_id in sorted(statuses)],
+        }
+    job_id = message["job_id"]
+    if message.get("wait") and journal.watch(job_id, address):
+        return None
+    for status in scheduler.statuses():
+        if status["job_id"] == job_id:
+            break
+    else:
+        status = journal.finished(job_id)
+        if status is None and job_id in journal.jobs:
+            # done with its tasks, but not yet cleaned up
+            status = {"job_id": job_id, "state": "running"}
+    return {"message_type": "job_status", "job_id": job_id, "status": status}
+
+
+def job_status(job, state, live=1):
+    """Return the status of job, which is "queued", "running" or "done".
+
+    live is the number of live Workers, for estimating when the job's
+    current phase ends.
+    """
+    timeline = job.timeline
+    phases = {
+        name: phase_status(phase, timeline, live)
+        for name, phase in timeline.phases.items()
+    }
+    current = job.phase or job.next_phase
+    return {
+        "job_id": job.job_id,
+        "state": state,
+        "phase": current.name if current is not None else None,
+        "input_directory": job.spec["input_directory"],
+        "output_directory": job.spec["output_directory"],
+        "submitted": timeline.submitted,
+        "elapsed": timeline.elapsed(),
+        "eta": phases[current.name]["eta"] if current is not None else None,
+        "phases": phases,
+        "bytes": {
+            f"{phase}_{key}": job.counters[f"{phase}_{key}_bytes"]
+            for phase in ("map", "reduce") for key in ("input", "output")
+        },
+    }
+
+
+def output_bytes(job, phase, task, sizes=None):
+    """Return the bytes a finished task wrote.
+
+    sizes are those of the partitions a map task kept on its Worker, if
+    any.  Files already removed count for nothing.
+    """
+    if sizes is not None:
+        return sum(sizes)
+    if phase.name == "map" and job.tmpdir is None:
+        return 0
+    if phase.name == "map":
+        paths = [
+            os.path.join(job.tmpdir, f"maptask{task['id']:05d}-part{i:05d}")
+            for i in range(job.spec["num_reducers"])
+        ]
+    else:
+        paths = [os.path.join(job.spec["output_directory"],
+                              f"part-{task['id']:05d}")]
+    total = 0
+    for path in paths:
+        with contextlib.suppress(FileNotFoundError):
+            total += os.path.getsize(path)
+    return total
+
+
+def phase_status(phase, timeline, live=1):
+    """Return the progress of phase and when it should end.
+
+    The estimate assumes the tasks left take the median time of those
+    done, run on as many Workers as are live, and is None until a task
+    is done.
+    """
+    remaining = phase.total - len(phase.done)
+    eta = None
+    if remaining == 0:
+        eta = 0.0
+    elif phase.durations:
+        eta = (remaining * statistics.median(phase.durations.values()) /
+               max(1, min(live, remaining)))
+    return {
+        "done": len(phase.done),
+        "total": phase.total,
+        "running": len(phase.running),
+        "elapsed": timeline.elapsed(phase.name),
+        "eta": eta,
+        "durations": {
+            str(task_id): runtime
+            for task_id, runtime in sorted(phase.durations.items())
+        },
+    }
@@ -0,0 +1,123 @@
+"""
+MapReduce job status script.
+
+Show every job the Manager knows of.
+$ mapreduce-status
+
+Show one job, or block until it finishes.
+$ mapreduce-status 3
+$ mapreduce-status --wait 3
+"""
+
+import json
+import socket
+import statistics
+import sys
+from typing import Any, Dict, List, Optional
+import click
+from mapreduce.utils import receive_reply, send_query
+
+
+def format_seconds(seconds: Optional[float]) -> str:
+    """Return seconds for humans, or "-" if unknown."""
+    if seconds is None:
+        return "-"
+    return f"{seconds:.1f}s"
+
+
+def format_status(status: Optional[Dict[str, Any]]) -> List[str]:
+    """Return the lines summarizing a job status for humans."""
+    if status is None:
+        return ["no such job"]
+    lines = [
+        f"job {status['job_id']}  {status['state']}"
+        + (f"  {status['phase']} phase" if status.get("phase") else "")
+        + f"  elapsed {format_seconds(status.get('elapsed'))}"
+        + f"  ETA {format_seconds(status.get('eta'))}"
+    ]
+    if "input_directory" in status:
+        lines.append(f"  {status['input_directory']} -> "
+                     f"{status['output_directory']}")
+    for name, phase in status.get("phases", {}).items():
+        durations = list(phase["durations"].values())
+        median = statistics.median(durations) if durations else None
+        lines.append(
+            f"  {name:<7} {phase['done']}/{phase['total']} done"
+            f"  {phase['running']} running"
+            f"  elapsed {format_seconds(phase['elapsed'])}"
+            f"  task median {format_seconds(median)}"
+            f"  max {format_seconds(max(durations, default=None))}"
+        )
+    if "bytes" in status:
+        lines.append("  bytes   " + "  ".join(
+            f"{key.replace('_', ' ')} {value}"
+            for key, value in status["bytes"].items()
+        ))
+    return lines
+
+
+def print_status(status: Optional[Dict[str, Any]], as_json: bool) -> None:
+    """Print a job status as JSON, or for humans."""
+    if as_json:
+        print(json.dumps(status, indent=2))
+    else:
+        print("\n".join(format_status(status)))
+
+
+@click.command()
+@click.option(
+    "--host", "-h", "host", default="localhost",
+    help="Manager host, default=localhost",
+)
+@click.option(
+    "--port", "-p", "port", default=6000,
+    help="Manager port number, default=6000",
+)
+@click.option(
+    "--wait", "wait", is_flag=True,
+    help="Block until the job finishes, then show it",
+)
+@click.option(
+    "--timeout", "timeout", default=None, type=float,
+    help="Give up after this many seconds, default=never",
+)
+@click.option(
+    "--json", "as_json", is_flag=True,
+    help="Print the status as JSON",
+)
+@click.argument("job_id", type=int, required=False)
+def main(host: str,
+         port: int,
+         wait: bool,
+         timeout: Optional[float],
+         as_json: bool,
+         job_id: Optional[int]) -> None:
+    """Show the status of a job, or of every job."""
+    if job_id is None:
+        if wait:
+            raise click.UsageError("--wait needs a JOB_ID")
+        message: Dict[str, Any] = {"message_type": "list_jobs"}
+    else:
+        message = {"message_type": "job_status", "job_id": job_id,
+                   "wait": wait}
+    try:
+        with send_query((host, port), message) as listener:
+            reply = receive_reply(listener, timeout)
+    except socket.timeout:
+        sys.exit(f"No reply from Manager {host}:{port}")
+    except OSError as err:
+        sys.exit(f"Failed to reach Manager {host}:{port}: {err}")
+
+    if job_id is not None:
+        print_status(reply["status"], as_json)
+        if reply["status"] is None:
+            sys.exit(1)
+    elif as_json:
+        print(json.dumps(reply["jobs"], indent=2))
+    else:
+        for status in reply["jobs"]:
+            print(format_status(status)[0])
+
+
+if __name__ == "__main__":
+    main()
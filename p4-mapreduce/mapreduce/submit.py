@@ -13,7 +13,10 @@ $ mapreduce-submit --help
 
 import socket
 import json
+from typing import Any, Dict, Optional, Tuple
 import click
+from mapreduce.status import print_status
+from mapreduce.utils import receive_reply, send_query
 
 
 # Configure command line options
@@ -48,6 +51,11 @@ import click
     help="Reducer executable, default=tests/testdata/exec/wc_reduce.sh",
     type=click.Path(file_okay=True, dir_okay=False),
 )
+@click.option(
+    "--combiner", "-c", "combiner_executable", default=None,
+    help="Combiner executable run on each map task's output, default=none",
+    type=click.Path(file_okay=True, dir_okay=False),
+)
 @click.option(
     "--nmappers", "num_mappers", default=2, type=int,
     help="Number of mappers, default=2",
@@ -56,33 +64,80 @@ import click
     "--nreducers", "num_reducers", default=2, type=int,
     help="Number of reducers, default=2",
 )
+@click.option(
+    "--partitioner", "partitioner", default="fast",
+    help="Partitioner: fast, md5, range or module:function, default=fast",
+)
+@click.option(
+    "--range-boundary", "partition_boundaries", multiple=True,
+    help="First key of each partition after the first, for --partitioner "
+         "range.  Repeat once per boundary.",
+)
+@click.option(
+    "--split-size", "split_size", default=None, type=int,
+    help="Split input into byte ranges of about this size, "
+         "default=whole files",
+)
+@click.option(
+    "--compression", "intermediate_compression", default=None,
+    type=click.Choice(["zlib", "lzma", "bz2"]),
+    help="Codec compressing intermediate files, default=none",
+)
+@click.option(
+    "--wait", "wait", is_flag=True,
+    help="Block until the job finishes, then show its status",
+)
 def main(host: str,
          port: int,
          input_directory: str,
          output_directory: str,
          mapper_executable: str,
          reducer_executable: str,
+         combiner_executable: Optional[str],
          num_mappers: int,
-         num_reducers: int) -> None:
+         num_reducers: int,
+         partitioner: str,
+         partition_boundaries: Tuple[str, ...],
+         split_size: Optional[int],
+         intermediate_compression: Optional[str],
+         wait: bool) -> None:
     """Top level command line interface."""
     # We want a bunch of arguments, this is the top level CLI.
-    # pylint: disable=too-many-arguments
-    job_dict = {
+    # pylint: disable=too-many-arguments,too-many-locals
+    job_dict: Dict[str, Any] = {
         "message_type": "new_manager_job",
         "input_directory": input_directory,
         "output_directory": output_directory,
         "mapper_executable": mapper_executable,
         "reducer_executable": reducer_executable,
         "num_mappers": num_mappers,
-        "num_reducers": num_reducers
+        "num_reducers": num_reducers,
+        "partitioner": partitioner,
     }
+    if partitioner == "range":
+        if len(partition_boundaries) != num_reducers - 1:
+            raise click.UsageError(
+                "--partitioner range needs nreducers - 1 --range-boundary"
+            )
+        job_dict["partition_boundaries"] = sorted(partition_boundaries)
+    if combiner_executable:
+        job_dict["combiner_executable"] = combiner_executable
+    if split_size:
+        job_dict["split_size"] = split_size
+    if intermediate_compression:
+        job_dict["intermediate_compression"] = intermediate_compression
 
-    # Send the data to the port that Manager is on
+    # Send the data to the port that Manager is on.  With --wait, the
+    # Manager replies once the job is over.
     message = json.dumps(job_dict)
+    listener = None
     try:
-        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
-            sock.connect((host, port))
-            sock.sendall(str.encode(message))
+        if wait:
+            listener = send_query((host, port), job_dict)
+        else:
+            with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+                sock.connect((host, port))
+                sock.sendall(str.encode(message))
 
     except socket.error as err:
         print("Failed to send job to Manager.")
@@ -94,8 +149,20 @@ def main(host: str,
     print("output directory    ", output_directory)
     print("mapper executable   ", mapper_executable)
     print("reducer executable  ", reducer_executable)
+    if combiner_executable:
+        print("combiner executable ", combiner_executable)
     print("num mappers         ", num_mappers)
     print("num reducers        ", num_reducers)
+    print("partitioner         ", partitioner)
+    if split_size:
+        print("split size          ", split_size)
+    if intermediate_compression:
+        print("compression         ", intermediate_compression)
+
+    if listener is not None:
+        with listener:
+            reply = receive_reply(listener)
+        print_status(reply["status"], as_json=False)
 
 
 if __name__ == "__main__":
@@ -3,12 +3,19 @@
 This package is for code shared by the Manager and the Worker.
 """
 
+import contextlib
 import socket
 import json
+from mapreduce.utils.framing import MAGIC
 
 
-def get_message(sock: socket.socket):
-    """Get message from the TCP socket."""
+def get_message(sock: socket.socket, on_stream=None):
+    """Get message from the TCP socket.
+
+    A connection that starts with framing.MAGIC is a persistent stream of
+    framed messages.  It is handed to on_stream(connection, data), with
+    the data received after MAGIC, and None is returned.
+    """
     # Wait for a connection for 1s.  The socket library avoids
     # consuming CPU while waiting for a connection.
     connection_socket, _ = sock.accept()
@@ -21,14 +28,81 @@ def get_message(sock: socket.socket):
     # returns empty data, which breaks out of the loop.  We make a
     # simplifying assumption that the client will always cleanly
     # close the connection.
-    with connection_socket:
+    with contextlib.ExitStack() as stack:
+        stack.enter_context(connection_socket)
         message_chunks = []
         while True:
             data = connection_socket.recv(4096)
             if not data:
                 break
+            if (on_stream is not None and not message_chunks and
+                    data.startswith(MAGIC)):
+                # keep the connection open for the stream's reader
+                stack.pop_all()
+                on_stream(connection_socket, data[len(MAGIC):])
+                return None
             message_chunks.append(data)
     # Decode list-of-byte-strings to UTF8 and parse JSON data
     message_bytes = b''.join(message_chunks)
     message_str = message_bytes.decode("utf-8")
     return json.loads(message_str)
+
+
+def receive_messages(sock, messenger, handle, stopped):
+    """Handle each message arriving on listening socket sock.
+
+    Plain JSON messages and framed messages from persistent connections
+    are all passed to handle(message), one at a time, until stopped().
+    """
+    def on_stream(conn, data):
+        messenger.serve(conn, data, handle, stopped)
+
+    while not stopped():
+        # Wait for a connection for 1s.  The socket library avoids
+        # consuming CPU while waiting for a connection.
+        try:
+            message = get_message(sock, on_stream)
+        except socket.timeout:
+            continue
+        except json.JSONDecodeError:
+            continue
+        if message is not None:
+            with messenger.lock:
+                handle(message)
+    messenger.close()
+
+
+def send_query(address, message):
+    """Send message to the server at address, asking it for a reply.
+
+    The reply comes over a new connection to a socket listening on this
+    host, whose address goes along as message's "reply_host" and
+    "reply_port".  Return that socket, which the caller closes.
+    """
+    listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    try:
+        with socket.create_connection(address) as sock:
+            host = sock.getsockname()[0]
+            listener.bind((host, 0))
+            listener.listen()
+            sock.sendall(json.dumps({
+                **message,
+                "reply_host": host,
+                "reply_port": listener.getsockname()[1],
+            }).encode("utf-8"))
+    except OSError:
+        listener.close()
+        raise
+    return listener
+
+
+def receive_reply(listener, timeout=None):
+    """Return the reply arriving on listener, from send_query().
+
+    Raise socket.timeout if none arrives within timeout seconds.
+    """
+    listener.settimeout(timeout)
+    while True:
+        reply = get_message(listener)
+        if reply is not None:
+            return reply
@@ -0,0 +1,149 @@
+"""Networking for the Manager's and Worker's asyncio engines.
+
+The wire format is the threaded engine's, see framing: a TCP connection
+carries either one plain JSON message, or MAGIC followed by any number of
+length-prefixed frames.  One event loop serves every connection and
+datagram, so no peer costs a thread and nothing waits on an accept()
+timeout.
+"""
+import asyncio
+import json
+import socket
+from mapreduce.utils.framing import HEADER, MAGIC, encode_frame
+
+
+async def read_messages(reader, handle):
+    """Call handle(message) for each message arriving on one connection."""
+    head = b""
+    while len(head) < len(MAGIC):
+        chunk = await reader.read(len(MAGIC) - len(head))
+        if not chunk:
+            break
+        head += chunk
+    if head != MAGIC:
+        # one plain JSON message, ending when the peer closes
+        try:
+            message = json.loads((head + await reader.read()).decode("utf-8"))
+        except ValueError:
+            return
+        handle(message)
+        return
+    while True:
+        try:
+            (length,) = HEADER.unpack(await reader.readexactly(HEADER.size))
+            body = await reader.readexactly(length)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            return
+        handle(json.loads(body))
+
+
+async def start_server(host, port, handle):
+    """Start serving TCP messages to handle(message), return the server."""
+    async def on_connection(reader, writer):
+        try:
+            await read_messages(reader, handle)
+        finally:
+            writer.close()
+
+    # asyncio's default backlog of 100 drops connections from a crowd of
+    # Workers, who then wait a second to retry
+    return await asyncio.start_server(on_connection, host, port,
+                                      backlog=socket.SOMAXCONN)
+
+
+class DatagramHandler(asyncio.DatagramProtocol):
+    """Call handle(message) for each JSON datagram received."""
+
+    def __init__(self, handle):
+        """Construct a protocol passing datagrams to handle."""
+        self.handle = handle
+
+    def datagram_received(self, data, addr):
+        """Decode one datagram and handle it, ignoring garbage."""
+        try:
+            message = json.loads(data.decode("utf-8"))
+        except ValueError:
+            return
+        self.handle(message)
+
+
+class AsyncMessenger:
+    """Send messages from an event loop without blocking it.
+
+    The asyncio counterpart of framing.Messenger: plain JSON messages go
+    over a new connection each, framed ones over one persistent
+    connection per peer.  post() sends in the background and calls
+    after(), if given, once each message is delivered or refused.
+    """
+
+    def __init__(self, after=None):
+        """Construct an AsyncMessenger with no open connections."""
+        self.after = after
+        self.connections = {}  # address -> [StreamWriter or None, lock]
+        self.pending = set()
+
+    async def send(self, address, message, framed=False):
+        """Send message to address, raise ConnectionRefusedError if down."""
+        if not framed:
+            _, writer = await asyncio.open_connection(*address)
+            try:
+                writer.write(json.dumps(message).encode("utf-8"))
+                await writer.drain()
+            finally:
+                writer.close()
+            return
+        frame = encode_frame(message)
+        if address not in self.connections:
+            self.connections[address] = [None, asyncio.Lock()]
+        entry = self.connections[address]
+        async with entry[1]:
+            if entry[0] is not None and not entry[0].is_closing():
+                try:
+                    entry[0].write(frame)
+                    await entry[0].drain()
+                    return
+                except ConnectionError:
+                    # the peer dropped the connection, open a new one
+                    entry[0].close()
+            entry[0] = None
+            _, writer = await asyncio.open_connection(*address)
+            writer.write(MAGIC + frame)
+            try:
+                await writer.drain()
+            except ConnectionError:
+                writer.close()
+                raise
+            entry[0] = writer
+
+    def post(self, address, message, framed=False, on_sent=None,
+             on_refused=None):
+        """Send message in the background, see framing.Messenger.post."""
+        task = asyncio.get_running_loop().create_task(
+            self._post(address, message, framed, on_sent, on_refused)
+        )
+        self.pending.add(task)
+        task.add_done_callback(self.pending.discard)
+
+    async def _post(self, address, message, framed, on_sent, on_refused):
+        """Send message, then call on_sent() or on_refused() and after()."""
+        callback = on_sent
+        try:
+            await self.send(address, message, framed)
+        except OSError:
+            callback = on_refused
+        if callback is not None:
+            callback()
+        if self.after is not None:
+            self.after()
+
+    async def flush(self):
+        """Wait until every posted message is delivered or refused."""
+        while self.pending:
+            await asyncio.gather(*self.pending)
+
+    def close(self):
+        """Close every persistent connection."""
+        for writer, _ in self.connections.values():
+            if writer is not None:
+                writer.close()
+        self.connections.clear()
@@ -0,0 +1,128 @@
+"""Length-prefixed message framing over persistent TCP connections.
+
+A framed connection starts with MAGIC and then carries any number of
+frames, each a 4-byte big-endian length followed by that many bytes of
+JSON.  A connection without MAGIC carries one plain JSON message and is
+closed by its sender, which is all peers understood before framing and is
+still the default.
+"""
+import contextlib
+import json
+import socket
+import struct
+import threading
+
+
+MAGIC = b"MRF1"
+HEADER = struct.Struct("!I")
+
+
+def encode_frame(message):
+    """Return message as one length-prefixed frame."""
+    body = json.dumps(message).encode("utf-8")
+    return HEADER.pack(len(body)) + body
+
+
+def read_frames(conn, data, handle, stopped):
+    """Call handle(message) for each frame on conn.
+
+    data holds whatever was received after MAGIC.  Return once the peer
+    closes the connection or stopped() is True.
+    """
+    buffer = bytearray(data)
+    with conn:
+        conn.settimeout(1)
+        while not stopped():
+            while len(buffer) >= HEADER.size:
+                (length,) = HEADER.unpack_from(buffer)
+                end = HEADER.size + length
+                if len(buffer) < end:
+                    break
+                message = json.loads(buffer[HEADER.size:end])
+                del buffer[:end]
+                handle(message)
+            try:
+                chunk = conn.recv(1 << 16)
+            except socket.timeout:
+                continue
+            except OSError:
+                return
+            if not chunk:
+                return
+            buffer += chunk
+
+
+class Messenger:
+    """Send messages to peers and receive framed streams from them.
+
+    Plain JSON messages go over a new connection each.  Framed messages
+    reuse one persistent connection per peer address, opened on first use
+    and reopened once if the peer dropped it.  Messages received from all
+    connections are handled one at a time, under lock.
+    """
+
+    def __init__(self):
+        """Construct a Messenger with no open connections."""
+        self.lock = threading.Lock()
+        self.connections = {}  # address -> [socket or None, lock]
+        self.connections_lock = threading.Lock()
+
+    def send(self, address, message, framed=False):
+        """Send message to address, raise ConnectionRefusedError if down."""
+        if not framed:
+            with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+                sock.connect(address)
+                sock.sendall(json.dumps(message).encode("utf-8"))
+            return
+        frame = encode_frame(message)
+        with self.connections_lock:
+            entry = self.connections.setdefault(
+                address, [None, threading.Lock()]
+            )
+        with entry[1]:
+            if entry[0] is not None:
+                try:
+                    entry[0].sendall(frame)
+                    return
+                except OSError:
+                    # the peer dropped the connection, open a new one
+                    entry[0].close()
+                    entry[0] = None
+            sock = socket.create_connection(address)
+            try:
+                sock.sendall(MAGIC + frame)
+            except OSError:
+                sock.close()
+                raise
+            entry[0] = sock
+
+    def post(self, address, message, framed=False, on_sent=None,
+             on_refused=None):
+        """Send message, then call on_sent() or, if refused, on_refused()."""
+        try:
+            self.send(address, message, framed)
+        except ConnectionRefusedError:
+            callback = on_refused
+        else:
+            callback = on_sent
+        if callback is not None:
+            callback()
+
+    def serve(self, conn, data, handle, stopped):
+        """Handle the frames arriving on conn in a new thread."""
+        def locked_handle(message):
+            with self.lock:
+                handle(message)
+
+        thread = threading.Thread(target=read_frames,
+                                  args=(conn, data, locked_handle, stopped))
+        thread.start()
+
+    def close(self):
+        """Close every persistent connection."""
+        with self.connections_lock:
+            for sock, _ in self.connections.values():
+                if sock is not None:
+                    with contextlib.suppress(OSError):
+                        sock.close()
+            self.connections.clear()
@@ -1,34 +1,74 @@
 """MapReduce framework Worker node."""
 import os
-import heapq
 import socket
 import threading
 import shutil
 import tempfile
 import contextlib
 import subprocess
-import hashlib
 import logging
 import json
 import time
 import click
-from mapreduce.utils import get_message
+from mapreduce.utils import receive_messages
+from mapreduce.utils.framing import Messenger
+from mapreduce.worker.aio import WorkerLoop
+from mapreduce.worker.merge import WRITE_BUFFER, merged_lines
+from mapreduce.worker.metrics import TaskMetrics
+from mapreduce.worker.pool import is_callable, new_pool, run_map, run_reduce
+from mapreduce.worker.shuffle import (
+    SHUFFLE_MESSAGES, ShuffleServer, TaskAborted, partition_bytes,
+)
+from mapreduce.worker.tasks import (
+    commit, input_gone, map_output, open_input, publish,
+)
 
 
 # Configure logging
 LOGGER = logging.getLogger(__name__)
 
+# Tunables, each of which can be set from the command line
+DEFAULT_OPTIONS = {
+    # Memory for buffering a map task's output before sorted runs are
+    # spilled to disk, in MiB
+    "sort_buffer_mb": 32,
+    # Processes kept warm for running Python callable mappers and reducers
+    "pool_size": 1,
+    # "json" sends each message over a new connection, "framed" sends
+    # length-prefixed messages over one persistent connection per peer
+    "protocol": "json",
+    # "threads" runs blocking sockets on threads, "asyncio" runs every
+    # socket, timer and task pipe on one event loop
+    "engine": "threads",
+    # Directories on this Worker's local disks holding job input, where
+    # the Manager prefers to run the map tasks reading it
+    "data_dirs": (),
+    # Port of the shuffle server, which serves this Worker's map outputs
+    # to reducers when the Manager runs a direct shuffle, 0 for any free
+    # port.  None runs no shuffle server.
+    "shuffle_port": None,
+    # Map outputs fetched from other Workers at once
+    "fetch_threads": 5,
+    # Inputs a reduce task started before the map phase is over merges
+    # into one sorted run while it waits for the rest
+    "merge_factor": 10,
+}
+
 
 class Worker:
     """A class representing a Worker node in a MapReduce cluster."""
 
-    def __init__(self, host, port, manager_host, manager_port):
+    def __init__(self, host, port, manager_host, manager_port,
+                 options=None):
         """Construct a Worker instance and start listening for messages."""
         self.shut_down = False
-        self.host = host
-        self.port = int(port)
-        self.manager_host = manager_host
-        self.manager_port = int(manager_port)
+        self.address = (host, int(port))
+        self.manager = (manager_host, int(manager_port))
+        self.options = {**DEFAULT_OPTIONS, **(options or {})}
+        self.pool = None    # started by the first Python callable task
+        self.messenger = Messenger()
+        self.shuffle = ShuffleServer(host, self.options["shuffle_port"],
+                                     self.options["fetch_threads"])
         LOGGER.info(
             "Starting worker host=%s port=%s pwd=%s",
             host, port, os.getcwd(),
@@ -38,20 +78,50 @@ class Worker:
             manager_host, manager_port,
         )
 
-        reg_thread = threading.Thread(target=self.register)
-        reg_thread.start()
-        self.run_socket()
+        try:
+            if self.options["engine"] == "asyncio":
+                WorkerLoop(self).run()
+            else:
+                self.run_socket()
+        finally:
+            self.shuffle.close()
+
+    @property
+    def host(self):
+        """Return the host this Worker listens on."""
+        return self.address[0]
+
+    @property
+    def port(self):
+        """Return the port this Worker listens on."""
+        return self.address[1]
 
     def register(self):
         """Send register message to manager."""
+        self.send(self.register_message())
+
+    def register_message(self):
+        """Return the message registering this Worker with the Manager."""
         register_message = {
             "message_type": "register",
             "worker_host": self.host,
             "worker_port": self.port,
         }
-        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as soc:
-            soc.connect((self.manager_host, self.manager_port))
-            soc.sendall(json.dumps(register_message).encode('utf-8'))
+        if self.options["protocol"] != "json":
+            register_message["protocol"] = self.options["protocol"]
+        if self.options["data_dirs"]:
+            register_message["data_dirs"] = [
+                os.path.abspath(data_dir)
+                for data_dir in self.options["data_dirs"]
+            ]
+        if self.shuffle.address is not None:
+            register_message["shuffle_port"] = self.shuffle.address[1]
+        return register_message
+
+    def send(self, message):
+        """Send message to the Manager using the configured protocol."""
+        self.messenger.send(self.manager, message,
+                            self.options["protocol"] == "framed")
 
     def run_socket(self):
         """Create a new TCP socket and handle any incoming messages."""
@@ -60,43 +130,92 @@ class Worker:
             sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
             sock.bind((self.host, self.port))
             sock.listen()
+            # register only once the Manager's ack can get through
+            reg_thread = threading.Thread(target=self.register)
+            reg_thread.start()
             # Socket accept() will block for a maximum of 1 second.  If you
             # omit this, it blocks indefinitely, waiting for a connection.
             sock.settimeout(1)
-            while not self.shut_down:
-                # Wait for a connection for 1s.  The socket library avoids
-                # consuming CPU while waiting for a connection.
-                try:
-                    message = get_message(sock)
-                except json.JSONDecodeError:
-                    continue
-                except socket.timeout:
-                    continue
-                LOGGER.debug("Worker TCP recv\n%s",
-                             json.dumps(message, indent=2))
-
-                if message["message_type"] == "shutdown":
-                    self.shut_down = True
-                elif message["message_type"] == "register_ack":
-                    sendhb_thread = threading.Thread(target=self.send_hb)
-                    sendhb_thread.start()
-                elif message["message_type"] == "new_map_task":
-                    self.mapping(message)
-                elif message["message_type"] == "new_reduce_task":
-                    self.reducing(message)
+            receive_messages(sock, self.messenger, self.handle,
+                             lambda: self.shut_down)
+        if self.pool is not None:
+            self.pool.shutdown()
+
+    def handle(self, message):
+        """Handle one message received over TCP."""
+        LOGGER.debug("Worker TCP recv\n%s", json.dumps(message, indent=2))
+        if message["message_type"] == "shutdown":
+            self.shut_down = True
+        elif message["message_type"] == "register_ack":
+            sendhb_thread = threading.Thread(target=self.send_hb)
+            sendhb_thread.start()
+        elif message["message_type"] == "new_map_task":
+            self.mapping(message)
+        elif message["message_type"] == "new_reduce_task":
+            fetcher = self.fetcher(message)
+            if fetcher is None:
+                self.reducing(message)
+            else:
+                # its input arrives over time, keep serving messages
+                threading.Thread(target=self.reducing,
+                                 args=(message, fetcher)).start()
+        elif message["message_type"] in SHUFFLE_MESSAGES:
+            self.shuffle_control(message)
+
+    def shuffle_control(self, message):
+        """Handle a message about a direct shuffle in progress."""
+        if message["message_type"] == "map_outputs":
+            self.shuffle.add_inputs(message)
+        elif message["message_type"] == "abort_task":
+            fetcher = self.shuffle.fetchers.get(message["task_id"])
+            if fetcher is not None:
+                fetcher.abort()
+        else:
+            self.shuffle.remove(message["output_directory"])
+
+    def fetcher(self, info):
+        """Start fetching the input of reduce task info, if it arrives late.
+
+        Return the Fetcher, or None if the whole input is in the shared
+        directory already.
+        """
+        if "num_inputs" not in info:
+            return None
+        return self.shuffle.fetcher(info)
+
+    def fetch_input(self, info, fetcher):
+        """Wait for the input of reduce task info, pre-merging it meanwhile.
+
+        Return info with the local input paths, or None if the Manager
+        aborted the task meanwhile.
+        """
+        try:
+            return {**info, "input_paths": fetcher.merge_input(
+                self.options["merge_factor"],
+                info.get("intermediate_compression"),
+            )}
+        except TaskAborted:
+            LOGGER.info("Worker %s %s aborted reduce task %s", self.host,
+                        self.port, info["task_id"])
+            self.shuffle.done(info["task_id"], fetcher)
+            return None
+        except BaseException:
+            self.shuffle.done(info["task_id"], fetcher)
+            raise
+
+    def map_directory(self, info):
+        """Return the directory map task info writes its output to."""
+        if info.get("shuffle"):
+            return self.shuffle.directory(info["output_directory"])
+        return info["output_directory"]
 
     def send_hb(self):
         """Send heartbeat message to manager every 2 seconds."""
-        hb_message = {
-            "message_type": "heartbeat",
-            "worker_host": self.host,
-            "worker_port": self.port,
-        }
-        message_bytes = json.dumps(hb_message).encode('utf-8')
+        message_bytes = self.heartbeat_message()
         with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as hb_sock:
             while not self.shut_down:
                 try:
-                    hb_sock.connect((self.manager_host, self.manager_port))
+                    hb_sock.connect(self.manager)
                     break
                 except ConnectionRefusedError:
                     continue
@@ -105,111 +224,165 @@ class Worker:
                 hb_sock.sendall(message_bytes)
                 time.sleep(2)
 
+    def heartbeat_message(self):
+        """Return the encoded heartbeat datagram."""
+        return json.dumps({
+            "message_type": "heartbeat",
+            "worker_host": self.host,
+            "worker_port": self.port,
+        }).encode('utf-8')
+
     def mapping(self, info):
         """Do the mapping job."""
         inputs = info["input_paths"]
-        num_parts = info["num_partitions"]
+        info = {**info, "output_directory": self.map_directory(info)}
+        metrics = TaskMetrics(info)
 
-        # create a local temp dir for intermediate files
+        # create a local temp dir for spilled runs
         prefix = f"mapreduce-local-task{info['task_id']:05d}-"
         with tempfile.TemporaryDirectory(prefix=prefix) as tmpdir:
             LOGGER.info("Worker %s created tmpdir %s", self.host, tmpdir)
-            with contextlib.ExitStack() as stack:
-                # open the files to be written first to improve efficiency
-                outputs = [stack.enter_context(open(
-                    str(tmpdir)
-                    + f"/maptask{info['task_id']:05d}-part{i:05d}", "a+",
-                    encoding="utf-8"
-                )) for i in range(num_parts)]
+            buffer, partition = map_output(info, tmpdir,
+                                           self.options["sort_buffer_mb"],
+                                           metrics)
+            with metrics.timed("map", "startup", "partition", "spill"):
                 for input_path in inputs:
-                    LOGGER.debug("Worker %s %s working on input %s", self.host,
-                                 self.port, input_path)
-                    with open(input_path, encoding="utf8") as infile:
-                        with subprocess.Popen(
-                            [info["executable"]],
-                            stdin=infile,
-                            stdout=subprocess.PIPE,
-                            text=True,
-                        ) as map_process:
-                            for line in map_process.stdout:
-                                # Add line to correct partition output file
-                                (outputs[self.partitioning(line, num_parts)].
-                                 write(line))
-
-            # Sort each output by line
-            for i in range(info["num_partitions"]):
-                file_name = f"maptask{info['task_id']:05d}-part" + f"{i:05d}"
-                output = str(tmpdir) + "/" + file_name
-                subprocess.run(
-                    ["sort", "-o", info["output_directory"] + "/" + file_name,
-                     output],
-                    check=True,
-                )
+                    LOGGER.debug("Worker %s %s working on input %s",
+                                 self.host, self.port, input_path)
+                    for line in self.run_mapper(info["executable"],
+                                                input_path, tmpdir, metrics):
+                        # Add line to correct partition
+                        buffer.add(partition(line), line)
+
+            counters = publish(info, buffer, metrics)
 
         # send finished message to the manager
-        self.send_fin(info)
+        self.send_fin(info, counters, metrics.report())
         LOGGER.info("Worker %s %s finished map task %s",
                     self.host, self.port, info["task_id"])
 
-    def partitioning(self, line, num_partitions):
-        """Write the line to the corresponding partition file."""
-        if num_partitions == 1:
-            return 0
-        key = line.partition("\t")[0]
-        hexdigest = hashlib.md5(key.encode("utf-8")).hexdigest()
-        return int(hexdigest, base=16) % num_partitions
-
-    def reducing(self, info):
-        """Do the reducing job."""
-        exe = info["executable"]
+    def run_mapper(self, executable, input_path, tmpdir, metrics):
+        """Yield the lines the mapper outputs for one input."""
+        if is_callable(executable):
+            output_path = os.path.join(tmpdir, "callable-output")
+            self.get_pool().submit(run_map, executable, input_path,
+                                   output_path).result()
+            with open(output_path, encoding="utf-8") as outfile:
+                yield from outfile
+            return
+        with open_input(input_path) as infile:
+            with metrics.timed("startup"):
+                map_process = subprocess.Popen(
+                    [executable],
+                    stdin=infile,
+                    stdout=subprocess.PIPE,
+                    text=True,
+                )
+            with map_process:
+                yield from map_process.stdout
+
+    def reducing(self, info, fetcher=None):
+        """Do the reducing job, once fetcher, if any, has its input."""
+        metrics = TaskMetrics(info)
+        if fetcher is not None:
+            with metrics.timed("fetch"):
+                info = self.fetch_input(info, fetcher)
+            if info is None:
+                return
+        # create a local temp dir for intermediate files
+        prefix = f"mapreduce-local-task{info['task_id']:05d}-"
+        with tempfile.TemporaryDirectory(prefix=prefix) as tmpdir:
+            LOGGER.info("Worker %s created tmpdir %s", self.host, tmpdir)
+            file_name = f"part-{info['task_id']:05d}"
+            output_path = str(tmpdir) + "/" + file_name
+            try:
+                self.run_reducer(info, output_path, metrics)
+            except FileNotFoundError:
+                if not input_gone(info):
+                    raise
+            else:
+                # Move the output file to the final output directory.
+                metrics.sizes[0] = os.path.getsize(output_path)
+                with metrics.timed("write"):
+                    commit(info["output_directory"], file_name,
+                           lambda path: shutil.move(output_path, path))
+            finally:
+                if fetcher is not None:
+                    self.shuffle.done(info["task_id"], fetcher)
+
+        # send finished message to the manager
+        self.send_fin(info, metrics=metrics.report())
+        LOGGER.info("Worker %s %s finished reduce task %s",
+                    self.host, self.port, info["task_id"])
+
+    def run_reducer(self, info, output_path, metrics):
+        """Run reduce task info's reducer on its merged input files.
+
+        The reducer writes output_path.  The input files are compressed
+        with the task's intermediate compression codec, if any.
+        """
+        executable = info["executable"]
+        codec = info.get("intermediate_compression")
+        if is_callable(executable):
+            with metrics.timed("reduce"):
+                self.get_pool().submit(run_reduce, executable,
+                                       info["input_paths"], output_path,
+                                       codec).result()
+            return
         with contextlib.ExitStack() as stack:
             # merge input files into one sorted output stream
-            files = [stack.enter_context(open(fname, encoding="utf8"))
-                     for fname in info["input_paths"]]
-            inputs = heapq.merge(*files)
-
-            # create a local temp dir for intermediate files
-            prefix = f"mapreduce-local-task{info['task_id']:05d}-"
-            with tempfile.TemporaryDirectory(prefix=prefix) as tmpdir:
-                LOGGER.info("Worker %s created tmpdir %s", self.host, tmpdir)
-                file_name = f"part-{info['task_id']:05d}"
-                output_path = str(tmpdir) + "/" + file_name
-                # Run the reduce executable on merged input,
-                # writing output to a single file.
-                with open(output_path, 'a', encoding="utf8") as outfile:
-                    with subprocess.Popen(
-                        [exe],
-                        text=True,
+            lines = metrics.timed_lines(
+                "merge", merged_lines(stack, info["input_paths"], codec)
+            )
+            # Run the reduce executable on merged input,
+            # writing output to a single file.
+            with open(output_path, 'ab') as outfile:
+                with metrics.timed("startup"):
+                    reduce_process = subprocess.Popen(
+                        [executable],
                         stdin=subprocess.PIPE,
                         stdout=outfile,
-                    ) as reduce_process:
-                        # Pipe input to reduce_process
-                        for line in inputs:
-                            reduce_process.stdin.write(line)
+                        bufsize=WRITE_BUFFER,
+                    )
+                with reduce_process, metrics.timed("reduce", "merge"):
+                    # Pipe input to reduce_process
+                    reduce_process.stdin.writelines(lines)
 
-                # Move the output file to the final output directory.
-                shutil.move(output_path,
-                            info["output_directory"] + "/" + file_name)
+    def get_pool(self):
+        """Return the pool running Python callables, starting it if needed."""
+        if self.pool is None:
+            self.pool = new_pool(self.options["pool_size"])
+        return self.pool
+
+    def send_fin(self, info, counters=None, metrics=None):
+        """Send finished message to the manager, with counters if any."""
+        try:
+            self.send(self.finished_message(info, counters, metrics))
+        except ConnectionRefusedError:
+            pass
 
-            # send finished message to the manager
-            self.send_fin(info)
-            LOGGER.info("Worker %s %s finished reduce task %s",
-                        self.host, self.port, info["task_id"])
+    def finished_message(self, info, counters=None, metrics=None):
+        """Return the message reporting that task info is finished.
 
-    def send_fin(self, info):
-        """Send finished message to the manager."""
+        A map task whose output stays on this Worker for a direct shuffle
+        also reports the bytes of each partition.  metrics are the task's
+        metrics, if the Manager asked for them.
+        """
         message = {
             "message_type": "finished",
             "task_id": info["task_id"],
             "worker_host": self.host,
             "worker_port": self.port,
         }
-        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
-            try:
-                sock.connect((self.manager_host, self.manager_port))
-                sock.sendall(json.dumps(message).encode('utf-8'))
-            except ConnectionRefusedError:
-                pass
+        if counters:
+            message["counters"] = dict(counters)
+        if metrics:
+            message["metrics"] = metrics
+        if info.get("shuffle"):
+            message["partition_bytes"] = partition_bytes(
+                info["output_directory"], info
+            )
+        return message
 
 
 @click.command()
@@ -219,7 +392,34 @@ class Worker:
 @click.option("--manager-port", "manager_port", default=6000)
 @click.option("--logfile", "logfile", default=None)
 @click.option("--loglevel", "loglevel", default="info")
-def main(host, port, manager_host, manager_port, logfile, loglevel):
+@click.option("--sort-buffer-mb", "sort_buffer_mb", type=int,
+              default=DEFAULT_OPTIONS["sort_buffer_mb"],
+              help="MiB of map output sorted in memory before spilling")
+@click.option("--pool-size", "pool_size", type=int,
+              default=DEFAULT_OPTIONS["pool_size"],
+              help="Processes running Python callable mappers and reducers")
+@click.option("--protocol", "protocol",
+              type=click.Choice(["json", "framed"]),
+              default=DEFAULT_OPTIONS["protocol"],
+              help="Message protocol to use with the Manager")
+@click.option("--engine", "engine",
+              type=click.Choice(["threads", "asyncio"]),
+              default=DEFAULT_OPTIONS["engine"],
+              help="Run networking on threads or on one asyncio event loop")
+@click.option("--data-dir", "data_dirs", multiple=True,
+              default=DEFAULT_OPTIONS["data_dirs"],
+              help="Local directory holding job input, may be repeated")
+@click.option("--shuffle-port", "shuffle_port", type=int,
+              default=DEFAULT_OPTIONS["shuffle_port"],
+              help="Serve map outputs to reducers on this port, 0 for any")
+@click.option("--fetch-threads", "fetch_threads", type=int,
+              default=DEFAULT_OPTIONS["fetch_threads"],
+              help="Map outputs fetched from other Workers at once")
+@click.option("--merge-factor", "merge_factor", type=click.IntRange(min=2),
+              default=DEFAULT_OPTIONS["merge_factor"],
+              help="Inputs an early reduce task merges into one run")
+def main(host, port, manager_host, manager_port, logfile, loglevel,
+         **options):
     """Run Worker."""
     if logfile:
         handler = logging.FileHandler(logfile)
@@ -230,7 +430,7 @@ def main(host, port, manager_host, manager_port, logfile, loglevel):
     root_logger = logging.getLogger()
     root_logger.addHandler(handler)
     root_logger.setLevel(loglevel.upper())
-    Worker(host, port, manager_host, manager_port)
+    Worker(host, port, manager_host, manager_port, options)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,244 @@
+"""Run the Worker on one asyncio event loop.
+
+The threaded Worker runs each task on the thread accepting connections,
+so it hears nothing, not even a shutdown, until the task is done.  Here
+one event loop serves the Manager's messages and sends heartbeats while
+it streams mapper output and reducer input through the executables'
+pipes.  Steps that only touch local files, like publishing sorted map
+output, run in the loop's default thread pool.
+"""
+import asyncio
+import contextlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+from mapreduce.utils.aio import AsyncMessenger, start_server
+from mapreduce.worker.merge import WRITE_BUFFER, merged_lines
+from mapreduce.worker.pool import is_callable, run_map, run_reduce
+from mapreduce.worker.shuffle import SHUFFLE_MESSAGES
+from mapreduce.worker.tasks import (
+    commit, input_gone, map_output, open_input, publish, text_lines,
+)
+
+
+# Configure logging
+LOGGER = logging.getLogger(__name__)
+
+# Longest line a mapper may output
+LINE_LIMIT = 1 << 24
+
+
+class WorkerLoop:
+    """Drive a Worker's tasks and networking from an asyncio event loop."""
+
+    def __init__(self, worker):
+        """Construct an event loop engine for worker."""
+        self.worker = worker
+        self.messenger = AsyncMessenger()
+        self.tasks = set()
+        self.stopped = None     # asyncio.Event, made inside the loop
+
+    def run(self):
+        """Run the event loop until the Worker shuts down."""
+        asyncio.run(self.serve())
+        if self.worker.pool is not None:
+            self.worker.pool.shutdown()
+
+    async def serve(self):
+        """Register, then serve messages until shutdown."""
+        self.stopped = asyncio.Event()
+        server = await start_server(self.worker.host, self.worker.port,
+                                    self.handle)
+        try:
+            await self.send(self.worker.register_message())
+        except OSError:
+            LOGGER.error("Cannot register with Manager %s %s",
+                         *self.worker.manager)
+        await self.stopped.wait()
+
+        server.close()
+        self.worker.shut_down = True
+        # release reducers waiting on fetches in the loop's threads
+        self.worker.shuffle.abort()
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.messenger.close()
+
+    async def send(self, message):
+        """Send message to the Manager using the configured protocol."""
+        await self.messenger.send(self.worker.manager, message,
+                                  self.worker.options["protocol"] == "framed")
+
+    def handle(self, message):
+        """Handle one message received over TCP."""
+        LOGGER.debug("Worker TCP recv\n%s", json.dumps(message, indent=2))
+        if message["message_type"] == "shutdown":
+            self.stopped.set()
+        elif message["message_type"] == "register_ack":
+            self.start(self.send_heartbeats())
+        elif message["message_type"] == "new_map_task":
+            self.start(self.mapping(message))
+        elif message["message_type"] == "new_reduce_task":
+            self.start(self.reducing(message, self.worker.fetcher(message)))
+        elif message["message_type"] in SHUFFLE_MESSAGES:
+            self.worker.shuffle_control(message)
+
+    def start(self, coroutine):
+        """Run coroutine as a task, cancelled if the Worker shuts down."""
+        task = asyncio.get_running_loop().create_task(coroutine)
+        self.tasks.add(task)
+        task.add_done_callback(self.done)
+
+    def done(self, task):
+        """Forget a finished task, logging its failure if it failed."""
+        self.tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            LOGGER.error("Task failed", exc_info=task.exception())
+
+    async def send_heartbeats(self):
+        """Send heartbeat message to manager every 2 seconds."""
+        loop = asyncio.get_running_loop()
+        transport, _ = await loop.create_datagram_endpoint(
+            asyncio.DatagramProtocol, remote_addr=self.worker.manager,
+        )
+        message_bytes = self.worker.heartbeat_message()
+        try:
+            while True:
+                transport.sendto(message_bytes)
+                await asyncio.sleep(2)
+        finally:
+            transport.close()
+
+    async def mapping(self, info):
+        """Do the mapping job."""
+        info = {**info, "output_directory": self.worker.map_directory(info)}
+        # create a local temp dir for spilled runs
+        prefix = f"mapreduce-local-task{info['task_id']:05d}-"
+        with tempfile.TemporaryDirectory(prefix=prefix) as tmpdir:
+            buffer, partition = map_output(
+                info, tmpdir, self.worker.options["sort_buffer_mb"]
+            )
+            for input_path in info["input_paths"]:
+                async for line in self.run_mapper(info["executable"],
+                                                  input_path, tmpdir):
+                    buffer.add(partition(line), line)
+            counters = await asyncio.get_running_loop().run_in_executor(
+                None, publish, info, buffer
+            )
+        await self.send_fin(info, counters)
+        LOGGER.info("Worker %s %s finished map task %s", self.worker.host,
+                    self.worker.port, info["task_id"])
+
+    async def run_mapper(self, executable, input_path, tmpdir):
+        """Yield the lines the mapper outputs for one input."""
+        if is_callable(executable):
+            output_path = os.path.join(tmpdir, "callable-output")
+            await asyncio.wrap_future(self.worker.get_pool().submit(
+                run_map, executable, input_path, output_path,
+            ))
+            with open(output_path, encoding="utf-8") as outfile:
+                for line in outfile:
+                    yield line
+            return
+        with open_input(input_path) as infile:
+            process = await asyncio.create_subprocess_exec(
+                executable, stdin=infile, stdout=asyncio.subprocess.PIPE,
+                limit=LINE_LIMIT,
+            )
+            try:
+                async for line in process.stdout:
+                    for text in text_lines(line):
+                        yield text
+            except BaseException:
+                process.kill()
+                raise
+            finally:
+                await process.wait()
+
+    async def reducing(self, info, fetcher=None):
+        """Do the reducing job, once fetcher, if any, has its input."""
+        if fetcher is not None:
+            info = await asyncio.get_running_loop().run_in_executor(
+                None, self.worker.fetch_input, info, fetcher
+            )
+            if info is None:
+                return
+        # create a local temp dir for intermediate files
+        prefix = f"mapreduce-local-task{info['task_id']:05d}-"
+        with tempfile.TemporaryDirectory(prefix=prefix) as tmpdir:
+            file_name = f"part-{info['task_id']:05d}"
+            output_path = os.path.join(tmpdir, file_name)
+            try:
+                await self.run_reducer(
+                    info["executable"], info["input_paths"], output_path,
+                    info.get("intermediate_compression"),
+                )
+            except FileNotFoundError:
+                if not input_gone(info):
+                    raise
+            else:
+                await asyncio.get_running_loop().run_in_executor(
+                    None, commit, info["output_directory"], file_name,
+                    lambda path: shutil.move(output_path, path),
+                )
+            finally:
+                if fetcher is not None:
+                    self.worker.shuffle.done(info["task_id"], fetcher)
+        await self.send_fin(info)
+        LOGGER.info("Worker %s %s finished reduce task %s", self.worker.host,
+                    self.worker.port, info["task_id"])
+
+    async def run_reducer(self, executable, input_paths, output_path,
+                          codec=None):
+        """Run the reducer on the merged input files, writing output_path.
+
+        The input files are compressed with codec, if any.
+        """
+        if is_callable(executable):
+            await asyncio.wrap_future(self.worker.get_pool().submit(
+                run_reduce, executable, input_paths, output_path, codec,
+            ))
+            return
+        with contextlib.ExitStack() as stack:
+            lines = merged_lines(stack, input_paths, codec)
+            outfile = stack.enter_context(open(output_path, "ab"))
+            process = await asyncio.create_subprocess_exec(
+                executable, stdin=asyncio.subprocess.PIPE, stdout=outfile,
+            )
+            try:
+                await feed(process.stdin, lines)
+            except BaseException:
+                process.kill()
+                raise
+            finally:
+                await process.wait()
+
+    async def send_fin(self, info, counters=None):
+        """Send finished message to the manager, with counters if any."""
+        try:
+            await self.send(self.worker.finished_message(info, counters))
+        except OSError:
+            pass
+
+
+async def feed(stdin, lines):
+    """Write lines to a process's stdin a chunk at a time, then close it.
+
+    Yield to the event loop after each chunk, so that a long merge never
+    starves the heartbeats.
+    """
+    chunk, size = [], 0
+    for line in lines:
+        chunk.append(line)
+        size += len(line)
+        if size >= WRITE_BUFFER:
+            stdin.write(b"".join(chunk))
+            await stdin.drain()
+            await asyncio.sleep(0)
+            chunk, size = [], 0
+    stdin.write(b"".join(chunk))
+    await stdin.drain()
+    stdin.close()
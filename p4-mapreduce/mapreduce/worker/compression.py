@@ -0,0 +1,45 @@
+"""Streaming compression of a job's intermediate files.
+
+A job may name a codec for its map outputs.  Its map tasks compress them
+as they write them, and its reduce tasks decompress them as they merge
+them, so no file is ever held uncompressed on disk.  Every codec is in the
+standard library: "zlib" writes a gzip stream, "lzma" an xz one and "bz2"
+a bzip2 one.
+"""
+import bz2
+import gzip
+import lzma
+
+
+# Bytes buffered by an intermediate file opened as bytes
+BUFFER_SIZE = 1 << 18
+
+# Codec -> the module streaming it, and its compression level.  Each file
+# is read only once, so the fast levels are worth their lower ratios.
+CODECS = {
+    "zlib": (gzip, {"compresslevel": 1}),
+    "lzma": (lzma, {"preset": 1}),
+    "bz2": (bz2, {"compresslevel": 9}),
+}
+
+
+def open_intermediate(path, mode="r", codec=None):
+    """Open an intermediate file to read, mode "r", or write, mode "w".
+
+    The file holds UTF-8 text, compressed with codec unless it is None.
+    Modes "rb" and "wb" open it as bytes, reading ahead in big chunks.
+    """
+    if mode.endswith("b"):
+        if codec is None:
+            binary = "rb" if mode.startswith("r") else "wb"
+            return open(path, binary, buffering=BUFFER_SIZE)
+        kwargs = {}
+    else:
+        if codec is None:
+            return open(path, mode, encoding="utf-8")
+        kwargs = {"encoding": "utf-8"}
+        mode += "t"
+    module, level = CODECS[codec]
+    if mode.startswith("w"):
+        kwargs.update(level)
+    return module.open(path, mode, **kwargs)
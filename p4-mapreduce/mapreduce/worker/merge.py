@@ -0,0 +1,26 @@
+"""Merge a reduce task's sorted input files as bytes.
+
+UTF-8 preserves the order of code points, so lines compare as bytes just
+as they compare as str, and the merge never decodes them.  Map tasks read
+their mappers' output in text mode, so no line they write holds a carriage
+return, and the files split into the same lines as bytes as they do as
+text.
+"""
+import heapq
+from mapreduce.worker.compression import open_intermediate
+
+
+# Bytes of merged lines written to a reducer at a time
+WRITE_BUFFER = 1 << 20
+
+
+def merged_lines(stack, paths, codec=None):
+    """Return an iterator over the lines of sorted files, merged.
+
+    The lines are bytes.  The files, compressed with codec if any, are
+    opened on the ExitStack stack.
+    """
+    return heapq.merge(*[
+        stack.enter_context(open_intermediate(path, "rb", codec))
+        for path in paths
+    ])
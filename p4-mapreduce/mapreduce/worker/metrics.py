@@ -0,0 +1,102 @@
+"""Timing breakdowns of a task's steps, and the records and bytes it wrote.
+
+The Manager asks for them by setting "metrics" in a task message.  The
+Worker then reports, in its finished message, the seconds each step took:
+
+startup     spawning the mapper or reducer executable
+fetch       waiting for a reduce task's input to arrive over a shuffle
+map         waiting for the mapper's output, which includes its reading
+            the input and mapping it
+partition   choosing the partition of each map output line
+spill       sorting full sort buffers and writing them as runs
+merge       sorting, then merging runs and reading inputs, line by line
+reduce      feeding merged lines to the reducer, as fast as it takes them
+write       writing partitions, through the combiner if any, or moving
+            the reducer's output into place
+
+along with the task's total seconds, and the records and bytes of each
+partition a map task wrote, or of a reduce task's output.  A step's
+seconds never include those of the steps nested in it.  Steps timed line
+by line, which costs a clock read per line, are only timed when asked.
+"""
+import collections
+import contextlib
+import time
+
+
+class TaskMetrics:
+    """Time the steps of one task and size the partitions it writes."""
+
+    def __init__(self, info):
+        """Construct the metrics of task info, enabled if it asks for them."""
+        self.enabled = bool(info.get("metrics"))
+        self.started = time.perf_counter()
+        self.seconds = collections.Counter()    # step -> seconds
+        num_partitions = info.get("num_partitions", 1)
+        self.records = [0] * num_partitions
+        self.sizes = [0] * num_partitions       # bytes of each partition
+
+    @contextlib.contextmanager
+    def timed(self, step, *nested):
+        """Charge the time the block takes to step.
+
+        Whatever the block charges to the nested steps meanwhile is left
+        out of step.
+        """
+        before = sum(self.seconds[name] for name in nested)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.seconds[step] += (
+                time.perf_counter() - start -
+                sum(self.seconds[name] for name in nested) + before
+            )
+
+    def partitioner(self, partition):
+        """Return partition, timed as the partition step if enabled."""
+        if not self.enabled:
+            return partition
+        seconds = self.seconds
+
+        def timed_partition(line):
+            start = time.perf_counter()
+            index = partition(line)
+            seconds["partition"] += time.perf_counter() - start
+            return index
+        return timed_partition
+
+    def timed_lines(self, step, lines, partition=0):
+        """Return lines, if enabled timing how long each takes to produce.
+
+        The lines count as the records of partition.
+        """
+        if not self.enabled:
+            return lines
+        return self._timed_lines(step, lines, partition)
+
+    def _timed_lines(self, step, lines, partition):
+        """Yield lines, charging the time waiting for each one to step."""
+        elapsed, count = 0.0, 0
+        start = time.perf_counter()
+        try:
+            for line in lines:
+                elapsed += time.perf_counter() - start
+                count += 1
+                yield line
+                start = time.perf_counter()
+            elapsed += time.perf_counter() - start
+        finally:
+            self.seconds[step] += elapsed
+            self.records[partition] += count
+
+    def report(self):
+        """Return the metrics to send to the Manager, or None if disabled."""
+        if not self.enabled:
+            return None
+        return {
+            "total": time.perf_counter() - self.started,
+            "seconds": dict(self.seconds),
+            "records": list(self.records),
+            "bytes": list(self.sizes),
+        }
@@ -0,0 +1,38 @@
+"""Partitioners mapping each map output line to a reduce partition.
+
+A job picks its partitioner by name in the "partitioner" key of its map
+messages:
+  fast             CRC-32 of the key, stable across processes and hosts
+  md5              MD5 of the key, the original partitioner, and the one
+                   used when a message names none
+  range            the number of "partition_boundaries" keys less than or
+                   equal to the key, so partitions hold sorted key ranges
+  module:function  function(key, num_partitions) from an importable module
+"""
+import bisect
+import hashlib
+import importlib
+import zlib
+
+
+def make_partitioner(name, num_partitions, boundaries=None):
+    """Return a function from a map output line to its partition."""
+    if num_partitions == 1:
+        return lambda line: 0
+    if name == "fast":
+        return lambda line: zlib.crc32(
+            line.partition("\t")[0].encode("utf-8")
+        ) % num_partitions
+    if name == "md5":
+        return lambda line: int(hashlib.md5(
+            line.partition("\t")[0].encode("utf-8")
+        ).hexdigest(), base=16) % num_partitions
+    if name == "range":
+        return lambda line: bisect.bisect_right(
+            boundaries, line.partition("\t")[0]
+        )
+    module_name, _, function_name = name.partition(":")
+    if not function_name:
+        raise ValueError(f"Unknown partitioner {name}")
+    function = getattr(importlib.import_module(module_name), function_name)
+    return lambda line: function(line.partition("\t")[0], num_partitions)
@@ -0,0 +1,74 @@
+"""Run Python mappers and reducers in a pool of warm processes.
+
+A job can name a Python callable, "module:function", instead of an
+executable.  The function takes an iterator of input lines and returns an
+iterable of output lines.  It runs in a process of the Worker's pool,
+which keeps its interpreter and imported modules across tasks, instead of
+in a new process per input file.
+"""
+import concurrent.futures
+import contextlib
+import heapq
+import importlib
+import multiprocessing
+import re
+from mapreduce.worker.compression import open_intermediate
+
+
+# A dotted module name, a colon and a function name
+CALLABLE = re.compile(r"^[A-Za-z_][\w.]*:[A-Za-z_]\w*$")
+
+
+def is_callable(executable):
+    """Return True if executable names a Python callable."""
+    return CALLABLE.match(str(executable)) is not None
+
+
+def new_pool(size):
+    """Return a process pool for running callables."""
+    # spawn, because forking a multithreaded Worker is unsafe
+    return concurrent.futures.ProcessPoolExecutor(
+        max_workers=size, mp_context=multiprocessing.get_context("spawn"),
+    )
+
+
+def load(spec):
+    """Return the function named by a "module:function" spec."""
+    module_name, _, function_name = spec.partition(":")
+    return getattr(importlib.import_module(module_name), function_name)
+
+
+def read_lines(input_path):
+    """Yield the lines of a whole file or of a [path, offset, length] split."""
+    if isinstance(input_path, str):
+        with open(input_path, encoding="utf-8") as infile:
+            yield from infile
+        return
+    path, offset, length = input_path
+    with open(path, "rb") as infile:
+        infile.seek(offset)
+        for line in infile:
+            if length <= 0:
+                break
+            length -= len(line)
+            yield line.decode("utf-8")
+
+
+def run_map(spec, input_path, output_path):
+    """Run a map callable over one input, writing its output lines."""
+    function = load(spec)
+    with open(output_path, "w", encoding="utf-8") as outfile:
+        outfile.writelines(function(read_lines(input_path)))
+
+
+def run_reduce(spec, input_paths, output_path, codec=None):
+    """Run a reduce callable over the merged inputs, writing its output.
+
+    The inputs are compressed with codec, if any.
+    """
+    function = load(spec)
+    with contextlib.ExitStack() as stack:
+        files = [stack.enter_context(open_intermediate(path, codec=codec))
+                 for path in input_paths]
+        with open(output_path, "w", encoding="utf-8") as outfile:
+            outfile.writelines(function(heapq.merge(*files)))
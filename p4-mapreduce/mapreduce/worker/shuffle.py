@@ -0,0 +1,358 @@
+"""Serve a Worker's map outputs to reducers, and fetch a reducer's input.
+
+With direct shuffle, a map task writes its sorted partitions to its
+Worker's shuffle directory instead of the job's shared directory, and the
+Worker's shuffle server sends them to the reducers that ask.  A reducer
+opens one connection per mapper and asks for each file by name, relative
+to the shuffle directory, one name per line.  For each name the server
+replies with the file's length as an 8-byte signed big-endian integer,
+-1 if there is no such file, followed by that many bytes.
+
+The server runs on threads in either engine, because each request is a
+sendfile() of a local file, which an event loop would hand to a thread
+anyway.
+
+A reduce task that starts before the map phase is over merges its input
+as it arrives, so that once the last map output lands only a few sorted
+runs are left to merge.
+"""
+import collections
+import concurrent.futures
+import contextlib
+import logging
+import math
+import os
+import shutil
+import socket
+import struct
+import tempfile
+import threading
+from mapreduce.worker.compression import open_intermediate
+from mapreduce.worker.merge import merged_lines
+
+
+# Configure logging
+LOGGER = logging.getLogger(__name__)
+
+HEADER = struct.Struct("!q")
+
+# Bytes copied at a time from a shuffle connection to a local file
+CHUNK_SIZE = 1 << 16
+
+# Messages from the Manager about a direct shuffle in progress
+SHUFFLE_MESSAGES = ("map_outputs", "abort_task", "shuffle_cleanup")
+
+
+class TaskAborted(Exception):
+    """The Manager took a reduce task back before its input arrived."""
+
+
+class ShuffleServer:
+    """Hold this Worker's map outputs and serve them to reducers.
+
+    Also keep track of the reduce tasks fetching their input here.
+    """
+
+    def __init__(self, host, port=None, fetch_threads=5):
+        """Create the shuffle directory and serve it at (host, port).
+
+        Port 0 picks any free port.  With port None nothing is served, and
+        the Worker only fetches map outputs from others, up to
+        fetch_threads at once.
+        """
+        self.stack = contextlib.ExitStack()
+        self.root = None
+        self.address = None
+        self.fetchers = {}  # reduce task id -> Fetcher
+        self.executor = concurrent.futures.ThreadPoolExecutor(fetch_threads)
+        if port is not None:
+            self.root = self.stack.enter_context(
+                tempfile.TemporaryDirectory(prefix="mapreduce-shuffle-")
+            )
+            sock = self.stack.enter_context(
+                socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            )
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            sock.bind((host, port))
+            sock.listen(socket.SOMAXCONN)
+            self.stack.callback(wake, sock)
+            self.address = (host, sock.getsockname()[1])
+            threading.Thread(target=self.serve, args=(sock,),
+                             daemon=True).start()
+
+    def directory(self, output_directory):
+        """Return, creating it, this Worker's directory for a job's outputs.
+
+        It is named after the job's shared directory, output_directory.
+        """
+        path = os.path.join(self.root, os.path.basename(output_directory))
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    def remove(self, output_directory):
+        """Remove the map outputs of the job sharing output_directory."""
+        shutil.rmtree(
+            os.path.join(self.root, os.path.basename(output_directory)),
+            ignore_errors=True,
+        )
+
+    def local_path(self, name):
+        """Return the path of a file the server serves, or None."""
+        path = os.path.normpath(os.path.join(self.root, name))
+        if not path.startswith(self.root + os.sep):
+            return None
+        return path
+
+    def serve(self, sock):
+        """Accept reducers' connections on sock until it is closed."""
+        while True:
+            try:
+                conn, _ = sock.accept()
+            except OSError:
+                return
+            threading.Thread(target=self.send_files, args=(conn,),
+                             daemon=True).start()
+
+    def send_files(self, conn):
+        """Send each file a reducer asks for on conn."""
+        with conn, conn.makefile("rb") as requests:
+            try:
+                for request in requests:
+                    path = self.local_path(request.decode("utf-8").strip())
+                    try:
+                        infile = open(path or "", "rb")
+                    except OSError:
+                        conn.sendall(HEADER.pack(-1))
+                        continue
+                    with infile:
+                        conn.sendall(
+                            HEADER.pack(os.fstat(infile.fileno()).st_size)
+                        )
+                        conn.sendfile(infile)
+            except OSError:
+                # the reducer went away
+                pass
+
+    def fetcher(self, info):
+        """Start fetching the input of reduce task info, return the Fetcher.
+
+        Map outputs this Worker wrote are read in place, not fetched.
+        """
+        fetcher = Fetcher(info["task_id"], info["num_inputs"])
+        self.fetchers[info["task_id"]] = fetcher
+        self.add_inputs(info)
+        return fetcher
+
+    def add_inputs(self, message):
+        """Hand the inputs listed in message to its task's Fetcher."""
+        fetcher = self.fetchers.get(message["task_id"])
+        if fetcher is None:
+            return
+        paths = list(message.get("input_paths", []))
+        remote = collections.defaultdict(list)
+        for host, port, name in message.get("shuffle_inputs", []):
+            if (host, port) == self.address:
+                paths.append(self.local_path(name))
+            else:
+                remote[(host, port)].append(name)
+        for address, names in fetcher.add(paths, remote).items():
+            self.executor.submit(fetcher.fetch, address, names)
+
+    def done(self, task_id, fetcher):
+        """Forget the fetcher of a task that has finished or was aborted."""
+        if self.fetchers.get(task_id) is fetcher:
+            del self.fetchers[task_id]
+        fetcher.close()
+
+    def abort(self):
+        """Abort every reduce task still waiting for its input."""
+        for fetcher in list(self.fetchers.values()):
+            fetcher.abort()
+
+    def close(self):
+        """Stop serving, abort every fetch and remove all map outputs."""
+        self.abort()
+        for task_id, fetcher in list(self.fetchers.items()):
+            self.done(task_id, fetcher)
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.stack.close()
+
+
+class Fetcher:
+    """Collect a reduce task's input files as their locations come in.
+
+    Files on other Workers are fetched into a local directory, one
+    connection per mapper, while the rest of the input is still being
+    produced.
+    """
+
+    def __init__(self, task_id, num_inputs):
+        """Construct a Fetcher expecting num_inputs input files."""
+        self.num_inputs = num_inputs
+        self.stack = contextlib.ExitStack()
+        self.tmpdir = self.stack.enter_context(tempfile.TemporaryDirectory(
+            prefix=f"mapreduce-fetch-task{task_id:05d}-"
+        ))
+        self.cond = threading.Condition()
+        self.inputs = {}    # input name -> local path, None until fetched
+        self.ready = collections.deque()    # local paths not yet taken
+        self.error = None   # the exception that stopped the task
+
+    def add(self, paths, remote):
+        """Add local paths and remote, {(host, port): [name]}.
+
+        Return the remote names that are new, which the caller fetches.
+        """
+        fetch = {}
+        with self.cond:
+            for path in paths:
+                if path not in self.inputs:
+                    self.inputs[path] = path
+                    self.ready.append(path)
+            for address, names in remote.items():
+                names = [name for name in names if name not in self.inputs]
+                if names:
+                    self.inputs.update(dict.fromkeys(names))
+                    fetch[address] = names
+            self.cond.notify_all()
+        return fetch
+
+    def fetch(self, address, names):
+        """Fetch the files names from the shuffle server at address."""
+        if self.error is not None:
+            return
+        try:
+            with socket.create_connection(address, timeout=60) as sock, \
+                    sock.makefile("rb") as replies:
+                sock.sendall("".join(f"{name}\n" for name in names)
+                             .encode("utf-8"))
+                for name in names:
+                    path = os.path.join(self.tmpdir, os.path.basename(name))
+                    (length,) = HEADER.unpack(replies.read(HEADER.size))
+                    if length < 0:
+                        raise FileNotFoundError(f"{address} has no {name}")
+                    copy(replies, path, length)
+                    with self.cond:
+                        self.inputs[name] = path
+                        self.ready.append(path)
+                        self.cond.notify_all()
+        except (OSError, struct.error) as error:
+            if self.error is None:
+                LOGGER.error("Cannot fetch map output from %s %s: %s",
+                             *address, error)
+            self.stop(error)
+
+    def complete(self):
+        """Return True once every input is local."""
+        return (len(self.inputs) == self.num_inputs and
+                None not in self.inputs.values())
+
+    def take(self, count):
+        """Block until count more inputs are local, or all of them are.
+
+        Return (paths, last), the paths taken and whether they are the
+        last of the input.  Raise TaskAborted if the task was aborted, or
+        the error that kept an input from arriving.
+        """
+        with self.cond:
+            self.cond.wait_for(lambda: self.error is not None or
+                               self.complete() or len(self.ready) >= count)
+            if self.error is not None:
+                raise self.error
+            if self.complete():
+                paths = list(self.ready)
+                self.ready.clear()
+                return paths, True
+            return [self.ready.popleft() for _ in range(count)], False
+
+    def wait(self):
+        """Block until every input is local, return the paths not taken."""
+        paths, _ = self.take(math.inf)
+        return sorted(paths, key=os.path.basename)
+
+    def merge_input(self, factor, codec=None):
+        """Block until every input is local, pre-merging it meanwhile.
+
+        Until the last input arrives, every factor inputs are merged into
+        one sorted run, and every factor runs merged from as many inputs
+        into a bigger one, so that few files are left to merge once it
+        does.  Runs are compressed with codec, like the inputs.  Return the
+        paths of the remaining inputs and runs.
+        """
+        levels = []     # runs merged from factor, factor ** 2, ... inputs
+        while True:
+            paths, last = self.take(factor)
+            if last:
+                return (sorted(paths, key=os.path.basename) +
+                        [run for runs in levels for run in runs])
+            run = self.merge(paths, codec)
+            for runs in levels:
+                runs.append(run)
+                if len(runs) < factor:
+                    break
+                run = self.merge(runs, codec)
+                runs.clear()
+            else:
+                levels.append([run])
+
+    def merge(self, paths, codec=None):
+        """Merge sorted files into a new run, return its path.
+
+        Files in the fetch directory are removed once merged.
+        """
+        handle, run = tempfile.mkstemp(prefix="run", dir=self.tmpdir)
+        os.close(handle)
+        with contextlib.ExitStack() as stack:
+            lines = merged_lines(stack, paths, codec)
+            with open_intermediate(run, "wb", codec) as outfile:
+                outfile.writelines(lines)
+        for path in paths:
+            if os.path.dirname(path) == self.tmpdir:
+                os.unlink(path)
+        return run
+
+    def stop(self, error):
+        """Make take() raise error, unless it already raises another."""
+        with self.cond:
+            if self.error is None:
+                self.error = error
+            self.cond.notify_all()
+
+    def abort(self):
+        """Give up on the task."""
+        self.stop(TaskAborted())
+
+    def close(self):
+        """Stop fetching and remove the fetched files.
+
+        A fetch still in flight fails once its file is removed.
+        """
+        self.abort()
+        self.stack.close()
+
+
+def wake(sock):
+    """Wake the thread accepting on sock, which closing alone does not."""
+    with contextlib.suppress(OSError):
+        sock.shutdown(socket.SHUT_RDWR)
+
+
+def copy(infile, path, length):
+    """Copy length bytes from infile to a new file at path."""
+    with open(path, "wb") as outfile:
+        while length > 0:
+            chunk = infile.read(min(length, CHUNK_SIZE))
+            if not chunk:
+                raise ConnectionError("Shuffle connection closed early")
+            outfile.write(chunk)
+            length -= len(chunk)
+
+
+def partition_bytes(output_directory, info):
+    """Return the size of each partition a map task wrote."""
+    return [
+        os.path.getsize(os.path.join(
+            output_directory, f"maptask{info['task_id']:05d}-part{i:05d}"
+        ))
+        for i in range(info["num_partitions"])
+    ]
@@ -0,0 +1,68 @@
+"""In-memory sort buffer for map output, spilling sorted runs to disk."""
+import contextlib
+import heapq
+import os
+
+
+# Estimated bytes of memory a buffered line takes besides its characters
+LINE_OVERHEAD = 64
+
+
+class SortBuffer:
+    """Collect map output lines by partition and sort them in-process.
+
+    Lines are kept in memory until their estimated size reaches
+    memory_limit.  Then every partition is sorted and spilled to a run file
+    in tmpdir.  Reading a partition back merges its runs with the lines
+    still in memory, so it comes out sorted without any external sort.
+
+    Each spill runs in timer("spill"), a context manager which may time it.
+    """
+
+    def __init__(self, num_partitions, tmpdir, memory_limit,
+                 timer=contextlib.nullcontext):
+        """Construct an empty buffer."""
+        self.partitions = [[] for _ in range(num_partitions)]
+        self.tmpdir = tmpdir
+        self.memory_limit = memory_limit
+        self.size = 0
+        self.runs = [[] for _ in range(num_partitions)]  # run file paths
+        self.spills = 0
+        self.timer = timer
+
+    def add(self, partition, line):
+        """Buffer a line of partition, spilling if memory is full."""
+        self.partitions[partition].append(line)
+        self.size += len(line) + LINE_OVERHEAD
+        if self.size >= self.memory_limit:
+            self.spill()
+
+    def spill(self):
+        """Write each partition's buffered lines to a sorted run file."""
+        with self.timer("spill"):
+            for partition, lines in enumerate(self.partitions):
+                if not lines:
+                    continue
+                lines.sort()
+                path = os.path.join(
+                    self.tmpdir, f"spill{self.spills:05d}-part{partition:05d}"
+                )
+                with open(path, "w", encoding="utf-8") as run:
+                    run.writelines(lines)
+                self.runs[partition].append(path)
+                lines.clear()
+        self.spills += 1
+        self.size = 0
+
+    def sorted_lines(self, partition):
+        """Yield the lines of partition in sorted order."""
+        lines = self.partitions[partition]
+        lines.sort()
+        with contextlib.ExitStack() as stack:
+            runs = [stack.enter_context(open(path, encoding="utf-8"))
+                    for path in self.runs[partition]]
+            if runs:
+                yield from heapq.merge(*runs, lines)
+            else:
+                yield from lines
+        lines.clear()
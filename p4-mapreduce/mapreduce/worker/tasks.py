@@ -0,0 +1,206 @@
+"""Steps of map and reduce tasks, shared by the Worker's engines."""
+import collections
+import contextlib
+import io
+import logging
+import os
+import subprocess
+import tempfile
+import threading
+from mapreduce.worker.compression import open_intermediate
+from mapreduce.worker.partition import make_partitioner
+from mapreduce.worker.spill import SortBuffer
+
+
+# Configure logging
+LOGGER = logging.getLogger(__name__)
+
+# Bytes read at a time when feeding a split of a file to a mapper
+CHUNK_SIZE = 1 << 16
+
+
+def map_output(info, tmpdir, sort_buffer_mb, metrics):
+    """Return the SortBuffer and partitioner for a map task's output.
+
+    Both are timed by the task's metrics.
+    """
+    num_parts = info["num_partitions"]
+    buffer = SortBuffer(num_parts, tmpdir, sort_buffer_mb << 20,
+                        metrics.timed)
+    partition = make_partitioner(info.get("partitioner", "md5"), num_parts,
+                                 info.get("partition_boundaries"))
+    return buffer, metrics.partitioner(partition)
+
+
+def text_lines(line):
+    """Return the lines of a line of bytes as reading it as text would.
+
+    That is decoded, with a carriage return, alone or before the newline,
+    ending a line too and translated to a newline, like the universal
+    newlines of a text pipe.
+    """
+    text = line.decode("utf-8")
+    if "\r" not in text:
+        return [text]
+    return io.StringIO(text.replace("\r\n", "\n").replace("\r", "\n"),
+                       newline="\n").readlines()
+
+
+def input_gone(info):
+    """Return True, and log it, if a reduce task's input directory is gone.
+
+    The job's shared directory is removed once another attempt at the
+    same task finishes the job.
+    """
+    if all(os.path.isdir(os.path.dirname(path))
+           for path in info["input_paths"]):
+        return False
+    LOGGER.info("Discarding reduce task %s, input is gone", info["task_id"])
+    return True
+
+
+@contextlib.contextmanager
+def open_input(input_path):
+    """Open a map input to be a mapper's stdin.
+
+    input_path is either a whole file or a [path, offset, length] split,
+    whose bytes are fed to the mapper through a pipe.
+    """
+    if isinstance(input_path, str):
+        with open(input_path, encoding="utf8") as infile:
+            yield infile
+        return
+    read_fd, write_fd = os.pipe()
+    feeder = threading.Thread(target=copy_range,
+                              args=(*input_path, write_fd))
+    feeder.start()
+    try:
+        with open(read_fd, "rb") as pipe:
+            yield pipe
+    finally:
+        feeder.join()
+
+
+def copy_range(path, offset, length, write_fd):
+    """Write length bytes of path starting at offset to write_fd."""
+    try:
+        with open(write_fd, "wb", buffering=0) as pipe, \
+                open(path, "rb") as infile:
+            infile.seek(offset)
+            while length > 0:
+                chunk = infile.read(min(length, CHUNK_SIZE))
+                if not chunk:
+                    break
+                pipe.write(chunk)
+                length -= len(chunk)
+    except BrokenPipeError:
+        # the mapper exited without reading all of its input
+        pass
+
+
+def publish(info, buffer, metrics):
+    """Write a map task's sorted partitions to its output directory.
+
+    Each output is published atomically, so that a backup attempt of the
+    same task never clobbers it.  Return the task's counters.  The task's
+    metrics time the merge and write steps, and size each partition.
+    """
+    counters = collections.Counter()
+    combiner = info.get("combiner_executable")
+    codec = info.get("intermediate_compression")
+    for i in range(info["num_partitions"]):
+        file_name = f"maptask{info['task_id']:05d}-part{i:05d}"
+        lines = metrics.timed_lines("merge", buffer.sorted_lines(i), i)
+        with metrics.timed("write", "merge"):
+            if combiner:
+                commit(info["output_directory"], file_name,
+                       lambda path, lines=lines: counters.update(
+                           combine(combiner, lines, path, codec)
+                       ))
+            else:
+                commit(info["output_directory"], file_name,
+                       lambda path, lines=lines: write_lines(path, lines,
+                                                             codec))
+        if metrics.enabled:
+            metrics.sizes[i] = file_size(
+                os.path.join(info["output_directory"], file_name)
+            )
+    return counters
+
+
+def file_size(path):
+    """Return the bytes of the file at path, 0 if it is gone."""
+    try:
+        return os.path.getsize(path)
+    except FileNotFoundError:
+        return 0
+
+
+def write_lines(path, lines, codec=None):
+    """Write lines to a new file at path, compressed with codec if any."""
+    with open_intermediate(path, "w", codec) as outfile:
+        outfile.writelines(lines)
+
+
+def combine(executable, lines, path, codec=None):
+    """Run the combiner on sorted lines and write the sorted result to path.
+
+    Return counters of the bytes going into and out of the combiner.
+    """
+    counters = collections.Counter()
+
+    def feed(pipe):
+        with pipe:
+            try:
+                for line in lines:
+                    counters["combine_input_bytes"] += len(line.encode())
+                    pipe.write(line)
+            except BrokenPipeError:
+                pass
+
+    with subprocess.Popen(
+        [executable],
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        text=True,
+    ) as combine_process:
+        feeder = threading.Thread(target=feed, args=(combine_process.stdin,))
+        feeder.start()
+        # a combiner need not keep its input's order
+        output = sorted(combine_process.stdout)
+        feeder.join()
+    if combine_process.returncode:
+        raise subprocess.CalledProcessError(combine_process.returncode,
+                                            executable)
+    write_lines(path, output, codec)
+    counters["combine_output_bytes"] = sum(len(line.encode())
+                                           for line in output)
+    return counters
+
+
+def commit(output_directory, file_name, write):
+    """Atomically publish output_directory/file_name.
+
+    write(path) produces the file under a hidden, attempt-unique name in
+    output_directory, which is then renamed over file_name in one step.
+    Concurrent attempts at the same task therefore never clobber each
+    other's output, and readers never see a partial file.
+
+    If output_directory disappears along the way, the job is over and this
+    attempt lost the race to another one, so its output is discarded.
+    """
+    path = None
+    try:
+        handle, path = tempfile.mkstemp(prefix=f".{file_name}.",
+                                        dir=output_directory)
+        os.close(handle)
+        write(path)
+        os.replace(path, os.path.join(output_directory, file_name))
+    except (OSError, subprocess.CalledProcessError):
+        if path is not None:
+            with contextlib.suppress(FileNotFoundError):
+                os.unlink(path)
+        if os.path.isdir(output_directory):
+            raise
+        LOGGER.info("Discarding %s, %s no longer exists",
+                    file_name, output_directory)
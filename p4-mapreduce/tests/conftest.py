@@ -36,9 +36,14 @@ MapReduceClient = collections.namedtuple("MapReduceClient", [
 
 
 @pytest.fixture(name='mapreduce_client')
-def setup_teardown_mapreduce_client():
-    """Start a MapReduce Manager and Worker Servers in separate processes."""
+def setup_teardown_mapreduce_client(request):
+    """Start a MapReduce Manager and Worker Servers in separate processes.
+
+    Tests can pass extra command line arguments with indirect
+    parametrization, e.g. {"worker_args": ["--protocol", "framed"]}.
+    """
     LOGGER.info("Setup test fixture 'mapreduce_client'")
+    extra_args = getattr(request, "param", {})
 
     # Acquire open ports
     manager_port, *worker_ports = \
@@ -60,6 +65,7 @@ def setup_teardown_mapreduce_client():
             shutil.which("mapreduce-manager"),
             "--port", str(manager_port),
             "--loglevel", loglevel,
+            *extra_args.get("manager_args", []),
         ]))
         processes.append(process)
         wait_for_server_ready(process, manager_port)
@@ -72,6 +78,7 @@ def setup_teardown_mapreduce_client():
                 "--port", str(worker_port),
                 "--manager-port", str(manager_port),
                 "--loglevel", loglevel,
+                *extra_args.get("worker_args", []),
             ]))
             processes.append(process)
             wait_for_server_ready(process, worker_port)
@@ -167,6 +174,7 @@ def thread_safe_mocks():
     ):
         # We don't need this monkeypatch in Python >= 3.10.9 due to this PR:
         # https://github.com/python/cpython/pull/98688
+        yield
         return
 
     # Store the original version of the NonCallableMock class's __getattr__.
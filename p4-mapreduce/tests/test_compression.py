@@ -0,0 +1,46 @@
+"""See unit test function docstring."""
+
+import pytest
+from mapreduce.worker.compression import CODECS, open_intermediate
+from mapreduce.worker.pool import run_reduce
+from mapreduce.worker.shuffle import Fetcher
+from mapreduce.worker.tasks import combine, write_lines
+from utils import TESTDATA_DIR
+
+
+@pytest.mark.parametrize("codec", sorted(CODECS))
+def test_codec_round_trip(codec, tmp_path):
+    """Verify intermediate files are compressed and read back as text."""
+    lines = [f"word{i:04d}\t1\n" for i in range(2000)]
+    write_lines(tmp_path/"plain", lines)
+    write_lines(tmp_path/"packed", lines, codec)
+    assert (tmp_path/"packed").stat().st_size < \
+        (tmp_path/"plain").stat().st_size / 2
+    with open_intermediate(tmp_path/"packed", codec=codec) as infile:
+        assert list(infile) == lines
+
+    combine(TESTDATA_DIR/"exec/wc_combine.sh", lines + lines,
+            tmp_path/"combined", codec)
+    with open_intermediate(tmp_path/"combined", codec=codec) as infile:
+        assert list(infile) == [line.replace("\t1", "\t2") for line in lines]
+
+
+@pytest.mark.parametrize("codec", sorted(CODECS))
+def test_reduce_compressed(codec, tmp_path, monkeypatch):
+    """Verify pre-merged runs and reducers decompress their input."""
+    monkeypatch.syspath_prepend(str(TESTDATA_DIR/"exec"))
+    paths = []
+    for map_task_id in range(3):
+        paths.append(str(tmp_path/f"maptask{map_task_id:05d}-part00000"))
+        write_lines(paths[-1], [f"{word}\t1\n" for word in ("a", "b", "c")],
+                    codec)
+    fetcher = Fetcher(0, 3)
+    try:
+        fetcher.add(paths, {})
+        run = fetcher.merge(paths[:2], codec)
+        run_reduce("wc_callable:reducer", [run, paths[2]],
+                   tmp_path/"part-00000", codec)
+    finally:
+        fetcher.close()
+    assert (tmp_path/"part-00000").read_text(encoding="utf-8") == \
+        "a\t3\nb\t3\nc\t3\n"
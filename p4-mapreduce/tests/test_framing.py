@@ -0,0 +1,45 @@
+"""See unit test function docstring."""
+
+import socket
+import threading
+from mapreduce.utils import receive_messages
+from mapreduce.utils.framing import Messenger
+
+
+def test_framed_and_json_messages():
+    """Verify one listener handles framed streams and plain JSON messages."""
+    received = []
+    done = threading.Event()
+
+    def handle(message):
+        received.append(message)
+        if len(received) == 101:
+            done.set()
+
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("localhost", 0))
+        sock.listen()
+        sock.settimeout(1)
+        receiver_messenger = Messenger()
+        receiver = threading.Thread(target=receive_messages, args=(
+            sock, receiver_messenger, handle, done.is_set,
+        ))
+        receiver.start()
+
+        sender = Messenger()
+        address = sock.getsockname()
+        for i in range(100):
+            sender.send(address, {"message_type": "finished", "task_id": i},
+                        framed=True)
+        sender.send(address, {"message_type": "shutdown"})
+        assert done.wait(10)
+
+        # One persistent connection carried every framed message
+        assert len(sender.connections) == 1
+        sender.close()
+        receiver.join()
+
+    # Framed messages arrive in order
+    assert [m["task_id"] for m in received if "task_id" in m] == \
+        list(range(100))
+    assert {"message_type": "shutdown"} in received
@@ -0,0 +1,52 @@
+"""See unit test function docstring."""
+
+from pathlib import Path
+import pytest
+import utils
+from utils import TESTDATA_DIR
+
+
+@pytest.mark.parametrize("mapreduce_client", [
+    {
+        "manager_args": ["--engine", "asyncio"],
+        "worker_args": ["--engine", "asyncio"],
+    },
+    {
+        "manager_args": ["--engine", "asyncio"],
+        "worker_args": ["--engine", "asyncio", "--protocol", "framed"],
+    },
+    {
+        "manager_args": ["--engine", "asyncio"],
+        "worker_args": ["--protocol", "framed"],
+    },
+], indirect=True)
+def test_wordcount_asyncio(mapreduce_client, tmp_path):
+    """Run word count jobs on a Manager and Workers using asyncio engines.
+
+    Also covers threaded Workers talking to an asyncio Manager.
+
+    Note: 'mapreduce_client' is a fixture function that starts a fresh Manager
+    and Workers.  It is implemented in conftest.py and reused by many tests.
+    Docs: https://docs.pytest.org/en/latest/fixture.html
+    """
+    utils.send_message({
+        "message_type": "new_manager_job",
+        "input_directory": TESTDATA_DIR/"input",
+        "output_directory": tmp_path/"output1",
+        "mapper_executable": TESTDATA_DIR/"exec/wc_map.sh",
+        "reducer_executable": TESTDATA_DIR/"exec/wc_reduce.sh",
+        "num_mappers": 2,
+        "num_reducers": 2
+    }, port=mapreduce_client.manager_port)
+    utils.wait_for_exists(f"{tmp_path}/output1/part-00000")
+    utils.wait_for_exists(f"{tmp_path}/output1/part-00001")
+
+    # Verify final output file contents
+    word_count_correct = Path(TESTDATA_DIR/"correct/word_count_correct.txt")
+    actual = []
+    for part in ("part-00000", "part-00001"):
+        with (tmp_path/"output1"/part).open(encoding="utf-8") as infile:
+            actual.extend(infile.readlines())
+    with word_count_correct.open(encoding="utf-8") as infile:
+        correct = sorted(infile.readlines())
+    assert sorted(actual) == correct
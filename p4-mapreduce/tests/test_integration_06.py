@@ -0,0 +1,54 @@
+"""See unit test function docstring."""
+
+from pathlib import Path
+import pytest
+import utils
+from utils import TESTDATA_DIR
+
+
+@pytest.mark.parametrize("mapreduce_client", [
+    {
+        "manager_args": ["--shuffle", "direct"],
+        "worker_args": ["--shuffle-port", "0"],
+    },
+    {
+        "manager_args": ["--shuffle", "direct", "--engine", "asyncio"],
+        "worker_args": ["--shuffle-port", "0", "--engine", "asyncio",
+                        "--protocol", "framed"],
+    },
+    {
+        "manager_args": ["--shuffle", "direct"],
+        "worker_args": [],
+    },
+], indirect=True)
+def test_wordcount_direct_shuffle(mapreduce_client, tmp_path):
+    """Run a word count job passing map outputs from Worker to Worker.
+
+    Workers without a shuffle server fall back to the shared directory.
+
+    Note: 'mapreduce_client' is a fixture function that starts a fresh Manager
+    and Workers.  It is implemented in conftest.py and reused by many tests.
+    Docs: https://docs.pytest.org/en/latest/fixture.html
+    """
+    utils.send_message({
+        "message_type": "new_manager_job",
+        "input_directory": TESTDATA_DIR/"input",
+        "output_directory": tmp_path/"output",
+        "mapper_executable": TESTDATA_DIR/"exec/wc_map.sh",
+        "reducer_executable": TESTDATA_DIR/"exec/wc_reduce.sh",
+        "num_mappers": 4,
+        "num_reducers": 3
+    }, port=mapreduce_client.manager_port)
+    for i in range(3):
+        utils.wait_for_exists(f"{tmp_path}/output/part-{i:05d}")
+
+    # Verify final output file contents
+    word_count_correct = Path(TESTDATA_DIR/"correct/word_count_correct.txt")
+    actual = []
+    for i in range(3):
+        part = tmp_path/"output"/f"part-{i:05d}"
+        with part.open(encoding="utf-8") as infile:
+            actual.extend(infile.readlines())
+    with word_count_correct.open(encoding="utf-8") as infile:
+        correct = sorted(infile.readlines())
+    assert sorted(actual) == correct
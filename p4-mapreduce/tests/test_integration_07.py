@@ -0,0 +1,51 @@
+"""See unit test function docstring."""
+
+from pathlib import Path
+import pytest
+import utils
+from utils import TESTDATA_DIR
+
+
+@pytest.mark.parametrize("mapreduce_client", [
+    {
+        "manager_args": ["--reduce-slowstart", "0.25"],
+        "worker_args": ["--merge-factor", "2"],
+    },
+    {
+        "manager_args": ["--reduce-slowstart", "0", "--reduce-rampup", "1",
+                         "--shuffle", "direct", "--engine", "asyncio"],
+        "worker_args": ["--merge-factor", "2", "--shuffle-port", "0",
+                        "--engine", "asyncio"],
+    },
+], indirect=True)
+def test_wordcount_reduce_slowstart(mapreduce_client, tmp_path):
+    """Run a word count job whose reduce tasks start during the map phase.
+
+    The reduce tasks merge map outputs into runs as they are written.
+
+    Note: 'mapreduce_client' is a fixture function that starts a fresh Manager
+    and Workers.  It is implemented in conftest.py and reused by many tests.
+    Docs: https://docs.pytest.org/en/latest/fixture.html
+    """
+    utils.send_message({
+        "message_type": "new_manager_job",
+        "input_directory": TESTDATA_DIR/"input",
+        "output_directory": tmp_path/"output",
+        "mapper_executable": TESTDATA_DIR/"exec/wc_map.sh",
+        "reducer_executable": TESTDATA_DIR/"exec/wc_reduce.sh",
+        "num_mappers": 8,
+        "num_reducers": 2
+    }, port=mapreduce_client.manager_port)
+    for i in range(2):
+        utils.wait_for_exists(f"{tmp_path}/output/part-{i:05d}")
+
+    # Verify final output file contents
+    word_count_correct = Path(TESTDATA_DIR/"correct/word_count_correct.txt")
+    actual = []
+    for i in range(2):
+        part = tmp_path/"output"/f"part-{i:05d}"
+        with part.open(encoding="utf-8") as infile:
+            actual.extend(infile.readlines())
+    with word_count_correct.open(encoding="utf-8") as infile:
+        correct = sorted(infile.readlines())
+    assert sorted(actual) == correct
@@ -0,0 +1,46 @@
+"""See unit test function docstring."""
+
+from pathlib import Path
+import pytest
+import utils
+from utils import TESTDATA_DIR
+
+
+@pytest.mark.parametrize("mapreduce_client", [
+    {"manager_args": [], "worker_args": []},
+    {
+        "manager_args": ["--shuffle", "direct", "--reduce-slowstart", "0.5"],
+        "worker_args": ["--shuffle-port", "0", "--merge-factor", "2"],
+    },
+], indirect=True)
+@pytest.mark.parametrize("codec", ["zlib", "lzma", "bz2"])
+def test_wordcount_compressed(mapreduce_client, codec, tmp_path):
+    """Run a word count job whose intermediate files are compressed.
+
+    Note: 'mapreduce_client' is a fixture function that starts a fresh Manager
+    and Workers.  It is implemented in conftest.py and reused by many tests.
+    Docs: https://docs.pytest.org/en/latest/fixture.html
+    """
+    utils.send_message({
+        "message_type": "new_manager_job",
+        "input_directory": TESTDATA_DIR/"input",
+        "output_directory": tmp_path/"output",
+        "mapper_executable": TESTDATA_DIR/"exec/wc_map.sh",
+        "reducer_executable": TESTDATA_DIR/"exec/wc_reduce.sh",
+        "num_mappers": 4,
+        "num_reducers": 2,
+        "intermediate_compression": codec,
+    }, port=mapreduce_client.manager_port)
+    for i in range(2):
+        utils.wait_for_exists(f"{tmp_path}/output/part-{i:05d}")
+
+    # Verify final output file contents
+    word_count_correct = Path(TESTDATA_DIR/"correct/word_count_correct.txt")
+    actual = []
+    for i in range(2):
+        part = tmp_path/"output"/f"part-{i:05d}"
+        with part.open(encoding="utf-8") as infile:
+            actual.extend(infile.readlines())
+    with word_count_correct.open(encoding="utf-8") as infile:
+        correct = sorted(infile.readlines())
+    assert sorted(actual) == correct
@@ -0,0 +1,111 @@
+"""See unit test function docstring."""
+
+import contextlib
+import re
+import shutil
+import socket
+import subprocess
+import time
+from pathlib import Path
+from mapreduce.manager.journal import Journal
+import utils
+from utils import TESTDATA_DIR
+
+
+def start_cluster(stack, tmp_path, nworkers=2):
+    """Start a Manager journaling to tmp_path and nworkers Workers.
+
+    Return the Manager's port and the processes, the Manager first.
+    """
+    manager_port, *worker_ports = utils.get_open_port(nports=1 + nworkers)
+    processes = [stack.enter_context(subprocess.Popen([
+        shutil.which("mapreduce-manager"),
+        "--port", str(manager_port),
+        "--shared_dir", str(tmp_path),
+        "--journal", str(tmp_path/"journal"),
+        "--logfile", str(tmp_path/"manager.log"),
+    ]))]
+    wait_for_port(manager_port)
+    for worker_port in worker_ports:
+        processes.append(stack.enter_context(subprocess.Popen([
+            shutil.which("mapreduce-worker"),
+            "--port", str(worker_port),
+            "--manager-port", str(manager_port),
+        ])))
+        wait_for_port(worker_port)
+    return manager_port, processes
+
+
+def wait_for_port(port):
+    """Wait until a server listens on port."""
+    for _ in range(10 * utils.TIMEOUT):
+        with contextlib.suppress(ConnectionRefusedError), \
+                socket.create_connection(("localhost", port)):
+            return
+        time.sleep(0.1)
+    raise TimeoutError(f"Nothing listening on port {port}")
+
+
+def journaled_map_tasks(path):
+    """Return how many map tasks the journal at path says finished."""
+    with contextlib.suppress(FileNotFoundError), \
+            open(path, encoding="utf-8") as infile:
+        return sum(1 for line in infile if '"phase": "map"' in line)
+    return 0
+
+
+def test_manager_crash_recovery(tmp_path):
+    """Run a job, kill the whole cluster midway and restart it.
+
+    The restarted Manager must resume the job from its journal, running
+    only the map tasks that had not finished, and produce the same output.
+    """
+    with contextlib.ExitStack() as stack:
+        manager_port, processes = start_cluster(stack, tmp_path)
+        utils.send_message({
+            "message_type": "new_manager_job",
+            "input_directory": TESTDATA_DIR/"input",
+            "output_directory": tmp_path/"output",
+            "mapper_executable": TESTDATA_DIR/"exec/wc_map_slow.sh",
+            "reducer_executable": TESTDATA_DIR/"exec/wc_reduce.sh",
+            "num_mappers": 4,
+            "num_reducers": 2
+        }, port=manager_port)
+
+        # crash once some map tasks have finished
+        for _ in range(10 * utils.TIMEOUT):
+            if journaled_map_tasks(tmp_path/"journal"):
+                break
+            time.sleep(0.1)
+        for process in processes:
+            process.kill()
+            process.wait()
+        assert not (tmp_path/"output"/"part-00000").exists()
+
+    with contextlib.ExitStack() as stack:
+        manager_port, processes = start_cluster(stack, tmp_path)
+        utils.wait_for_exists(*(f"{tmp_path}/output/part-{i:05d}"
+                                for i in range(2)))
+        utils.send_message({"message_type": "shutdown"}, port=manager_port)
+        for process in processes:
+            assert process.wait(timeout=utils.TIMEOUT) == 0
+
+    # Verify final output file contents
+    word_count_correct = Path(TESTDATA_DIR/"correct/word_count_correct.txt")
+    actual = []
+    for i in range(2):
+        part = tmp_path/"output"/f"part-{i:05d}"
+        with part.open(encoding="utf-8") as infile:
+            actual.extend(infile.readlines())
+    with word_count_correct.open(encoding="utf-8") as infile:
+        correct = sorted(infile.readlines())
+    assert sorted(actual) == correct
+
+    # The map tasks finished before the crash did not run again, and the
+    # finished job left neither a job to resume nor a shared directory
+    log = (tmp_path/"manager.log").read_text(encoding="utf-8")
+    assert re.search(r"Job 0 has [1-4] map tasks done already", log)
+    journal = Journal(str(tmp_path/"journal"))
+    journal.close()
+    assert not journal.jobs
+    assert not list(tmp_path.glob("mapreduce-shared-*"))
@@ -0,0 +1,94 @@
+"""See unit test function docstring."""
+
+import json
+import pytest
+from click.testing import CliRunner
+import mapreduce.status
+import mapreduce.submit
+from mapreduce.utils import receive_reply, send_query
+import utils
+from utils import TESTDATA_DIR
+
+
+def query(port, message):
+    """Send message to the Manager on port and return its reply."""
+    with send_query(("localhost", port), message) as listener:
+        return receive_reply(listener, timeout=utils.TIMEOUT_LONG)
+
+
+@pytest.mark.parametrize("mapreduce_client", [
+    {},
+    {"manager_args": ["--engine", "asyncio"]},
+], indirect=True)
+def test_job_status(mapreduce_client, tmp_path):
+    """Follow a job with job_status and list_jobs until it finishes.
+
+    Note: 'mapreduce_client' is a fixture function that starts a fresh Manager
+    and Workers.  It is implemented in conftest.py and reused by many tests.
+    Docs: https://docs.pytest.org/en/latest/fixture.html
+    """
+    port = mapreduce_client.manager_port
+    assert query(port, {"message_type": "list_jobs"}) == {
+        "message_type": "list_jobs",
+        "jobs": [],
+    }
+    utils.send_message({
+        "message_type": "new_manager_job",
+        "input_directory": TESTDATA_DIR/"input",
+        "output_directory": tmp_path/"output",
+        "mapper_executable": TESTDATA_DIR/"exec/wc_map_slow.sh",
+        "reducer_executable": TESTDATA_DIR/"exec/wc_reduce.sh",
+        "num_mappers": 2,
+        "num_reducers": 1
+    }, port=port)
+
+    reply = query(port, {"message_type": "job_status", "job_id": 0})
+    status = reply["status"]
+    assert status["state"] in ("queued", "running")
+    assert status["output_directory"] == str(tmp_path/"output")
+    assert query(port, {"message_type": "job_status", "job_id": 1}) == {
+        "message_type": "job_status",
+        "job_id": 1,
+        "status": None,
+    }
+
+    # block until the job is over
+    reply = query(port, {"message_type": "job_status", "job_id": 0,
+                         "wait": True})
+    status = reply["status"]
+    assert status["state"] == "done"
+    assert status["eta"] == 0
+    for name, total in (("map", 2), ("reduce", 1)):
+        phase = status["phases"][name]
+        assert (phase["done"], phase["total"], phase["running"]) == \
+            (total, total, 0)
+        assert len(phase["durations"]) == total
+    assert status["phases"]["map"]["durations"]["0"] >= 3
+    assert status["bytes"]["map_input"] > 0
+    assert status["bytes"]["map_output"] == status["bytes"]["reduce_input"]
+    output = tmp_path/"output"/"part-00000"
+    assert status["bytes"]["reduce_output"] == output.stat().st_size
+
+    reply = query(port, {"message_type": "list_jobs"})
+    assert [job["state"] for job in reply["jobs"]] == ["done"]
+
+    # the command line tools
+    runner = CliRunner()
+    result = runner.invoke(mapreduce.status.main,
+                           ["--port", str(port), "--json", "0"])
+    assert result.exit_code == 0, result.output
+    assert json.loads(result.output)["state"] == "done"
+    result = runner.invoke(mapreduce.status.main, ["--port", str(port)])
+    assert result.exit_code == 0, result.output
+    assert result.output.startswith("job 0  done")
+    result = runner.invoke(mapreduce.submit.main, [
+        "--port", str(port),
+        "--input", str(TESTDATA_DIR/"input"),
+        "--output", str(tmp_path/"output1"),
+        "--mapper", str(TESTDATA_DIR/"exec/wc_map.sh"),
+        "--reducer", str(TESTDATA_DIR/"exec/wc_reduce.sh"),
+        "--wait",
+    ])
+    assert result.exit_code == 0, result.output
+    assert "job 1  done" in result.output
+    assert (tmp_path/"output1"/"part-00001").exists()
@@ -0,0 +1,89 @@
+"""See unit test function docstring."""
+
+import json
+from mapreduce.manager.journal import Journal
+
+
+def new_spec(tmp_path, name):
+    """Return a minimal new_manager_job message, without its id."""
+    return {
+        "input_directory": str(tmp_path/"input"),
+        "output_directory": str(tmp_path/name),
+        "num_mappers": 2,
+        "num_reducers": 2,
+    }
+
+
+def test_journal_replay(tmp_path):
+    """Verify a reopened journal resumes the unfinished jobs only.
+
+    A finished job is dropped, and the unfinished one keeps its shared
+    directory and the tasks whose output is still there.  A torn last
+    record is ignored, and the journal is compacted on reopening.
+    """
+    path = str(tmp_path/"journal")
+    journal = Journal(path)
+    done, unfinished = new_spec(tmp_path, "done"), new_spec(tmp_path, "out")
+    journal.job(done)
+    journal.job(unfinished)
+    assert (done["id"], unfinished["id"]) == (0, 1)
+    (tmp_path/"shared").mkdir()
+    journal.start(0, str(tmp_path/"shared0"))
+    journal.start(1, str(tmp_path/"shared"))
+    journal.task(1, "map", 0, ("localhost", 3001))
+    journal.task(1, "map", 1, ("localhost", 3002))
+    journal.task(1, "reduce", 0, ("localhost", 3001))
+    journal.task(1, "reduce", 1, ("localhost", 3002))
+    journal.done(0)
+    journal.close()
+    with open(path, "a", encoding="utf-8") as outfile:
+        outfile.write('{"event": "task", "job_id": 1, "pha')
+
+    # only reduce task 1 wrote its output before the crash
+    (tmp_path/"out").mkdir()
+    (tmp_path/"out"/"part-00001").touch()
+
+    journal = Journal(path)
+    assert list(journal.jobs) == [1]
+    assert journal.tmpdir(1) == str(tmp_path/"shared")
+    assert journal.finished_tasks(1, "map") == {
+        0: ("localhost", 3001),
+        1: ("localhost", 3002),
+    }
+    assert journal.finished_tasks(1, "reduce") == {1: ("localhost", 3002)}
+    journal.job(new_spec(tmp_path, "next"))
+    assert journal.job_id == 2
+    journal.close()
+
+    with open(path, encoding="utf-8") as infile:
+        events = [json.loads(line)["event"] for line in infile]
+    assert events == ["job", "start", "task", "task", "task", "task", "job"]
+
+
+def test_journal_new_tmpdir(tmp_path):
+    """Verify map outputs are forgotten once a job gets a new tmpdir."""
+    path = str(tmp_path/"journal")
+    journal = Journal(path)
+    journal.job(new_spec(tmp_path, "out"))
+    journal.start(0, str(tmp_path/"gone"))
+    journal.task(0, "map", 0, ("localhost", 3001))
+    journal.close()
+
+    journal = Journal(path)
+    assert journal.tmpdir(0) is None
+    journal.start(0, str(tmp_path))
+    assert journal.finished_tasks(0, "map") == {}
+    journal.close()
+
+
+def test_journal_in_memory(tmp_path):
+    """Verify a journal without a path only hands out job ids."""
+    journal = Journal()
+    assert not journal.durable
+    for job_id in range(3):
+        spec = new_spec(tmp_path, f"out{job_id}")
+        journal.job(spec)
+        assert spec["id"] == job_id
+        journal.done(job_id)
+    assert not journal.jobs
+    assert not list(tmp_path.iterdir())
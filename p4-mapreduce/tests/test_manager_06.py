@@ -0,0 +1,211 @@
+"""See unit test function docstring."""
+
+import json
+import tempfile
+import mapreduce
+import utils
+from utils import TESTDATA_DIR
+
+
+def finished(task_id):
+    """Return a status finished message from Worker 3001."""
+    return json.dumps({
+        "message_type": "finished",
+        "task_id": task_id,
+        "worker_host": "localhost",
+        "worker_port": 3001,
+    }).encode("utf-8")
+
+
+def worker_message_generator(mock_sendall, tmp_path):
+    """Fake Worker messages."""
+    # Worker register
+    yield json.dumps({
+        "message_type": "register",
+        "worker_host": "localhost",
+        "worker_port": 3001,
+    }).encode("utf-8")
+    yield None
+
+    # User submits two jobs, the second reading the output of the first.
+    # The trailing slash must not stop the Manager from chaining them.
+    yield json.dumps({
+        "message_type": "new_manager_job",
+        "input_directory": TESTDATA_DIR/"input",
+        "output_directory": f"{tmp_path}/output0",
+        "mapper_executable": TESTDATA_DIR/"exec/wc_map.sh",
+        "reducer_executable": TESTDATA_DIR/"exec/wc_reduce.sh",
+        "num_mappers": 1,
+        "num_reducers": 2
+    }, cls=utils.PathJSONEncoder).encode("utf-8")
+    yield None
+    yield json.dumps({
+        "message_type": "new_manager_job",
+        "input_directory": f"{tmp_path}/output0/",
+        "output_directory": f"{tmp_path}/output1",
+        "mapper_executable": TESTDATA_DIR/"exec/wc_map.sh",
+        "reducer_executable": TESTDATA_DIR/"exec/wc_reduce.sh",
+        "num_mappers": 2,
+        "num_reducers": 1
+    }, cls=utils.PathJSONEncoder).encode("utf-8")
+    yield None
+
+    # Simulate the files written by the first job's only map task
+    tmpdir_job0 = None
+    for tmpdir_job0 in (
+        utils.wait_for_exists_glob(f"{tmp_path}/mapreduce-shared-job00000-*")
+    ):
+        yield None
+    (tmpdir_job0/"maptask00000-part00000").touch()
+    (tmpdir_job0/"maptask00000-part00001").touch()
+
+    # Job 0 map task 0
+    for _ in utils.wait_for_map_messages(mock_sendall, num=1):
+        yield None
+    yield finished(0)
+    yield None
+
+    # Job 0 reduce task 0 writes part-00000, which job 1 map task 0 reads
+    for _ in utils.wait_for_reduce_messages(mock_sendall, num=1):
+        yield None
+    yield finished(0)
+    yield None
+
+    # Job 1 map task 0
+    for _ in utils.wait_for_map_messages(mock_sendall, num=2):
+        yield None
+    yield finished(0)
+    yield None
+
+    # Job 0 reduce task 1, after which job 1 map task 1 can run
+    for _ in utils.wait_for_reduce_messages(mock_sendall, num=2):
+        yield None
+    yield finished(1)
+    yield None
+    for _ in utils.wait_for_map_messages(mock_sendall, num=3):
+        yield None
+
+    # Shutdown
+    yield json.dumps({
+        "message_type": "shutdown",
+    }).encode("utf-8")
+    yield None
+
+
+def test_pipelined_jobs(mocker, tmp_path):
+    """Verify a job reading another job's output maps each file once written.
+
+    With two jobs allowed at once, the second job's map task reading
+    part-XXXXX is sent as soon as the reduce task writing that file
+    finishes, while the first job is still reducing.
+
+    Note: 'mocker' is a fixture function provided by the pytest-mock package.
+    This fixture lets us override a library function with a temporary fake
+    function that returns a hardcoded value while testing.
+
+    See https://github.com/pytest-dev/pytest-mock/ for more info.
+
+    Note: 'tmp_path' is a fixture provided by the pytest-mock package.
+    This fixture creates a temporary directory for use within this test.
+
+    See https://docs.pytest.org/en/6.2.x/tmpdir.html for more info.
+    """
+    # Mock the socket library socket class
+    mock_socket = mocker.patch("socket.socket")
+
+    # sendall() records messages
+    mock_sendall = mock_socket.return_value.__enter__.return_value.sendall
+
+    # accept() returns a mock client socket
+    mock_clientsocket = mocker.MagicMock()
+    mock_accept = mock_socket.return_value.__enter__.return_value.accept
+    mock_accept.return_value = (mock_clientsocket, ("127.0.0.1", 10000))
+
+    # TCP recv() returns values generated by worker_message_generator()
+    mock_recv = mock_clientsocket.recv
+    mock_recv.side_effect = worker_message_generator(mock_sendall, tmp_path)
+
+    # UDP recv() returns heartbeat messages
+    mock_udp_recv = mock_socket.return_value.__enter__.return_value.recv
+    mock_udp_recv.side_effect = utils.worker_heartbeat_generator(3001)
+
+    # Set the location where the Manager's temporary directory
+    # will be created.
+    tempfile.tempdir = tmp_path
+
+    # Spy on tempfile.TemporaryDirectory so that we can determine the name
+    # of the directory that was created.
+    mock_tmpdir = mocker.spy(tempfile.TemporaryDirectory, "__init__")
+
+    # Run student Manager code.  When student Manager calls recv(), it will
+    # return the faked responses configured above.
+    try:
+        mapreduce.manager.Manager("localhost", 6000,
+                                  {"max_concurrent_jobs": 2})
+        utils.wait_for_threads()
+    except SystemExit as error:
+        assert error.code == 0
+
+    # Both jobs ran at once
+    assert mock_tmpdir.call_count == 2
+    tmpdir_job0 = utils.get_tmpdir_name(mock_tmpdir, 0)
+    tmpdir_job1 = utils.get_tmpdir_name(mock_tmpdir, 1)
+
+    # Verify the task messages sent by the Manager, in order
+    messages = utils.get_messages(mock_sendall)
+    tasks = [
+        message for message in messages
+        if utils.is_map_message(message) or utils.is_reduce_message(message)
+    ]
+    assert tasks == [
+        {
+            "message_type": "new_map_task",
+            "task_id": 0,
+            "executable": str(TESTDATA_DIR/"exec/wc_map.sh"),
+            "input_paths": [
+                str(TESTDATA_DIR/f"input/file{i:02d}") for i in range(1, 9)
+            ],
+            "output_directory": tmpdir_job0,
+            "num_partitions": 2,
+            "worker_host": "localhost",
+            "worker_port": 3001,
+        },
+        {
+            "message_type": "new_reduce_task",
+            "task_id": 0,
+            "executable": str(TESTDATA_DIR/"exec/wc_reduce.sh"),
+            "input_paths": [f"{tmpdir_job0}/maptask00000-part00000"],
+            "output_directory": f"{tmp_path}/output0",
+            "worker_host": "localhost",
+            "worker_port": 3001,
+        },
+        {
+            "message_type": "new_map_task",
+            "task_id": 0,
+            "executable": str(TESTDATA_DIR/"exec/wc_map.sh"),
+            "input_paths": [f"{tmp_path}/output0/part-00000"],
+            "output_directory": tmpdir_job1,
+            "num_partitions": 1,
+            "worker_host": "localhost",
+            "worker_port": 3001,
+        },
+        {
+            "message_type": "new_reduce_task",
+            "task_id": 1,
+            "executable": str(TESTDATA_DIR/"exec/wc_reduce.sh"),
+            "input_paths": [f"{tmpdir_job0}/maptask00000-part00001"],
+            "output_directory": f"{tmp_path}/output0",
+            "worker_host": "localhost",
+            "worker_port": 3001,
+        },
+        {
+            "message_type": "new_map_task",
+            "task_id": 1,
+            "executable": str(TESTDATA_DIR/"exec/wc_map.sh"),
+            "input_paths": [f"{tmp_path}/output0/part-00001"],
+            "output_directory": tmpdir_job1,
+            "num_partitions": 1,
+            "worker_host": "localhost",
+            "worker_port": 3001,
+        },
+    ]
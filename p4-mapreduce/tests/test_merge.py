@@ -0,0 +1,41 @@
+"""See unit test function docstring."""
+
+import contextlib
+import heapq
+import random
+import pytest
+from mapreduce.worker.compression import open_intermediate
+from mapreduce.worker.merge import merged_lines
+from mapreduce.worker.tasks import text_lines, write_lines
+
+
+@pytest.mark.parametrize("codec", [None, "zlib"])
+def test_bytes_merge_matches_text(codec, tmp_path):
+    """Verify merging inputs as bytes gives the lines merging text does."""
+    rand = random.Random(485)
+    keys = ["a", "A", "a b", "a\tb", "ab", "é", "é", "z", "Ω",
+            "日本", "\U0001f600", "~", ""]
+    paths = []
+    for i in range(5):
+        lines = sorted(f"{rand.choice(keys)}{rand.choice(keys)}\t{i}\n"
+                       for _ in range(200))
+        paths.append(tmp_path/f"maptask{i:05d}-part00000")
+        write_lines(paths[-1], lines, codec)
+
+    with contextlib.ExitStack() as stack:
+        files = [stack.enter_context(open_intermediate(path, codec=codec))
+                 for path in paths]
+        expected = list(heapq.merge(*files))
+    with contextlib.ExitStack() as stack:
+        actual = list(merged_lines(stack, paths, codec))
+    assert b"".join(actual) == "".join(expected).encode("utf-8")
+    assert actual == [line.encode("utf-8") for line in expected]
+
+
+def test_text_lines():
+    """Verify map output bytes split into lines as a text pipe splits them."""
+    assert text_lines(b"hello\t1\n") == ["hello\t1\n"]
+    assert text_lines("héllo\t1".encode("utf-8")) == ["héllo\t1"]
+    assert text_lines(b"a\t1\r\n") == ["a\t1\n"]
+    assert text_lines(b"a\t1\rb\t1\n") == ["a\t1\n", "b\t1\n"]
+    assert text_lines(b"a\t1\r") == ["a\t1\n"]
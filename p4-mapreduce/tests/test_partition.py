@@ -0,0 +1,47 @@
+"""See unit test function docstring."""
+
+import hashlib
+from mapreduce.worker.partition import make_partitioner
+
+
+LINES = [f"word{i}\t1\n" for i in range(1000)] + ["no tab\n", "\t1\n"]
+
+
+def test_md5_matches_original():
+    """Verify the md5 partitioner reproduces the original partitions."""
+    partition = make_partitioner("md5", 7)
+    for line in LINES:
+        key = line.partition("\t")[0]
+        hexdigest = hashlib.md5(key.encode("utf-8")).hexdigest()
+        assert partition(line) == int(hexdigest, base=16) % 7
+
+
+def test_fast_groups_keys():
+    """Verify the fast partitioner sends a key to one partition."""
+    partition = make_partitioner("fast", 7)
+    assert partition("word1\t1\n") == partition("word1\t2\n")
+    assert {partition(line) for line in LINES} == set(range(7))
+
+
+def test_range():
+    """Verify the range partitioner keeps keys in sorted ranges."""
+    partition = make_partitioner("range", 3, ["h", "p"])
+    assert [partition(f"{key}\t1\n") for key in ["a", "h", "o", "p", "z"]] \
+        == [0, 1, 1, 2, 2]
+
+
+def test_custom(tmp_path, monkeypatch):
+    """Verify a module:function partitioner is imported and called."""
+    (tmp_path/"by_length.py").write_text(
+        "def partition(key, num_partitions):\n"
+        "    return len(key) % num_partitions\n"
+    )
+    monkeypatch.syspath_prepend(str(tmp_path))
+    partition = make_partitioner("by_length:partition", 4)
+    assert partition("abcde\t1\n") == 1
+
+
+def test_one_partition():
+    """Verify every line goes to partition 0 when there is only one."""
+    partition = make_partitioner("range", 1)
+    assert partition("z\t1\n") == 0
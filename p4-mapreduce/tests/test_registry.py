@@ -0,0 +1,48 @@
+"""See unit test function docstring."""
+
+import time
+from mapreduce.manager.registry import WorkerRegistry
+
+
+def new_worker(port, state="ready"):
+    """Return a worker as the Manager registers it."""
+    return {"host": "localhost", "port": port, "state": state}
+
+
+def test_ready_queue():
+    """Verify ready workers are handed out in the order they became ready."""
+    worker1, worker2, worker3 = (new_worker(port) for port in (1, 2, 3))
+    registry = WorkerRegistry([worker1, worker2, worker3])
+    assert registry.find("localhost", 2) is worker2
+    assert registry.find("localhost", 4) is None
+
+    # A worker taken off the queue goes to its back when ready again
+    assert registry.next_ready() is worker1
+    registry.set_state(worker1, "busy")
+    registry.set_state(worker2, "dead")
+    assert registry.next_ready() is worker3
+    registry.set_state(worker3, "busy")
+    assert registry.next_ready() is None
+    registry.set_state(worker1, "ready")
+    registry.set_state(worker2, "ready")
+    assert registry.next_ready() is worker1
+    assert worker1["state"] == "ready"
+    assert registry.count("ready") == 2
+    assert registry.count("busy") == 1
+    assert [worker["port"] for worker in registry] == [1, 2, 3]
+
+
+def test_silent_workers():
+    """Verify only workers not heard from within the timeout are silent."""
+    worker1, worker2 = new_worker(1), new_worker(2)
+    registry = WorkerRegistry([worker1, worker2])
+    time.sleep(0.2)
+    registry.seen(worker1)
+    assert registry.silent(0.1) == [worker2]
+
+    # Dead workers are not reported again, until they are heard from
+    registry.set_state(worker2, "dead")
+    assert not registry.silent(0.1)
+    registry.seen(worker2)
+    time.sleep(0.2)
+    assert registry.silent(0.1) == [worker1, worker2]
@@ -0,0 +1,323 @@
+"""See unit test function docstring."""
+
+import threading
+import time
+from mapreduce.manager.registry import WorkerRegistry
+from mapreduce.manager.scheduler import Scheduler
+from mapreduce.manager.__main__ import DEFAULT_OPTIONS
+
+
+def new_scheduler(workers, **options):
+    """Return a Scheduler over workers with the default Manager options."""
+    return Scheduler(WorkerRegistry(workers), {**DEFAULT_OPTIONS, **options})
+
+
+def new_job(job_id, output_directory="output"):
+    """Return a minimal new_manager_job message."""
+    return {
+        "id": job_id,
+        "input_directory": "input",
+        "output_directory": output_directory,
+        "num_mappers": 2,
+        "num_reducers": 1,
+    }
+
+
+def start(scheduler, tasks):
+    """Admit the next job and give it map tasks, return the job."""
+    kind, job = scheduler.next_action()
+    assert kind == "start"
+    scheduler.start_phase(job, "map", tasks)
+    return job
+
+
+def test_dispatch_on_finished():
+    """Verify the scheduler hands out a task as soon as a worker frees up.
+
+    One worker and two tasks: the second task must be assigned the moment
+    the first one finishes, without waiting on a polling interval.
+    """
+    worker = {"host": "localhost", "port": 3001, "state": "ready"}
+    scheduler = new_scheduler([worker])
+    scheduler.add_job(new_job(0))
+    job = start(scheduler, [{"id": 0}, {"id": 1}])
+
+    assert scheduler.next_action() == ("assign", job, worker, {"id": 0})
+    assert worker["state"] == "busy"
+
+    # Finish the first task from another thread, like run_socket would
+    timer = threading.Timer(0.2, scheduler.finished, args=(worker, 0))
+    timer.start()
+    start_time = time.perf_counter()
+    assert scheduler.next_action() == ("assign", job, worker, {"id": 1})
+    assert time.perf_counter() - start_time < 0.3
+    timer.join()
+
+    # The map phase ends once the last task finishes
+    scheduler.finished(worker, 1)
+    assert scheduler.next_action() == ("reduce", job)
+
+
+def test_dead_worker_requeues():
+    """Verify a dead worker's task goes to the next ready worker."""
+    worker1 = {"host": "localhost", "port": 3001, "state": "ready"}
+    worker2 = {"host": "localhost", "port": 3002, "state": "busy"}
+    scheduler = new_scheduler([worker1, worker2])
+    scheduler.add_job(new_job(0))
+    job = start(scheduler, [{"id": 0}])
+    assert scheduler.next_action() == ("assign", job, worker1, {"id": 0})
+
+    scheduler.dead(worker1)
+    scheduler.ready(worker2)
+    assert scheduler.next_action() == ("assign", job, worker2, {"id": 0})
+    assert worker1["state"] == "dead"
+
+
+def test_busy_worker_reregisters():
+    """Verify a busy worker that registers again loses its task."""
+    worker1 = {"host": "localhost", "port": 3001, "state": "ready"}
+    worker2 = {"host": "localhost", "port": 3002, "state": "busy"}
+    scheduler = new_scheduler([worker1, worker2])
+    scheduler.add_job(new_job(0))
+    job = start(scheduler, [{"id": 0}])
+    assert scheduler.next_action() == ("assign", job, worker1, {"id": 0})
+
+    # Worker 1 restarts before finishing, so its lost task runs again
+    scheduler.ready(worker1)
+    assert scheduler.next_action() == ("assign", job, worker1, {"id": 0})
+    scheduler.ready(worker2)
+    scheduler.finished(worker1, 0)
+    assert scheduler.next_action() == ("reduce", job)
+
+
+def test_next_job_fills_idle_workers():
+    """Verify a second job's map tasks run during the first job's reduce."""
+    worker1 = {"host": "localhost", "port": 3001, "state": "ready"}
+    worker2 = {"host": "localhost", "port": 3002, "state": "ready"}
+    scheduler = new_scheduler([worker1, worker2], max_concurrent_jobs=2)
+    scheduler.add_job(new_job(0))
+    job0 = start(scheduler, [])
+    assert scheduler.next_action() == ("reduce", job0)
+    scheduler.start_phase(job0, "reduce", [{"id": 0}])
+    scheduler.add_job(new_job(1))
+    job1 = start(scheduler, [{"id": 0}, {"id": 1}])
+
+    # One worker straggles on job 0's only reduce task, the other works on
+    # job 1 instead of idling
+    assert scheduler.next_action() == ("assign", job0, worker1, {"id": 0})
+    assert scheduler.next_action() == ("assign", job1, worker2, {"id": 0})
+
+
+def test_pipelined_job_waits_for_input():
+    """Verify a job reading another job's output waits for its reducers."""
+    worker = {"host": "localhost", "port": 3001, "state": "ready"}
+    scheduler = new_scheduler([worker], max_concurrent_jobs=2)
+    scheduler.add_job(new_job(0, output_directory="output0"))
+    job0 = start(scheduler, [])
+    assert scheduler.next_action() == ("reduce", job0)
+    scheduler.start_phase(job0, "reduce", [{"id": 0}])
+
+    assert scheduler.producer("output0") is job0
+    assert scheduler.producer("./output0/") is job0
+    scheduler.add_job(new_job(1))
+    job1 = start(scheduler, [{"id": 0, "after": [0]}])
+    job1.producer = job0
+
+    # Job 1's map task must wait for the reducer writing part-00000
+    assert scheduler.next_action() == ("assign", job0, worker, {"id": 0})
+    scheduler.finished(worker, 0)
+    assert scheduler.next_action() == ("done", job0)
+    assert scheduler.next_action() == (
+        "assign", job1, worker, {"id": 0, "after": [0]}
+    )
+
+
+def test_speculative_backup():
+    """Verify an idle worker backs up a straggler and the first wins."""
+    worker1 = {"host": "localhost", "port": 3001, "state": "ready"}
+    worker2 = {"host": "localhost", "port": 3002, "state": "ready"}
+    scheduler = new_scheduler([worker1, worker2], speculative_min_runtime=0)
+    scheduler.add_job(new_job(0))
+    job = start(scheduler, [{"id": 0}, {"id": 1}])
+    assert scheduler.next_action() == ("assign", job, worker1, {"id": 0})
+    assert scheduler.next_action() == ("assign", job, worker2, {"id": 1})
+
+    # Task 1 runs well past the median, so idle worker 1 backs it up
+    scheduler.finished(worker1, 0)
+    time.sleep(0.1)
+    assert scheduler.next_action() == ("assign", job, worker1, {"id": 1})
+
+    # The backup finishes first.  The straggler's late result is ignored.
+    scheduler.finished(worker1, 1, {"combine_input_bytes": 10})
+    assert scheduler.next_action() == ("reduce", job)
+    scheduler.finished(worker2, 1, {"combine_input_bytes": 10})
+    assert job.phase is None
+    assert job.counters["combine_input_bytes"] == 10
+    assert worker2["state"] == "ready"
+
+
+def test_stale_finished_ignored():
+    """Verify a revived worker's late result does not finish its new task."""
+    worker = {"host": "localhost", "port": 3001, "state": "ready"}
+    scheduler = new_scheduler([worker])
+    scheduler.add_job(new_job(0))
+    job = start(scheduler, [{"id": 0}, {"id": 1}])
+    assert scheduler.next_action() == ("assign", job, worker, {"id": 0})
+
+    # The worker is declared dead, comes back and is given task 1, then
+    # reports the task 0 it was running before
+    scheduler.dead(worker)
+    scheduler.ready(worker)
+    assert scheduler.next_action() == ("assign", job, worker, {"id": 1})
+    scheduler.finished(worker, 0)
+    assert worker["state"] == "busy"
+    assert not job.phase.done
+
+    scheduler.finished(worker, 1)
+    assert job.phase.done == {1}
+    assert scheduler.next_action() == ("assign", job, worker, {"id": 0})
+
+
+def test_stop_wakes_waiters():
+    """Verify shutdown releases a thread blocked waiting for a job."""
+    scheduler = new_scheduler([])
+    timer = threading.Timer(0.1, scheduler.stop)
+    timer.start()
+    assert scheduler.next_action() is None
+    timer.join()
+
+
+def test_map_locality():
+    """Verify a worker runs the map task whose input is on its disks."""
+    worker1 = {"host": "localhost", "port": 3001, "state": "ready",
+               "data_dirs": ["/data1"]}
+    worker2 = {"host": "localhost", "port": 3002, "state": "ready",
+               "data_dirs": ["/data2"]}
+    scheduler = new_scheduler([worker1, worker2])
+    scheduler.add_job(new_job(0))
+    task0 = {"id": 0, "inputs": [("/data2/file00", 100)]}
+    task1 = {"id": 1, "inputs": [("/data1/file01", 60),
+                                 ("/data2/file02", 40)]}
+    job = start(scheduler, [task0, task1])
+
+    # Each worker skips the first pending task for the one it holds
+    assert scheduler.next_action() == ("assign", job, worker1, task1)
+    assert scheduler.next_action() == ("assign", job, worker2, task0)
+    scheduler.finished(worker1, 1)
+    scheduler.finished(worker2, 0)
+    assert job.counters["map_input_bytes"] == 200
+    assert job.counters["map_local_bytes"] == 160
+    assert job.intermediate.writers == {0: ("localhost", 3002),
+                                        1: ("localhost", 3001)}
+
+
+def test_reduce_locality():
+    """Verify a reduce task runs where most of its input was written."""
+    worker1 = {"host": "localhost", "port": 3001, "state": "ready"}
+    worker2 = {"host": "localhost", "port": 3002, "state": "ready"}
+    scheduler = new_scheduler([worker1, worker2])
+    scheduler.add_job(new_job(0))
+    job = start(scheduler, [])
+    assert scheduler.next_action() == ("reduce", job)
+    task0 = {"id": 0, "inputs": [(("localhost", 3001), 10),
+                                 (("localhost", 3002), 90)]}
+    task1 = {"id": 1, "inputs": [(("localhost", 3001), 80),
+                                 (("localhost", 3002), 20)]}
+    scheduler.start_phase(job, "reduce", [task0, task1])
+
+    assert scheduler.next_action() == ("assign", job, worker1, task1)
+    assert scheduler.next_action() == ("assign", job, worker2, task0)
+    scheduler.finished(worker1, 1)
+    scheduler.finished(worker2, 0)
+    assert job.counters["reduce_local_bytes"] == 170
+
+
+def test_direct_shuffle_early_reduce():
+    """Verify reduce tasks start early and hear of each map output."""
+    worker1 = {"host": "localhost", "port": 3001, "state": "ready"}
+    worker2 = {"host": "localhost", "port": 3002, "state": "ready"}
+    scheduler = new_scheduler([worker1, worker2], shuffle="direct")
+    scheduler.add_job(new_job(0))
+    job = start(scheduler, [{"id": 0}, {"id": 1}])
+    assert scheduler.next_action() == ("assign", job, worker1, {"id": 0})
+    assert scheduler.next_action() == ("assign", job, worker2, {"id": 1})
+
+    # No map task waits for a worker, so the reduce tasks start
+    assert scheduler.next_action() == ("reduce", job)
+    assert job.intermediate.announced == set()
+    reduce_task = {"id": 0, "inputs": []}
+    scheduler.start_phase(job, "reduce", [reduce_task])
+    assert job.phase.name == "map"
+
+    # The reduce task runs on the first free worker, with the map
+    # outputs written so far, and later learns of the rest
+    scheduler.finished(worker2, 1, sizes=[7])
+    assert scheduler.next_action() == ("map_outputs", job, [1])
+    assert scheduler.next_action() == ("assign", job, worker2, reduce_task)
+    assert job.intermediate.sizes == {1: [7]}
+    scheduler.finished(worker1, 0, sizes=[5])
+    assert scheduler.next_action() == ("map_outputs", job, [0])
+    assert job.phase.name == "reduce"
+
+    scheduler.finished(worker2, 0)
+    assert scheduler.next_action() == ("done", job)
+
+
+def test_direct_shuffle_preempt():
+    """Verify an early reduce task gives way to a map task run again."""
+    worker1 = {"host": "localhost", "port": 3001, "state": "ready"}
+    worker2 = {"host": "localhost", "port": 3002, "state": "ready"}
+    scheduler = new_scheduler([worker1, worker2], shuffle="direct")
+    scheduler.add_job(new_job(0))
+    job = start(scheduler, [{"id": 0}, {"id": 1}])
+    assert scheduler.next_action() == ("assign", job, worker1, {"id": 0})
+    assert scheduler.next_action() == ("assign", job, worker2, {"id": 1})
+    assert scheduler.next_action() == ("reduce", job)
+    reduce_task = {"id": 0, "inputs": []}
+    scheduler.start_phase(job, "reduce", [reduce_task])
+    scheduler.finished(worker2, 1)
+    assert scheduler.next_action() == ("map_outputs", job, [1])
+    assert scheduler.next_action() == ("assign", job, worker2, reduce_task)
+
+    # Worker 1 dies.  Its map task can only run where the reduce task
+    # waits for it, so the reduce task is aborted and queued again.
+    scheduler.dead(worker1)
+    assert scheduler.next_action() == ("abort", job, worker2, reduce_task)
+    assert scheduler.next_action() == ("assign", job, worker2, {"id": 0})
+    assert list(job.next_phase.pending) == [reduce_task]
+
+
+def test_reduce_slowstart():
+    """Verify reduce tasks start once enough map tasks have finished.
+
+    An early reduce task goes before waiting map tasks only while early
+    reduce tasks hold less than half the workers.
+    """
+    worker1 = {"host": "localhost", "port": 3001, "state": "ready"}
+    worker2 = {"host": "localhost", "port": 3002, "state": "ready"}
+    scheduler = new_scheduler([worker1, worker2], reduce_slowstart=0.5)
+    scheduler.add_job(new_job(0))
+    job = start(scheduler, [{"id": i} for i in range(4)])
+    assert scheduler.next_action() == ("assign", job, worker1, {"id": 0})
+    assert scheduler.next_action() == ("assign", job, worker2, {"id": 1})
+    scheduler.finished(worker1, 0)
+    assert scheduler.next_action() == ("assign", job, worker1, {"id": 2})
+
+    # Half the map tasks are done
+    scheduler.finished(worker2, 1)
+    assert scheduler.next_action() == ("reduce", job)
+    assert job.intermediate.announced == {0, 1}
+    reduce_tasks = [{"id": 0, "inputs": []}, {"id": 1, "inputs": []}]
+    scheduler.start_phase(job, "reduce", reduce_tasks)
+    assert scheduler.next_action() == ("assign", job, worker2,
+                                       reduce_tasks[0])
+
+    # The other worker is left to the map tasks
+    scheduler.finished(worker1, 2)
+    assert scheduler.next_action() == ("map_outputs", job, [2])
+    assert scheduler.next_action() == ("assign", job, worker1, {"id": 3})
+    scheduler.finished(worker1, 3)
+    assert scheduler.next_action() == ("map_outputs", job, [3])
+    assert job.phase.name == "reduce"
+    assert scheduler.next_action() == ("assign", job, worker1,
+                                       reduce_tasks[1])
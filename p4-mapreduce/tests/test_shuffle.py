@@ -0,0 +1,128 @@
+"""See unit test function docstring."""
+
+import os
+import threading
+import pytest
+from mapreduce.worker.shuffle import ShuffleServer, TaskAborted
+
+
+def test_fetch_map_outputs(tmp_path):
+    """Verify a reducer fetches map outputs as their locations come in.
+
+    Outputs kept by the reducer's own Worker, and those in the shared
+    directory, are read in place.
+    """
+    mapper = ShuffleServer("localhost", 0)
+    reducer = ShuffleServer("localhost", 0, fetch_threads=2)
+    try:
+        job_dir = "mapreduce-shared-job00000-test"
+        for server, map_task_id in ((mapper, 0), (mapper, 1), (reducer, 2)):
+            path = f"{server.directory(job_dir)}/maptask{map_task_id:05d}" \
+                "-part00000"
+            with open(path, "w", encoding="utf-8") as outfile:
+                outfile.write(f"word\t{map_task_id}\n" * 1000)
+        shared = tmp_path/"maptask00003-part00000"
+        shared.write_text("word\t3\n", encoding="utf-8")
+
+        fetcher = reducer.fetcher({
+            "task_id": 0,
+            "num_inputs": 4,
+            "input_paths": [],
+            "shuffle_inputs": [
+                [*mapper.address, f"{job_dir}/maptask00000-part00000"],
+                [*reducer.address, f"{job_dir}/maptask00002-part00000"],
+            ],
+        })
+        reducer.add_inputs({
+            "task_id": 0,
+            "input_paths": [str(shared)],
+            "shuffle_inputs": [
+                [*mapper.address, f"{job_dir}/maptask00001-part00000"],
+                # announced twice, fetched once
+                [*mapper.address, f"{job_dir}/maptask00000-part00000"],
+            ],
+        })
+        paths = fetcher.wait()
+        assert len(paths) == 4
+        assert str(shared) in paths
+        assert f"{reducer.root}/{job_dir}/maptask00002-part00000" in paths
+        for map_task_id, path in enumerate(paths):
+            with open(path, encoding="utf-8") as infile:
+                assert infile.readline() == f"word\t{map_task_id}\n"
+        reducer.done(0, fetcher)
+        assert not reducer.fetchers
+    finally:
+        mapper.close()
+        reducer.close()
+
+
+def test_fetch_errors():
+    """Verify a missing map output or an abort stops the reduce task."""
+    mapper = ShuffleServer("localhost", 0)
+    reducer = ShuffleServer("localhost")
+    try:
+        fetcher = reducer.fetcher({
+            "task_id": 0,
+            "num_inputs": 1,
+            "shuffle_inputs": [[*mapper.address, "../../etc/passwd"]],
+        })
+        with pytest.raises(FileNotFoundError):
+            fetcher.wait()
+
+        fetcher = reducer.fetcher({
+            "task_id": 1,
+            "num_inputs": 2,
+        })
+        reducer.fetchers[1].abort()
+        with pytest.raises(TaskAborted):
+            fetcher.wait()
+    finally:
+        mapper.close()
+        reducer.close()
+
+
+def test_premerge(tmp_path):
+    """Verify a reducer merges its input into runs while it arrives.
+
+    With a merge factor of 2, the first 4 of 5 inputs end up in one run
+    merged from two runs, and only it and the last input are left.
+    """
+    reducer = ShuffleServer("localhost")
+    try:
+        paths = []
+        for map_task_id in range(5):
+            path = tmp_path/f"maptask{map_task_id:05d}-part00000"
+            path.write_text("".join(
+                f"word{i:03d}\t1\n" for i in range(map_task_id, 100, 5)
+            ), encoding="utf-8")
+            paths.append(str(path))
+        fetcher = reducer.fetcher({
+            "task_id": 0,
+            "num_inputs": 5,
+            "input_paths": paths[:2],
+        })
+        merged = []
+        merger = threading.Thread(
+            target=lambda: merged.extend(fetcher.merge_input(2))
+        )
+        merger.start()
+        reducer.add_inputs({"task_id": 0, "input_paths": paths[2:4]})
+        # the run merged from the first two inputs is merged again
+        while len(os.listdir(fetcher.tmpdir)) != 1 or fetcher.ready:
+            merger.join(0.01)
+        reducer.add_inputs({"task_id": 0, "input_paths": paths[4:]})
+        merger.join()
+
+        assert len(merged) == 2
+        assert merged[0] == paths[4]
+        assert os.path.dirname(merged[1]) == fetcher.tmpdir
+        with open(merged[1], encoding="utf-8") as run:
+            lines = run.readlines()
+        assert lines == sorted(
+            f"word{i:03d}\t1\n" for i in range(100) if i % 5 != 4
+        )
+        reducer.done(0, fetcher)
+        # the inputs in the shared directory are left alone
+        assert all(os.path.exists(path) for path in paths)
+    finally:
+        reducer.close()
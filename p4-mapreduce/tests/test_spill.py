@@ -0,0 +1,31 @@
+"""See unit test function docstring."""
+
+import random
+from mapreduce.worker.spill import SortBuffer
+
+
+def test_spill_and_merge(tmp_path):
+    """Verify partitions come out sorted after spilling sorted runs."""
+    rand = random.Random(485)
+    lines = [f"{rand.randrange(1000)}\t1\n" for _ in range(5000)]
+    buffer = SortBuffer(3, tmp_path, memory_limit=10000)
+    for line in lines:
+        buffer.add(int(line.partition("\t")[0]) % 3, line)
+    assert buffer.spills > 1
+
+    for partition in range(3):
+        expected = sorted(
+            line for line in lines
+            if int(line.partition("\t")[0]) % 3 == partition
+        )
+        assert list(buffer.sorted_lines(partition)) == expected
+
+
+def test_no_spill(tmp_path):
+    """Verify a buffer that fits in memory writes no run files."""
+    buffer = SortBuffer(2, tmp_path, memory_limit=1 << 20)
+    for line in ["b\t1\n", "a\t1\n", "c\t1\n"]:
+        buffer.add(0, line)
+    assert list(buffer.sorted_lines(0)) == ["a\t1\n", "b\t1\n", "c\t1\n"]
+    assert not list(buffer.sorted_lines(1))
+    assert not list(tmp_path.iterdir())
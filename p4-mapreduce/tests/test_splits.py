@@ -0,0 +1,62 @@
+"""See unit test function docstring."""
+
+import subprocess
+from mapreduce.manager.splits import split_inputs, balance
+from mapreduce.worker.__main__ import open_input
+from utils import TESTDATA_DIR
+
+
+def test_split_on_newlines(tmp_path):
+    """Verify splits cover every byte once and never cut a line."""
+    path = tmp_path/"input"
+    path.write_text("".join(f"line {i}\n" for i in range(1000)))
+    splits = split_inputs([str(path)], 100)
+
+    offset = 0
+    content = path.read_bytes()
+    for split_path, split_offset, length in splits:
+        assert split_path == str(path)
+        assert split_offset == offset
+        assert content[offset + length - 1:offset + length] == b"\n"
+        offset += length
+    assert offset == len(content)
+    assert all(100 <= length < 110 for _, _, length in splits[:-1])
+
+
+def test_split_small_and_empty_files(tmp_path):
+    """Verify a small file is one split and an empty file is none."""
+    (tmp_path/"empty").touch()
+    (tmp_path/"small").write_text("hello\n")
+    (tmp_path/"unterminated").write_text("a\nb")
+    splits = split_inputs([str(tmp_path/"empty"), str(tmp_path/"small"),
+                           str(tmp_path/"unterminated")], 2)
+    assert splits == [
+        [str(tmp_path/"small"), 0, 6],
+        [str(tmp_path/"unterminated"), 0, 2],
+        [str(tmp_path/"unterminated"), 2, 1],
+    ]
+
+
+def test_balance_by_bytes():
+    """Verify one big file and many small ones spread evenly."""
+    splits = [["big", i * 100, 100] for i in range(9)]
+    splits += [[f"small{i}", 0, 10] for i in range(90)]
+    tasks = balance(splits, 3)
+    totals = [sum(length for _, _, length in task) for task in tasks]
+    assert totals == [600, 600, 600]
+
+    # Each task reads its splits in file order
+    for task in tasks:
+        assert task == sorted(task, key=lambda s: (s[0], s[1]))
+
+
+def test_map_split():
+    """Verify a mapper sees exactly the bytes of its split."""
+    path = TESTDATA_DIR/"input/file01"
+    content = path.read_bytes()
+    for split in split_inputs([str(path)], 8):
+        with open_input(split) as infile:
+            output = subprocess.run(["cat"], stdin=infile, check=True,
+                                    stdout=subprocess.PIPE).stdout
+        _, offset, length = split
+        assert output == content[offset:offset + length]
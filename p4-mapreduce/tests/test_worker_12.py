@@ -0,0 +1,152 @@
+"""See unit test function docstring."""
+
+import json
+import os
+import shutil
+import subprocess
+from pathlib import Path
+import utils
+import mapreduce
+from mapreduce.worker.__main__ import commit
+from utils import TESTDATA_DIR
+
+
+def manager_message_generator(mock_sendall, tmp_path):
+    """Fake Manager messages."""
+    # Worker register
+    #
+    # Transfer control back to solution under test in between each check for
+    # the register message to simulate the Worker calling recv() when there's
+    # nothing to receive.
+    for _ in utils.wait_for_register_messages(mock_sendall):
+        yield None
+
+    yield json.dumps({
+        "message_type": "register_ack",
+        "worker_host": "localhost",
+        "worker_port": 6001,
+    }).encode("utf-8")
+    yield None
+
+    # Two attempts at the same map task, like a straggler and its backup
+    for num in range(1, 3):
+        yield json.dumps({
+            "message_type": "new_map_task",
+            "task_id": 0,
+            "executable": TESTDATA_DIR/"exec/wc_map.sh",
+            "input_paths": [TESTDATA_DIR/"input/file02"],
+            "output_directory": tmp_path,
+            "num_partitions": 1,
+            "worker_host": "localhost",
+            "worker_port": 6001,
+        }, cls=utils.PathJSONEncoder).encode("utf-8")
+        yield None
+        for _ in utils.wait_for_status_finished_messages(mock_sendall, num):
+            yield None
+
+    # Two attempts at the same reduce task
+    for num in range(3, 5):
+        yield json.dumps({
+            "message_type": "new_reduce_task",
+            "task_id": 0,
+            "executable": TESTDATA_DIR/"exec/wc_reduce.sh",
+            "input_paths": [f"{tmp_path}/maptask00000-part00000"],
+            "output_directory": tmp_path,
+            "worker_host": "localhost",
+            "worker_port": 6001,
+        }, cls=utils.PathJSONEncoder).encode("utf-8")
+        yield None
+        for _ in utils.wait_for_status_finished_messages(mock_sendall, num):
+            yield None
+
+    # Shutdown
+    yield json.dumps({
+        "message_type": "shutdown",
+    }).encode("utf-8")
+    yield None
+
+
+def test_duplicate_attempts(mocker, tmp_path):
+    """Verify duplicate attempts at a task leave one intact output file.
+
+    Each attempt writes a hidden file and renames it over the output, so
+    there are no partial files left and the output is written exactly once.
+    """
+    # Mock the socket library socket class
+    mock_socket = mocker.patch("socket.socket")
+
+    # sendall() records messages
+    mock_sendall = mock_socket.return_value.__enter__.return_value.sendall
+
+    # accept() returns a mock client socket
+    mock_clientsocket = mocker.MagicMock()
+    mock_accept = mock_socket.return_value.__enter__.return_value.accept
+    mock_accept.return_value = (mock_clientsocket, ("127.0.0.1", 10000))
+
+    # recv() returns values generated by manager_message_generator()
+    mock_recv = mock_clientsocket.recv
+    mock_recv.side_effect = manager_message_generator(mock_sendall, tmp_path)
+
+    # Run student Worker code.  When student Worker calls recv(), it will
+    # return the faked responses configured above.  When the student code calls
+    # sys.exit(0), it triggers a SystemExit exception, which we'll catch.
+    try:
+        mapreduce.worker.Worker(
+            host="localhost",
+            port=6001,
+            manager_host="localhost",
+            manager_port=6000,
+        )
+        utils.wait_for_threads()
+    except SystemExit as error:
+        assert error.code == 0
+
+    # Verify messages sent by the Worker
+    all_messages = utils.get_messages(mock_sendall)
+    messages = utils.filter_not_heartbeat_messages(all_messages)
+    assert messages[1:] == [{
+        "message_type": "finished",
+        "task_id": 0,
+        "worker_host": "localhost",
+        "worker_port": 6001,
+    }] * 4
+
+    # Verify one copy of each output and no leftover attempt files
+    assert sorted(os.listdir(tmp_path)) == [
+        "maptask00000-part00000",
+        "part-00000",
+    ]
+    with Path(f"{tmp_path}/part-00000").open(encoding="utf-8") as infile:
+        actual = infile.readlines()
+    assert actual == [
+        "\t1\n",
+        "goodbye\t1\n",
+        "hadoop\t2\n",
+        "hello\t1\n",
+    ]
+
+
+def test_commit_vanished_directory(tmp_path):
+    """Verify a commit into a directory removed mid-write is discarded."""
+    output_dir = tmp_path/"shared"
+    output_dir.mkdir()
+
+    def write(path):
+        # The job finishes and its shared directory is removed while this
+        # attempt is still sorting
+        shutil.rmtree(output_dir)
+        subprocess.run(["sort", "-o", path, os.devnull], check=True)
+
+    commit(str(output_dir), "maptask00000-part00000", write)
+    assert not output_dir.exists()
+
+    # Failures in a directory that still exists are real errors
+    output_dir.mkdir()
+    try:
+        commit(str(output_dir), "part-00000",
+               lambda path: subprocess.run(["false"], check=True))
+    except subprocess.CalledProcessError:
+        pass
+    else:
+        assert False, "commit() swallowed a real failure"
+    assert not os.listdir(output_dir)
@@ -0,0 +1,121 @@
+"""See unit test function docstring."""
+
+import json
+from pathlib import Path
+import utils
+import mapreduce
+from utils import TESTDATA_DIR
+
+
+def manager_message_generator(mock_sendall, tmp_path):
+    """Fake Manager messages."""
+    # Worker register
+    #
+    # Transfer control back to solution under test in between each check for
+    # the register message to simulate the Worker calling recv() when there's
+    # nothing to receive.
+    for _ in utils.wait_for_register_messages(mock_sendall):
+        yield None
+
+    yield json.dumps({
+        "message_type": "register_ack",
+        "worker_host": "localhost",
+        "worker_port": 6001,
+    }).encode("utf-8")
+    yield None
+
+    # Map task run by a Python callable, one input of which is a split
+    yield json.dumps({
+        "message_type": "new_map_task",
+        "task_id": 0,
+        "executable": "wc_callable:mapper",
+        "input_paths": [
+            TESTDATA_DIR/"input/file01",
+            [str(TESTDATA_DIR/"input/file02"), 0, 28],
+        ],
+        "output_directory": tmp_path,
+        "num_partitions": 1,
+        "worker_host": "localhost",
+        "worker_port": 6001,
+    }, cls=utils.PathJSONEncoder).encode("utf-8")
+    yield None
+    for _ in utils.wait_for_status_finished_messages(mock_sendall):
+        yield None
+
+    # Reduce task run by a Python callable in the same, warm process
+    yield json.dumps({
+        "message_type": "new_reduce_task",
+        "task_id": 0,
+        "executable": "wc_callable:reducer",
+        "input_paths": [f"{tmp_path}/maptask00000-part00000"],
+        "output_directory": tmp_path,
+        "worker_host": "localhost",
+        "worker_port": 6001,
+    }, cls=utils.PathJSONEncoder).encode("utf-8")
+    yield None
+    for _ in utils.wait_for_status_finished_messages(mock_sendall, num=2):
+        yield None
+
+    # Shutdown
+    yield json.dumps({
+        "message_type": "shutdown",
+    }).encode("utf-8")
+    yield None
+
+
+def test_callable_pool(mocker, tmp_path, monkeypatch):
+    """Verify Worker runs module:function mappers and reducers in its pool.
+
+    Note: 'mocker' is a fixture function provided the the pytest-mock package.
+    This fixture lets us override a library function with a temporary fake
+    function that returns a hardcoded value while testing.
+
+    See https://github.com/pytest-dev/pytest-mock/ for more info.
+
+    Note: 'tmp_path' is a fixture provided by the pytest-mock package.
+    This fixture creates a temporary directory for use within this test.
+
+    See https://docs.pytest.org/en/6.2.x/tmpdir.html for more info.
+    """
+    # The pool's processes find the callables on the Worker's path
+    monkeypatch.syspath_prepend(str(TESTDATA_DIR/"exec"))
+
+    # Mock the socket library socket class
+    mock_socket = mocker.patch("socket.socket")
+
+    # sendall() records messages
+    mock_sendall = mock_socket.return_value.__enter__.return_value.sendall
+
+    # accept() returns a mock client socket
+    mock_clientsocket = mocker.MagicMock()
+    mock_accept = mock_socket.return_value.__enter__.return_value.accept
+    mock_accept.return_value = (mock_clientsocket, ("127.0.0.1", 10000))
+
+    # recv() returns values generated by manager_message_generator()
+    mock_recv = mock_clientsocket.recv
+    mock_recv.side_effect = manager_message_generator(mock_sendall, tmp_path)
+
+    # Run student Worker code.  When student Worker calls recv(), it will
+    # return the faked responses configured above.  When the student code calls
+    # sys.exit(0), it triggers a SystemExit exception, which we'll catch.
+    try:
+        mapreduce.worker.Worker(
+            host="localhost",
+            port=6001,
+            manager_host="localhost",
+            manager_port=6000,
+        )
+        utils.wait_for_threads()
+    except SystemExit as error:
+        assert error.code == 0
+
+    # Verify final output
+    with Path(f"{tmp_path}/part-00000").open(encoding="utf-8") as infile:
+        actual = infile.readlines()
+    assert actual == [
+        "bye\t1\n",
+        "goodbye\t1\n",
+        "hadoop\t2\n",
+        "hello\t2\n",
+        "world\t2\n",
+    ]
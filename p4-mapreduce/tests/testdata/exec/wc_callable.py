@@ -0,0 +1,16 @@
+"""Word count mapper and reducer as Python callables for the Worker pool."""
+import itertools
+
+
+def mapper(lines):
+    """Yield <word><tab>1 for every word of every line."""
+    for line in lines:
+        for word in line.split():
+            yield f"{word.lower()}\t1\n"
+
+
+def reducer(lines):
+    """Yield <word><tab><total> for sorted <word><tab><count> lines."""
+    pairs = (line.rstrip("\n").split("\t") for line in lines)
+    for word, group in itertools.groupby(pairs, key=lambda pair: pair[0]):
+        yield f"{word}\t{sum(int(count) for _, count in group)}\n"
@@ -0,0 +1,12 @@
+#!/bin/bash
+#
+# Word count combiner.
+#
+# Input: <word><tab><count>
+# Output: <word><tab><total>
+
+# Stop on errors
+set -Eeuo pipefail
+
+# Combine
+awk -F'\t' '{count[$1] += $2} END {for (word in count) print word"\t"count[word]}'